@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import math
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .cluster import PiHoleCluster
+from .pihole import PiHole
+
+
+class AsyncPiHole:
+    def __init__(
+        self, hostname, port, username, key_file, logger, executor=None
+    ) -> None:
+        self.pihole = PiHole(
+            hostname=hostname,
+            port=port,
+            username=username,
+            key_file=key_file,
+            logger=logger,
+        )
+        self.logger = logger
+        self.executor = executor
+
+    async def _run(self, func, *args, **kwargs):
+        """runs a blocking PiHole method on the executor without blocking the
+        event loop. Cancelling the awaiting task stops waiting for the result,
+        the ssh command itself runs to completion in its worker thread.
+
+        Args:
+            func (callable): blocking callable to run.
+
+        Returns:
+            the return value of func.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def connect(self):
+        """connects the wrapped PiHole over ssh."""
+        return await self._run(self.pihole.connect)
+
+    async def add_dns_record(self, ip_addr, hostname):
+        """awaitable PiHole.add_dns_record."""
+        return await self._run(
+            self.pihole.add_dns_record, ip_addr=ip_addr, hostname=hostname
+        )
+
+    async def delete_dns_record(self, ip, hostname):
+        """awaitable PiHole.delete_dns_record."""
+        return await self._run(self.pihole.delete_dns_record, ip, hostname)
+
+    async def check_record_in_dns(self, ip, host):
+        """awaitable PiHole.check_record_in_dns."""
+        return await self._run(self.pihole.check_record_in_dns, ip, host)
+
+    async def execute_many(self, commands, strip=True):
+        """awaitable PiHole.execute_many."""
+        return await self._run(self.pihole.execute_many, commands, strip=strip)
+
+    async def update_gravity(self):
+        """awaitable PiHole.update_gravity."""
+        return await self._run(self.pihole.update_gravity)
+
+    async def update_pihole(self):
+        """awaitable PiHole.update_pihole."""
+        return await self._run(self.pihole.update_pihole)
+
+    async def close(self):
+        """closes the wrapped ssh client."""
+        await self._run(self.pihole.close)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class AsyncPiHoleCluster:
+    def __init__(self, logger, config, max_concurrency=None) -> None:
+        self.logger = logger
+        self.config = config
+        self.cluster = PiHoleCluster(logger=logger, config=config)
+
+        self.max_concurrency = max_concurrency or config.max_parallel_hosts
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="pihole-aio"
+        )
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        """creates the concurrency semaphore lazily so that it is bound to the
+        running event loop rather than the one active at construction time.
+
+        Returns:
+            asyncio.Semaphore: semaphore bounding in-flight host operations.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _run_on_host(self, task, ph_host, *args, deadline=None, state=None):
+        """runs one blocking per-host cluster task once a semaphore slot is
+        free. Only `max_concurrency` tasks hold a worker thread at a time, the
+        rest wait as coroutines. The task runs through PiHoleCluster._run_task,
+        so it gets the same probe skip, deadline share, metrics and trace
+        spans as a synchronous run.
+
+        Args:
+            task (callable): PiHoleCluster per-host task.
+            ph_host (dict): a single `host` entry from the config file.
+            deadline (float, optional): operation deadline. Defaults to None.
+            state (dict, optional): `unstarted` host count shared by the fan
+                out, used to share the deadline. Defaults to None.
+
+        Returns:
+            dict: the `hostname` and either the task `result` or the `error`.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            waves = 1
+            if state is not None:
+                # coroutines only run on the loop thread, no lock is needed.
+                waves = math.ceil(state["unstarted"] / self.max_concurrency)
+                state["unstarted"] -= 1
+
+            return await loop.run_in_executor(
+                self.executor,
+                functools.partial(
+                    self.cluster._run_task_by, deadline, waves, task, ph_host, *args
+                ),
+            )
+
+    async def _run_on_hosts(self, task, *args):
+        """fans a per-host task out over every configured host.
+
+        Args:
+            task (callable): PiHoleCluster per-host task.
+
+        Returns:
+            list: per-host results, in config order.
+        """
+        hosts = [ph_host["host"] for ph_host in self.config.pihole_hosts]
+
+        if self.cluster.probe is not None:
+            # probe every host at once so down hosts cost one short timeout.
+            await self._run_blocking(
+                self.cluster.probe.probe,
+                [(ph_host["hostname"], ph_host["port"]) for ph_host in hosts],
+            )
+
+        deadline = self.cluster._operation_deadline()
+        state = {"unstarted": len(hosts)}
+        return await asyncio.gather(
+            *(
+                self._run_on_host(task, ph_host, *args, deadline=deadline, state=state)
+                for ph_host in hosts
+            )
+        )
+
+    async def _run_blocking(self, method, *args, **kwargs):
+        """runs a blocking cluster operation on a worker thread, for
+        operations that keep their own fan out, such as journaled changes and
+        rolling updates.
+
+        Args:
+            method (callable): PiHoleCluster method.
+
+        Returns:
+            the result of the method.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(method, *args, **kwargs)
+        )
+
+    async def add_pihole_record(self, ip, host):
+        """awaitable PiHoleCluster.add_pihole_record."""
+        if self.cluster.journal is not None:
+            return await self._run_blocking(
+                self.cluster.apply_mutations, [("add", ip, host)]
+            )
+
+        return await self._run_on_hosts(self.cluster._add_record_on_host, ip, host)
+
+    async def delete_pihole_record(self, ip, host):
+        """awaitable PiHoleCluster.delete_pihole_record."""
+        self.logger.info(f"Deleting DNS Record: {host}={ip}")
+        if self.cluster.journal is not None:
+            return await self._run_blocking(
+                self.cluster.apply_mutations, [("delete", ip, host)]
+            )
+
+        return await self._run_on_hosts(self.cluster._delete_record_on_host, ip, host)
+
+    async def invoke_gravity_update(self, start_from=0, resume=False):
+        """awaitable PiHoleCluster.invoke_gravity_update."""
+        return await self._run_blocking(
+            self.cluster.invoke_gravity_update, start_from=start_from, resume=resume
+        )
+
+    async def invoke_pihole_update(self, start_from=0, resume=False):
+        """awaitable PiHoleCluster.invoke_pihole_update."""
+        return await self._run_blocking(
+            self.cluster.invoke_pihole_update, start_from=start_from, resume=resume
+        )
+
+    async def check_record_sync(self, ip, host):
+        """awaitable PiHoleCluster.check_record_sync."""
+        results = await self._run_on_hosts(self.cluster._check_record_on_host, ip, host)
+        found_ips = {r["hostname"]: ip for r in results if r.get("result")}
+
+        if len(found_ips) == len(self.config.pihole_hostnames):
+            self.logger.info(f"{ip} is syncronized across entire cluster.")
+            return True
+
+        self.logger.error(f"{ip} not sync'd across cluster.")
+        return False
+
+    async def aclose(self):
+        """closes pooled ssh connections and releases the worker threads,
+        without blocking the event loop while in-flight host tasks finish.
+        """
+        loop = asyncio.get_running_loop()
+        # the loop's default executor, as the own one is being shut down.
+        await loop.run_in_executor(
+            None, functools.partial(self.executor.shutdown, wait=True)
+        )
+        await loop.run_in_executor(None, self.cluster.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
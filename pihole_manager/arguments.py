@@ -12,6 +12,12 @@ class Arguments:
             "update-pihole",
             "update-gravity",
             "check-record-sync",
+            "bulk-add",
+            "bulk-delete",
+            "apply",
+            "serve",
+            "replay",
+            "drift-report",
         ]
 
     def parse_arguments(self, args=None):
@@ -36,10 +42,39 @@ class Arguments:
             "-o",
             type=str,
             required=True,
-            help="Available Operations: add-dns-record, delete-dns-record, update-pihole, update-gravity, check-record-sync",
+            help="Available Operations: add-dns-record, delete-dns-record, update-pihole, update-gravity, check-record-sync, bulk-add, bulk-delete, apply, serve, replay, drift-report",
         )
         parser.add_argument("--hostname", "-n", type=str, help="DNS hostname")
         parser.add_argument("--ipaddress", "-i", type=str, help="IP address")
+        parser.add_argument(
+            "--file",
+            "-f",
+            type=str,
+            help="Records file (csv, yaml or hosts format) for bulk-add, bulk-delete and apply",
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            choices=["table", "json"],
+            default="table",
+            help="Output format for drift-report",
+        )
+        parser.add_argument(
+            "--trace",
+            type=str,
+            help="Write a Chrome trace event timeline of the run to this file",
+        )
+        parser.add_argument(
+            "--start-from",
+            type=int,
+            default=0,
+            help="Index of the first host for update-pihole and update-gravity",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the hosts finished by the last interrupted update-pihole or update-gravity",
+        )
         return parser.parse_args(args)
 
     def validate_arguments(self, args):
@@ -63,6 +98,7 @@ class Arguments:
             return None
 
         output_args["config_file"] = args.config
+        output_args["trace"] = args.trace
 
         if not args.operation in self.supported_operations:
             return None
@@ -89,6 +125,31 @@ class Arguments:
                 if not len(output_args[req]) > 0:
                     return None
 
+        elif output_args["operation"]["command"] in (
+            "bulk-add",
+            "bulk-delete",
+            "apply",
+        ):
+            output_args["operation"]["requires"] = ["records_file"]
+
+            if not args.file or not os.path.isfile(args.file):
+                return None
+
+            output_args["records_file"] = str(args.file)
+
+        elif output_args["operation"]["command"] in ("update-pihole", "update-gravity"):
+            output_args["operation"]["requires"] = []
+
+            if args.start_from < 0:
+                return None
+
+            output_args["start_from"] = args.start_from
+            output_args["resume"] = args.resume
+
+        elif output_args["operation"]["command"] == "drift-report":
+            output_args["operation"]["requires"] = []
+            output_args["format"] = args.format
+
         else:
             output_args["operation"]["requires"] = []
 
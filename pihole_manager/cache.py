@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import threading
+
+
+class HostFactsCache:
+    def __init__(self, path, ttl=86400) -> None:
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._facts = None
+
+    def _key(self, hostname, port, fingerprint):
+        """builds the cache key for a host. The ssh host key fingerprint is
+        part of the key so a reinstalled pihole never reuses stale facts.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+            fingerprint (str): sha256 fingerprint of the ssh host key.
+
+        Returns:
+            str: cache key.
+        """
+        return f"{hostname}:{port}:{fingerprint}"
+
+    def _load(self):
+        """reads the cache file once. A missing or corrupt file is treated as
+        an empty cache. Must be called with the lock held.
+
+        Returns:
+            dict: cached facts keyed by host.
+        """
+        if self._facts is not None:
+            return self._facts
+
+        try:
+            with open(self.path, "r") as file:
+                self._facts = json.load(file)
+
+        except (OSError, ValueError):
+            self._facts = {}
+
+        return self._facts
+
+    def _save(self):
+        """writes the cache file atomically. Must be called with the lock held."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._facts, file)
+
+        os.replace(tmp_path, self.path)
+
+    def get(self, hostname, port, fingerprint, fact):
+        """looks up a cached fact for a host.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+            fingerprint (str): sha256 fingerprint of the ssh host key.
+            fact (str): name of the fact, e.g. `platform`.
+
+        Returns:
+            the cached value, or None when missing or older than the ttl.
+        """
+        with self._lock:
+            entry = self._load().get(self._key(hostname, port, fingerprint), {})
+            cached = entry.get(fact)
+
+        if cached is None or time.time() - cached["updated"] > self.ttl:
+            return None
+
+        return cached["value"]
+
+    def set(self, hostname, port, fingerprint, fact, value):
+        """stores a fact for a host and persists the cache file.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+            fingerprint (str): sha256 fingerprint of the ssh host key.
+            fact (str): name of the fact, e.g. `platform`.
+            value: json serializable value to cache.
+        """
+        with self._lock:
+            facts = self._load()
+            entry = facts.setdefault(self._key(hostname, port, fingerprint), {})
+            entry[fact] = {"value": value, "updated": time.time()}
+
+            try:
+                self._save()
+
+            except OSError:
+                # the cache is only an optimization, never fail an operation.
+                pass
+
+
+class CustomListCache:
+    def __init__(self, directory) -> None:
+        self.directory = os.path.expanduser(directory)
+
+    def _path(self, hostname, port):
+        """builds the cache file path for a host.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+
+        Returns:
+            str: path of the cached copy.
+        """
+        return os.path.join(self.directory, f"{hostname}_{port}.json")
+
+    def get(self, hostname, port):
+        """reads the cached copy of a host's custom dns list.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+
+        Returns:
+            dict: `sha256` and `content` of the cached copy, or None.
+        """
+        try:
+            with open(self._path(hostname, port), "r") as file:
+                cached = json.load(file)
+
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(cached, dict) or "sha256" not in cached:
+            return None
+
+        return cached
+
+    def set(self, hostname, port, sha256, content):
+        """stores a copy of a host's custom dns list with its sha256 digest.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+            sha256 (str): hex digest of content.
+            content (str): file contents.
+        """
+        path = self._path(hostname, port)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w") as file:
+                json.dump({"sha256": sha256, "content": content}, file)
+
+            os.replace(tmp_path, path)
+
+        except OSError:
+            # the cache is only an optimization, never fail an operation.
+            pass
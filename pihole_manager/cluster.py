@@ -1,12 +1,64 @@
 #!/usr/bin/env python3
 
+import math
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import CustomListCache, HostFactsCache
+from .drift import build_drift_report
+from .journal import Journal
+from .metrics import MetricsRegistry
 from .pihole import PiHole
+from .pool import ConnectionPool
+from .probe import ReachabilityProbe
+from .rolling import RollingScheduler
+from .tracing import trace_span
+from .validators import PiHoleInstanceValidator
 
 
 class PiHoleCluster:
-    def __init__(self, logger, config) -> None:
+    def __init__(self, logger, config, tracer=None) -> None:
         self.logger = logger
         self.config = config
+        self.tracer = tracer
+
+        self.validator = PiHoleInstanceValidator(self.logger)
+        self.metrics = MetricsRegistry()
+
+        self.facts_cache = None
+        if self.config.cache["facts_file"]:
+            self.facts_cache = HostFactsCache(
+                self.config.cache["facts_file"], ttl=self.config.cache["facts_ttl"]
+            )
+
+        self.journal = None
+        if self.config.journal["path"]:
+            self.journal = Journal(self.config.journal["path"])
+
+        self.custom_list_cache = None
+        if self.config.cache["custom_list_dir"]:
+            self.custom_list_cache = CustomListCache(self.config.cache["custom_list_dir"])
+
+        self.probe = None
+        if self.config.probe["enabled"]:
+            self.probe = ReachabilityProbe(
+                self.logger,
+                timeout=self.config.probe["timeout"],
+                ttl=self.config.probe["ttl"],
+            )
+
+        # per-host deadline of the operation running on the current thread.
+        self._local = threading.local()
+
+        pool_settings = dict(self.config.connection_pool)
+        self.max_channels = pool_settings.pop("max_channels", 4)
+        self.pool = ConnectionPool(
+            logger=self.logger,
+            factory=self._create_pihole_connection,
+            **pool_settings,
+        )
 
     def _create_pihole_connection(self, server, port, username, keyfile):
         """_summary_
@@ -26,12 +78,21 @@ class PiHoleCluster:
             username=username,
             key_file=keyfile,
             logger=self.logger,
+            facts_cache=self.facts_cache,
+            custom_list_cache=self.custom_list_cache,
+            min_reload_interval=self.config.dns_reload["min_interval"],
+            timeouts=self.config.timeouts,
+            metrics=self.metrics,
+            tracer=self.tracer,
+            max_channels=self.max_channels,
         )
 
         self.logger.debug(
             f"Connecting to: {pi_hole.hostname} | Port: {pi_hole.port} | User: {pi_hole.username} | Key: {pi_hole.key_file}"
         )
 
+        # the connect and handshake share the host's part of the deadline.
+        pi_hole.deadline = getattr(self._local, "deadline", None)
         connected = pi_hole.connect()
 
         if not connected:
@@ -42,42 +103,235 @@ class PiHoleCluster:
             self.logger.debug(f"SSH connection to {server} successful.")
             return pi_hole, True
 
-    def add_pihole_record(self, ip, host):
-        """_summary_
+    @contextmanager
+    def _host_session(self, ph_host):
+        """borrows a connected PiHole for the host from the connection pool and
+        hands it back when the block exits.
 
         Args:
-            ip (_type_): _description_
-            host (_type_): _description_
+            ph_host (dict): a single `host` entry from the config file.
+
+        Yields:
+            PiHole: the connected instance, or None if the connection failed.
         """
-        for ph_host in self.config.pihole_hosts:
-            ph_host = ph_host["host"]
+        with trace_span(self.tracer, "session", "session", host=ph_host["hostname"]):
+            try:
+                pihole, is_connected = self.pool.acquire(
+                    ph_host["hostname"],
+                    ph_host["port"],
+                    ph_host["username"],
+                    ph_host["ssh_key"],
+                )
 
-            self.logger.info(f"Adding DNS records to server: {ph_host['hostname']}")
+            except Exception as err:
+                self.logger.error(
+                    f"Unable to connect to server: {ph_host['hostname']}. Error: {err}"
+                )
+                pihole, is_connected = None, False
 
-            pihole, is_connected = self._create_pihole_connection(
-                server=ph_host["hostname"],
-                port=ph_host["port"],
-                username=ph_host["username"],
-                keyfile=ph_host["ssh_key"],
-            )
             if not is_connected:
+                yield None
+                return
+
+            # a pooled connection may outlive changes made by other operators.
+            pihole.revalidate_snapshot()
+
+            try:
+                # dns is reloaded at most once, when the host session ends.
+                with pihole.session():
+                    pihole.deadline = getattr(self._local, "deadline", None)
+                    try:
+                        yield pihole
+
+                    finally:
+                        # never skip the reload of changes that were written.
+                        pihole.deadline = None
+
+            finally:
+                self.pool.release(pihole)
+
+    def export_metrics(self):
+        """writes the phase timings to the files set in the `metrics` config
+        section. Export failures are logged, never raised.
+        """
+        for output_format, key in (("prometheus", "textfile"), ("json", "json_file")):
+            path = self.config.metrics[key]
+            if path is None:
                 continue
 
+            try:
+                self.metrics.write(path, output_format)
+
+            except OSError as err:
+                self.logger.error(f"Unable to write metrics to {path}: {err}")
+
+    def close(self):
+        """closes every pooled ssh connection and exports the metrics."""
+        self.pool.close()
+        self.export_metrics()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run_task(self, task, ph_host, *args):
+        """runs a per-host task, turning any exception into an error result so
+        that one host can never break an operation for the others. Hosts the
+        reachability probe found down are skipped.
+
+        Args:
+            task (callable): called as task(ph_host, *args).
+            ph_host (dict): a single `host` entry from the config file.
+
+        Returns:
+            dict: the `hostname` and either the task `result` or the `error`.
+        """
+        if self.probe is not None and not self.probe.is_reachable(
+            ph_host["hostname"], ph_host["port"]
+        ):
+            return {"hostname": ph_host["hostname"], "error": "Host unreachable."}
+
+        operation = getattr(task, "__name__", "task").strip("_")
+        operation = operation.replace("_on_host", "")
+
+        try:
+            with self.metrics.operation(operation):
+                with self.metrics.timer("total", ph_host["hostname"]):
+                    with trace_span(
+                        self.tracer, operation, "host", host=ph_host["hostname"]
+                    ):
+                        result = task(ph_host, *args)
+
+            return {"hostname": ph_host["hostname"], "result": result}
+
+        except Exception as err:
+            self.logger.error(
+                f"Unhandled error on server: {ph_host['hostname']}. Error: {err}"
+            )
+            return {"hostname": ph_host["hostname"], "error": str(err)}
+
+    def _operation_deadline(self):
+        """starts the clock for the `operation_deadline` of a record operation.
+
+        Returns:
+            float: time.monotonic() value the operation must finish by, or
+            None without a deadline.
+        """
+        if self.config.timeouts["operation_deadline"] is None:
+            return None
+
+        return time.monotonic() + self.config.timeouts["operation_deadline"]
+
+    def _run_task_by(self, deadline, waves, task, ph_host, *args):
+        """runs a per-host task with an even share of the time left before the
+        operation deadline, so one slow host cannot use up everyone else's
+        budget.
+
+        Args:
+            deadline (float): operation deadline from _operation_deadline.
+            waves (int): waves of hosts still to run, this one included.
+            task (callable): called as task(ph_host, *args).
+            ph_host (dict): a single `host` entry from the config file.
+
+        Returns:
+            dict: the `hostname` and either the task `result` or the `error`.
+        """
+        if deadline is None:
+            return self._run_task(task, ph_host, *args)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.logger.error(
+                f"Operation deadline exceeded. Skipping server: {ph_host['hostname']}"
+            )
+            return {
+                "hostname": ph_host["hostname"],
+                "error": "Operation deadline exceeded.",
+            }
+
+        self._local.deadline = time.monotonic() + remaining / waves
+        try:
+            return self._run_task(task, ph_host, *args)
+
+        finally:
+            self._local.deadline = None
+
+    def _run_on_hosts(self, task, *args):
+        """runs a per-host task against every configured pihole host. Hosts are
+        processed concurrently, up to `max_parallel_hosts` at a time, and an
+        exception raised for one host never affects the others. With an
+        operation deadline, each host gets a share of the time left and hosts
+        that cannot start in time are reported as timed out.
+
+        Args:
+            task (callable): called as task(ph_host, *args) for each host.
+            *args: extra positional arguments passed through to the task.
+
+        Returns:
+            list: one dict per host, in config order, holding the `hostname`
+            and either the task `result` or the `error` it raised.
+        """
+        hosts = [ph_host["host"] for ph_host in self.config.pihole_hosts]
+        workers = max(1, min(self.config.max_parallel_hosts, len(hosts)))
+
+        if self.probe is not None:
+            # probe every host at once so down hosts cost one short timeout.
+            self.probe.probe((ph_host["hostname"], ph_host["port"]) for ph_host in hosts)
+
+        deadline = self._operation_deadline()
+        lock = threading.Lock()
+        unstarted = [len(hosts)]
+
+        def run(ph_host):
+            # share the time left evenly between the waves of hosts still to run.
+            with lock:
+                waves = math.ceil(unstarted[0] / workers)
+                unstarted[0] -= 1
+
+            return self._run_task_by(deadline, waves, task, ph_host, *args)
+
+        if workers == 1:
+            return [run(ph_host) for ph_host in hosts]
+
+        self.logger.debug(f"Running on {len(hosts)} hosts with {workers} workers.")
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="pihole"
+        ) as executor:
+            return list(executor.map(run, hosts))
+
+    def _add_record_on_host(self, ph_host, ip, host):
+        """_summary_
+
+        Args:
+            ph_host (_type_): _description_
+            ip (_type_): _description_
+            host (_type_): _description_
+
+        Returns:
+            _type_: _description_
+        """
+        self.logger.info(f"Adding DNS records to server: {ph_host['hostname']}")
+
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return {"error": "Server not connected."}
+
             self.logger.info(f"Adding new dns record: {host}={ip}")
 
             try:
-                new_record = pihole.add_dns_record(ip_addr=ip, hostname=host)
+                # the host session makes no other change, reload in the same round trip.
+                new_record = pihole.add_dns_record(ip_addr=ip, hostname=host, reload=True)
                 if new_record is False:
                     self.logger.error(
                         "IP address already exists in custom dns. Skipping this pihole host."
                     )
-                    continue
 
-                if new_record is None:
+                elif new_record is None:
                     self.logger.error("IP address failed IPv4 validation check.")
-                    continue
 
-                if "error" in new_record.keys():
+                elif "error" in new_record.keys():
                     self.logger.error(
                         f"Failed To add new record: {new_record['error']}"
                     )
@@ -88,46 +342,57 @@ class PiHoleCluster:
                 else:
                     self.logger.error("Failed to add new record. Unknown reason.")
 
+                return new_record
+
             except Exception as err:
                 self.logger.error(f"[-] Failed to add record: {err}")
+                return {"error": str(err)}
 
-            pihole.client.close()
-            self.logger.debug(f"SSH connection to host: {ph_host['hostname']} successfully closed.")
-        return
-
-    def delete_pihole_record(self, ip, host):
+    def add_pihole_record(self, ip, host):
         """_summary_
 
         Args:
             ip (_type_): _description_
             host (_type_): _description_
+
+        Returns:
+            list: per-host results, in config order.
         """
-        self.logger.info(f"Deleting DNS Record: {host}={ip}")
-        for ph_host in self.config.pihole_hosts:
-            ph_host = ph_host["host"]
+        if self.journal is not None:
+            return self.apply_mutations([("add", ip, host)])
 
-            self.logger.info(f"Deleting DNS entry from server: {ph_host['hostname']}")
+        return self._run_on_hosts(self._add_record_on_host, ip, host)
 
-            pihole, is_connected = self._create_pihole_connection(
-                server=ph_host["hostname"],
-                port=ph_host["port"],
-                username=ph_host["username"],
-                keyfile=ph_host["ssh_key"],
-            )
-            if not is_connected:
-                continue
+    def _delete_record_on_host(self, ph_host, ip, host):
+        """_summary_
+
+        Args:
+            ph_host (_type_): _description_
+            ip (_type_): _description_
+            host (_type_): _description_
+
+        Returns:
+            _type_: _description_
+        """
+        self.logger.info(f"Deleting DNS entry from server: {ph_host['hostname']}")
+
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return {"error": "Server not connected."}
 
             try:
-                result = pihole.delete_dns_record(ip, host)
+                result = pihole.delete_dns_record(ip, host, reload=True)
                 if result is False:
-                    continue
+                    return result
 
                 if result is None:
                     self.logger.error("IP address failed IPv4 validation check.")
-                    continue
+                    return result
 
                 if "error" in result.keys():
-                    self.logger.error(f"Delete Record Attempt Error: {result['error']}")
+                    self.logger.error(
+                        f"Delete Record Attempt Error: {result['error']}"
+                    )
 
                 elif "output" in result.keys():
                     self.logger.info("Record deletion successful.")
@@ -135,105 +400,186 @@ class PiHoleCluster:
                 else:
                     self.logger.error("Failed to delete record. Unknown reason.")
 
+                return result
+
             except Exception as del_err:
                 self.logger.error(
                     f"Cannot delete DNS record {host} from server: {ph_host['hostname']}. Error: {del_err}"
                 )
+                return {"error": str(del_err)}
+
+    def delete_pihole_record(self, ip, host):
+        """_summary_
+
+        Args:
+            ip (_type_): _description_
+            host (_type_): _description_
+
+        Returns:
+            list: per-host results, in config order.
+        """
+        self.logger.info(f"Deleting DNS Record: {host}={ip}")
+        if self.journal is not None:
+            return self.apply_mutations([("delete", ip, host)])
 
-    def invoke_gravity_update(self):
+        return self._run_on_hosts(self._delete_record_on_host, ip, host)
+
+    def _update_gravity_on_host(self, ph_host):
         """_summary_
 
+        Args:
+            ph_host (_type_): _description_
+
         Returns:
             _type_: _description_
         """
-        for ph_host in self.config.pihole_hosts:
-            ph_host = ph_host["host"]
-            self.logger.info(
-                f"Updating gravity on pihole server: {ph_host['hostname']}"
-            )
+        self.logger.info(f"Updating gravity on pihole server: {ph_host['hostname']}")
 
-            pihole, is_connected = self._create_pihole_connection(
-                server=ph_host["hostname"],
-                port=ph_host["port"],
-                username=ph_host["username"],
-                keyfile=ph_host["ssh_key"],
-            )
-            if not is_connected:
-                continue
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return {"error": "Server not connected."}
 
             try:
                 result = pihole.update_gravity()
                 self.logger.debug(f"Cluster Gravity Update Response: {result}")
+                return result
 
             except Exception as update_err:
                 self.logger.error(
                     f"Cannot update gravity server: {ph_host['hostname']}. Error: {update_err}"
                 )
-        return True
+                return {"error": str(update_err)}
+
+    def _rolling_scheduler(self):
+        """builds a rolling scheduler from the `maintenance` config section.
+
+        Returns:
+            RollingScheduler: scheduler for fleet-wide maintenance.
+        """
+        return RollingScheduler(
+            logger=self.logger, cluster=self, **self.config.maintenance
+        )
+
+    def check_host_health(self, ph_host):
+        """determines whether a host's dns service is up.
+
+        Args:
+            ph_host (dict): a single `host` entry from the config file.
+
+        Returns:
+            bool: True when the host is reachable and dns is listening.
+        """
+        with self.metrics.operation("health_check"):
+            with self._host_session(ph_host) as pihole:
+                if pihole is None:
+                    return False
 
-    def invoke_pihole_update(self):
+                try:
+                    return pihole.check_health()
+
+                except Exception as err:
+                    self.logger.error(
+                        f"Health check failed on server: {ph_host['hostname']}. Error: {err}"
+                    )
+                    return False
+
+    def invoke_gravity_update(self, start_from=0, resume=False):
         """_summary_
 
+        Args:
+            start_from (int, optional): index of the first host to update.
+            resume (bool, optional): skip the hosts finished by the last
+                interrupted run.
+
+        Returns:
+            bool: True when every host was updated and is healthy.
+        """
+        return self._rolling_scheduler().run(
+            "update-gravity", self._update_gravity_on_host, start_from=start_from, resume=resume
+        )["completed"]
+
+    def _update_pihole_on_host(self, ph_host):
+        """_summary_
+
+        Args:
+            ph_host (_type_): _description_
+
         Returns:
             _type_: _description_
         """
-        for ph_host in self.config.pihole_hosts:
-            ph_host = ph_host["host"]
-            self.logger.info(f"Updating pihole server: {ph_host['hostname']}")
+        self.logger.info(f"Updating pihole server: {ph_host['hostname']}")
 
-            pihole, is_connected = self._create_pihole_connection(
-                server=ph_host["hostname"],
-                port=ph_host["port"],
-                username=ph_host["username"],
-                keyfile=ph_host["ssh_key"],
-            )
-            if not is_connected:
-                continue
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return {"error": "Server not connected."}
 
             try:
                 result = pihole.update_pihole()
                 self.logger.debug(f"Cluster Update Response: {result}")
+                return result
 
             except Exception as update_err:
                 self.logger.error(
                     f"Cannot update server: {ph_host['hostname']}. Error: {update_err}"
                 )
-        return True
+                return {"error": str(update_err)}
 
-    def check_record_sync(self, ip, host):
+    def invoke_pihole_update(self, start_from=0, resume=False):
         """_summary_
 
         Args:
+            start_from (int, optional): index of the first host to update.
+            resume (bool, optional): skip the hosts finished by the last
+                interrupted run.
+
+        Returns:
+            bool: True when every host was updated and is healthy.
+        """
+        return self._rolling_scheduler().run(
+            "update-pihole", self._update_pihole_on_host, start_from=start_from, resume=resume
+        )["completed"]
+
+    def _check_record_on_host(self, ph_host, ip, host):
+        """_summary_
+
+        Args:
+            ph_host (_type_): _description_
             ip (_type_): _description_
             host (_type_): _description_
 
         Returns:
-            _type_: _description_
+            bool: True when the record exists on the host.
         """
-        found_ips = {}
-        for ph_host in self.config.pihole_hosts:
-            ph_host = ph_host["host"]
-            self.logger.info(f"Checking for ip: {ip} on host: {ph_host['hostname']}.")
+        self.logger.info(f"Checking for ip: {ip} on host: {ph_host['hostname']}.")
 
-            pihole, is_connected = self._create_pihole_connection(
-                server=ph_host["hostname"],
-                port=ph_host["port"],
-                username=ph_host["username"],
-                keyfile=ph_host["ssh_key"],
-            )
-            if not is_connected:
-                continue
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return False
 
             try:
                 result = pihole.check_record_in_dns(ip, host)
-                if result:
-                    found_ips[ph_host["hostname"]] = ip
                 self.logger.debug(f"{ip} Found in Custom DNS: {result}")
+                return bool(result)
 
             except Exception as del_err:
                 self.logger.error(
                     f"Cannot check for ip {ip} on server: {ph_host['hostname']}. Error: {del_err}"
                 )
+                return False
+
+    def check_record_sync(self, ip, host):
+        """_summary_
+
+        Args:
+            ip (_type_): _description_
+            host (_type_): _description_
+
+        Returns:
+            _type_: _description_
+        """
+        results = self._run_on_hosts(self._check_record_on_host, ip, host)
+        found_ips = {r["hostname"]: ip for r in results if r.get("result")}
+
         if len(found_ips) == len(self.config.pihole_hostnames):
             self.logger.info(f"{ip} is syncronized across entire cluster.")
             return True
@@ -241,3 +587,246 @@ class PiHoleCluster:
         else:
             self.logger.error(f"{ip} not sync'd across cluster.")
             return False
+
+    def _read_records_on_host(self, ph_host):
+        """reads the custom dns records of one host.
+
+        Args:
+            ph_host (dict): a single `host` entry from the config file.
+
+        Returns:
+            list: (ip, hostname) tuples, or None if the host could not be read.
+        """
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return None
+
+            snapshot = pihole.snapshot()
+            if snapshot is None:
+                self.logger.error(
+                    f"Unable to read custom dns on server: {ph_host['hostname']}"
+                )
+                return None
+
+            return snapshot.records
+
+    def drift_report(self):
+        """reads every host's custom dns list once and reports records missing
+        on some hosts, hostnames resolving differently between hosts and
+        duplicate records.
+
+        Returns:
+            dict: drift report, see drift.build_drift_report.
+        """
+        host_records, unreachable = {}, []
+        for result in self._run_on_hosts(self._read_records_on_host):
+            if result.get("result") is None:
+                unreachable.append(result["hostname"])
+            else:
+                host_records[result["hostname"]] = result["result"]
+
+        report = build_drift_report(host_records, unreachable=unreachable)
+        self.logger.info(
+            f"Drift report: {len(report['matrix'])} records, {len(report['missing'])} missing, "
+            f"{len(report['conflicts'])} conflicts, {len(report['duplicates'])} duplicates."
+        )
+
+        return report
+
+    def _validate_records(self, records):
+        """validates every record before any host is touched, dropping exact
+        duplicates while keeping file order. Ips or hostnames mapped more than
+        once in the batch are logged as warnings.
+
+        Args:
+            records (list): (ip, hostname) tuples.
+
+        Returns:
+            list: unique records, or None if any record failed validation.
+        """
+        invalid = set()
+        for problem in self.validator.validate_records(records):
+            if problem["code"] in ("invalid_ip", "invalid_hostname"):
+                invalid.add(problem["row"])
+                self.logger.error(f"Invalid record on row {problem['row']}: {problem['reason']}")
+
+            elif problem["code"] != "duplicate_record":
+                self.logger.warning(f"Record on row {problem['row']}: {problem['reason']}")
+
+        if invalid:
+            self.logger.error(f"{len(invalid)} invalid records. No hosts changed.")
+            return None
+
+        return list(dict.fromkeys(records))
+
+    def _bulk_on_host(self, ph_host, method, records):
+        """_summary_
+
+        Args:
+            ph_host (dict): a single `host` entry from the config file.
+            method (str): `add_dns_records`, `delete_dns_records`,
+                `apply_dns_records` or `apply_dns_mutations`.
+            records (list): validated records or mutations for the method.
+
+        Returns:
+            dict: the PiHole bulk result.
+        """
+        with self._host_session(ph_host) as pihole:
+            if pihole is None:
+                return {"error": "Server not connected."}
+
+            result = getattr(pihole, method)(records)
+            if result is None:
+                self.logger.error(
+                    f"Unable to read custom dns on server: {ph_host['hostname']}"
+                )
+
+            elif "error" in result.keys():
+                self.logger.error(
+                    f"Bulk update failed on server: {ph_host['hostname']}. Error: {result['error']}"
+                )
+
+            else:
+                self.logger.info(f"Bulk update successful on: {ph_host['hostname']}")
+
+            return result
+
+    def bulk_add_records(self, records):
+        """adds many records to every host with one write and one dns reload
+        per host.
+
+        Args:
+            records (list): (ip, hostname) tuples.
+
+        Returns:
+            list: per-host results, or None if validation failed.
+        """
+        records = self._validate_records(records)
+        if records is None:
+            return None
+
+        self.logger.info(f"Bulk adding {len(records)} DNS records.")
+        if self.journal is not None:
+            return self.apply_mutations([("add", ip, host) for ip, host in records])
+
+        return self._run_on_hosts(self._bulk_on_host, "add_dns_records", records)
+
+    def bulk_delete_records(self, records):
+        """deletes many records from every host with one write and one dns
+        reload per host.
+
+        Args:
+            records (list): (ip, hostname) tuples.
+
+        Returns:
+            list: per-host results, or None if validation failed.
+        """
+        records = self._validate_records(records)
+        if records is None:
+            return None
+
+        self.logger.info(f"Bulk deleting {len(records)} DNS records.")
+        if self.journal is not None:
+            return self.apply_mutations([("delete", ip, host) for ip, host in records])
+
+        return self._run_on_hosts(self._bulk_on_host, "delete_dns_records", records)
+
+    def apply_records(self, records):
+        """converges every host on the desired records. Hosts that already
+        match are left alone, others get only the missing and removed records
+        written with a single dns reload.
+
+        Args:
+            records (list): desired (ip, hostname) tuples.
+
+        Returns:
+            list: per-host results, or None if validation failed.
+        """
+        records = self._validate_records(records)
+        if records is None:
+            return None
+
+        self.logger.info(f"Applying desired state of {len(records)} DNS records.")
+        results = self._run_on_hosts(self._bulk_on_host, "apply_dns_records", records)
+
+        converged = [
+            r["hostname"] for r in results if (r.get("result") or {}).get("converged")
+        ]
+        self.logger.info(f"{len(converged)} of {len(results)} hosts already converged.")
+        return results
+
+    def apply_mutations(self, mutations):
+        """applies an ordered list of record additions and deletions to every
+        host with one write and one dns reload per host. When the journal is
+        enabled the mutations are journaled first, and each host also receives
+        any earlier entries it missed.
+
+        Args:
+            mutations (list): (operation, ip, hostname) tuples, where
+                operation is `add` or `delete`.
+
+        Returns:
+            list: per-host results, or None if validation failed.
+        """
+        if self._validate_records([(ip, host) for _, ip, host in mutations]) is None:
+            return None
+
+        self.logger.info(f"Applying {len(mutations)} DNS record changes.")
+        if self.journal is not None:
+            seqs = self.journal.append(mutations)
+            return self._run_on_hosts(self._replay_on_host, seqs[0] if seqs else None)
+
+        return self._run_on_hosts(self._bulk_on_host, "apply_dns_mutations", mutations)
+
+    def _replay_on_host(self, ph_host, first_seq=None):
+        """pushes every journal entry the host has not acknowledged, as one
+        write and one dns reload, and acknowledges them on success.
+
+        Args:
+            ph_host (dict): a single `host` entry from the config file.
+            first_seq (int, optional): sequence number of the first mutation
+                of the current operation. Outcomes are only reported from
+                this entry on, earlier entries are counted as `replayed`.
+
+        Returns:
+            dict: the PiHole mutation result with `replayed` set.
+        """
+        pending = self.journal.pending(ph_host["hostname"])
+        if not pending:
+            return {"output": "", "outcomes": [], "replayed": 0}
+
+        self.logger.info(
+            f"Pushing {len(pending)} journal entries to: {ph_host['hostname']}"
+        )
+        mutations = [
+            (entry["operation"], entry["ip"], entry["hostname"]) for entry in pending
+        ]
+        result = self._bulk_on_host(ph_host, "apply_dns_mutations", mutations)
+
+        if result is None or "error" in result.keys():
+            self.logger.error(
+                f"Journal not acknowledged by: {ph_host['hostname']}. Will retry later."
+            )
+            return result
+
+        self.journal.ack(ph_host["hostname"], pending[-1]["seq"])
+
+        replayed = sum(
+            1 for entry in pending if first_seq is None or entry["seq"] < first_seq
+        )
+        result["outcomes"] = result["outcomes"][replayed:]
+        result["replayed"] = replayed
+        return result
+
+    def replay_journal(self):
+        """pushes un-acknowledged journal entries to every host, for example
+        after a host comes back from an outage.
+
+        Returns:
+            list: per-host results, or None if the journal is not enabled.
+        """
+        if self.journal is None:
+            self.logger.error("Journal is not enabled in the config file.")
+            return None
+
+        return self._run_on_hosts(self._replay_on_host)
@@ -2,10 +2,56 @@
 
 import os
 import sys
+import json
 import logging
 import platform
 
-import yaml
+CONFIG_CACHE_VERSION = 1
+
+
+class HostRecord:
+    __slots__ = ("hostname", "port", "username", "ssh_key")
+
+    def __init__(self, hostname, port, username, ssh_key) -> None:
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.ssh_key = ssh_key
+
+    @classmethod
+    def from_config(cls, index, entry):
+        """validates one `pihole.hosts` entry from the yaml file.
+
+        Args:
+            index (int): position of the entry, used in error messages.
+            entry (dict): `host` entry from the config file.
+
+        Returns:
+            HostRecord: the validated host.
+        """
+        host = entry.get("host") if isinstance(entry, dict) else None
+        if not isinstance(host, dict):
+            raise ValueError(f"pihole.hosts[{index}] must contain a `host` mapping.")
+
+        for field in cls.__slots__:
+            if host.get(field) in (None, ""):
+                raise ValueError(f"pihole.hosts[{index}].host.{field} is required.")
+
+        try:
+            port = int(host["port"])
+
+        except (TypeError, ValueError):
+            raise ValueError(f"pihole.hosts[{index}].host.port must be a number.")
+
+        return cls(str(host["hostname"]), port, str(host["username"]), str(host["ssh_key"]))
+
+    def to_dict(self):
+        """returns the host in the `host` entry layout of the config file.
+
+        Returns:
+            dict: `host` entry.
+        """
+        return {"host": {field: getattr(self, field) for field in self.__slots__}}
 
 
 class Config:
@@ -18,15 +64,21 @@ class Config:
                 f"Unable to open provided config file: {self.config_file}"
             )
 
-        self.config_file_content = self._parse_config_file()
-        if not self.config_file_content:
-            raise AssertionError(
-                "No configuration details found in provided yaml file."
-            )
+        self.config_file_content, self.host_records = self._load_config_file()
 
         self.log_level = self._parse_log_level()
         self.pihole_hosts = self._parse_pihole_hosts()
         self.pihole_hostnames = self._parse_hostname_scope()
+        self.max_parallel_hosts = self._parse_max_parallel_hosts()
+        self.connection_pool = self._parse_connection_pool()
+        self.cache = self._parse_cache()
+        self.dns_reload = self._parse_dns_reload()
+        self.daemon = self._parse_daemon()
+        self.journal = self._parse_journal()
+        self.maintenance = self._parse_maintenance()
+        self.timeouts = self._parse_timeouts()
+        self.probe = self._parse_probe()
+        self.metrics = self._parse_metrics()
 
     def _determine_platform(self):
         """_summary_
@@ -42,11 +94,146 @@ class Config:
         Returns:
             _type_: _description_
         """
+        import yaml
+
         with open(self.config_file, "r") as file:
             data = yaml.safe_load(file)
 
         return data
 
+    def _cache_path(self):
+        """returns the path of the compiled config cache, a hidden file next
+        to the yaml file.
+
+        Returns:
+            str: cache file path.
+        """
+        directory, name = os.path.split(os.path.abspath(self.config_file))
+        return os.path.join(directory, f".{name}.cache.json")
+
+    def _cache_key(self):
+        """identifies the current version of the yaml file.
+
+        Returns:
+            dict: path, mtime in nanoseconds and size of the yaml file.
+        """
+        stat = os.stat(self.config_file)
+        return {
+            "path": os.path.abspath(self.config_file),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+
+    def _read_cache(self, key):
+        """reads the compiled config if it was built from the same yaml file. A
+        cache file that is damaged or was written in another shape is a miss,
+        so the yaml is compiled again.
+
+        Args:
+            key (dict): current cache key.
+
+        Returns:
+            tuple: config content and host records, or None on a cache miss.
+        """
+        try:
+            with open(self._cache_path(), "r") as file:
+                cached = json.load(file)
+
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(cached, dict):
+            return None
+
+        if cached.get("version") != CONFIG_CACHE_VERSION or cached.get("key") != key:
+            return None
+
+        try:
+            content = cached["content"]
+            host_records = [HostRecord(*host) for host in cached["hosts"]]
+
+        except (KeyError, TypeError):
+            return None
+
+        if not isinstance(content, dict):
+            return None
+
+        return content, host_records
+
+    def _write_cache(self, key, content, host_records):
+        """stores the compiled config atomically. The cache is only an
+        optimization, so an unwritable directory is ignored.
+
+        Args:
+            key (dict): cache key of the yaml file that was compiled.
+            content (dict): parsed yaml content.
+            host_records (list): validated hosts.
+        """
+        path = self._cache_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(
+                    {
+                        "version": CONFIG_CACHE_VERSION,
+                        "key": key,
+                        "content": content,
+                        "hosts": [
+                            [getattr(host, field) for field in HostRecord.__slots__]
+                            for host in host_records
+                        ],
+                    },
+                    file,
+                )
+
+            os.replace(tmp_path, path)
+
+        except (OSError, TypeError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _compile_config(self):
+        """parses and validates the yaml file. Schema errors are raised here,
+        so a cached config is always valid.
+
+        Returns:
+            tuple: config content and host records.
+        """
+        content = self._parse_config_file()
+        if not content:
+            raise AssertionError(
+                "No configuration details found in provided yaml file."
+            )
+
+        hosts = (content.get("pihole") or {}).get("hosts")
+        if not isinstance(hosts, list) or not hosts:
+            raise ValueError("pihole.hosts must list at least one host.")
+
+        host_records = [
+            HostRecord.from_config(index, entry) for index, entry in enumerate(hosts)
+        ]
+
+        return content, host_records
+
+    def _load_config_file(self):
+        """loads the config from the compiled cache when the yaml file is
+        unchanged, compiling and caching it otherwise.
+
+        Returns:
+            tuple: config content and host records.
+        """
+        key = self._cache_key()
+
+        cached = self._read_cache(key)
+        if cached is not None:
+            return cached
+
+        content, host_records = self._compile_config()
+        self._write_cache(key, content, host_records)
+
+        return content, host_records
+
     def _parse_log_level(self):
         """_summary_
 
@@ -59,17 +246,191 @@ class Config:
         """_summary_
 
         Returns:
-            _type_: _description_
+            list: `host` entries in config file order.
         """
-        return self.config_file_content["pihole"]["hosts"]
+        return [host.to_dict() for host in self.host_records]
 
     def _parse_hostname_scope(self):
         """_summary_
 
         Returns:
-            _type_: _description_
+            list: pihole hostnames in config file order.
+        """
+        return [host.hostname for host in self.host_records]
+
+    def _parse_max_parallel_hosts(self):
+        """reads the optional `cluster.max_parallel_hosts` setting, which
+        controls how many pihole hosts are worked on at the same time.
+
+        Returns:
+            int: number of hosts to run concurrently. Defaults to 1 (serial).
+        """
+        cluster = self.config_file_content.get("cluster") or {}
+        max_parallel_hosts = int(cluster.get("max_parallel_hosts", 1))
+
+        if max_parallel_hosts < 1:
+            raise ValueError("cluster.max_parallel_hosts must be at least 1.")
+
+        return max_parallel_hosts
+
+    def _parse_connection_pool(self):
+        """reads the optional `connection_pool` section, which tunes how ssh
+        connections are reused between operations.
+
+        Returns:
+            dict: max_size, idle_timeout, keepalive_interval and max_channels
+            settings.
         """
-        return [h["host"]["hostname"] for h in self._parse_pihole_hosts()]
+        pool = self.config_file_content.get("connection_pool") or {}
+
+        max_channels = int(pool.get("max_channels", 4))
+        if max_channels < 1:
+            raise ValueError("connection_pool.max_channels must be at least 1.")
+
+        return {
+            "max_size": int(pool.get("max_size", 16)),
+            "idle_timeout": float(pool.get("idle_timeout", 300)),
+            "keepalive_interval": int(pool.get("keepalive_interval", 30)),
+            "max_channels": max_channels,
+        }
+
+    def _parse_dns_reload(self):
+        """reads the optional `dns_reload` section. `min_interval` is the
+        minimum number of seconds between two dns reloads on the same host.
+
+        Returns:
+            dict: min_interval in seconds, 0 disables the limit.
+        """
+        dns_reload = self.config_file_content.get("dns_reload") or {}
+
+        return {"min_interval": float(dns_reload.get("min_interval", 0))}
+
+    def _parse_daemon(self):
+        """reads the optional `daemon` section used by `dnsman -o serve` and by
+        the cli to find a running daemon.
+
+        Returns:
+            dict: socket_path and batch_window in seconds.
+        """
+        daemon = self.config_file_content.get("daemon") or {}
+
+        return {
+            "socket_path": os.path.expanduser(
+                daemon.get("socket_path", "~/.cache/dnsman/dnsman.sock")
+            ),
+            "batch_window": float(daemon.get("batch_window", 0.5)),
+        }
+
+    def _parse_journal(self):
+        """reads the optional `journal` section. The write-ahead journal of
+        record changes is only enabled when `path` is set.
+
+        Returns:
+            dict: journal path, or None.
+        """
+        journal = self.config_file_content.get("journal") or {}
+        path = journal.get("path")
+
+        return {"path": os.path.expanduser(path) if path else None}
+
+    def _parse_timeouts(self):
+        """reads the optional `timeouts` section. Every value is in seconds,
+        and a missing or null value means wait forever.
+
+        Returns:
+            dict: connect, banner, auth, command and operation_deadline
+            timeouts.
+        """
+        timeouts = self.config_file_content.get("timeouts") or {}
+        defaults = {
+            "connect": 10,
+            "banner": 15,
+            "auth": 15,
+            "command": None,
+            "operation_deadline": None,
+        }
+
+        parsed = {}
+        for name, default in defaults.items():
+            value = timeouts.get(name, default)
+            parsed[name] = float(value) if value is not None else None
+
+            if parsed[name] is not None and parsed[name] <= 0:
+                raise ValueError(f"timeouts.{name} must be greater than 0.")
+
+        return parsed
+
+    def _parse_probe(self):
+        """reads the optional `probe` section, which turns on a quick tcp
+        reachability check of every host before ssh connections are made.
+
+        Returns:
+            dict: enabled flag, timeout and ttl in seconds.
+        """
+        probe = self.config_file_content.get("probe") or {}
+
+        return {
+            "enabled": bool(probe.get("enabled", False)),
+            "timeout": float(probe.get("timeout", 0.5)),
+            "ttl": float(probe.get("ttl", 10)),
+        }
+
+    def _parse_metrics(self):
+        """reads the optional `metrics` section. Phase timings are written to
+        `textfile` in prometheus format and to `json_file` as json when set.
+
+        Returns:
+            dict: textfile and json_file paths, or None.
+        """
+        metrics = self.config_file_content.get("metrics") or {}
+        textfile = metrics.get("textfile")
+        json_file = metrics.get("json_file")
+
+        return {
+            "textfile": os.path.expanduser(textfile) if textfile else None,
+            "json_file": os.path.expanduser(json_file) if json_file else None,
+        }
+
+    def _parse_maintenance(self):
+        """reads the optional `maintenance` section, which controls rolling
+        update-gravity and update-pihole runs.
+
+        Returns:
+            dict: batch_size, max_unavailable, health_check, health_retries,
+            health_interval and state_file settings.
+        """
+        maintenance = self.config_file_content.get("maintenance") or {}
+        state_file = maintenance.get("state_file", "~/.cache/dnsman/maintenance.json")
+
+        return {
+            "batch_size": int(maintenance.get("batch_size", 1)),
+            "max_unavailable": int(maintenance.get("max_unavailable", 1)),
+            "health_check": bool(maintenance.get("health_check", True)),
+            "health_retries": int(maintenance.get("health_retries", 10)),
+            "health_interval": float(maintenance.get("health_interval", 6)),
+            "state_file": os.path.expanduser(state_file) if state_file else None,
+        }
+
+    def _parse_cache(self):
+        """reads the optional `cache` section. The host facts cache is only
+        enabled when `facts_file` is set, and the custom dns list cache only
+        when `custom_list_dir` is set.
+
+        Returns:
+            dict: facts_file path (or None), facts_ttl in seconds and
+            custom_list_dir path (or None).
+        """
+        cache = self.config_file_content.get("cache") or {}
+        facts_file = cache.get("facts_file")
+        custom_list_dir = cache.get("custom_list_dir")
+
+        return {
+            "facts_file": os.path.expanduser(facts_file) if facts_file else None,
+            "facts_ttl": int(cache.get("facts_ttl", 86400)),
+            "custom_list_dir": (
+                os.path.expanduser(custom_list_dir) if custom_list_dir else None
+            ),
+        }
 
 
 class Logging:
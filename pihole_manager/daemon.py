@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import queue
+import signal
+import socket
+import threading
+import socketserver
+
+from .cluster import PiHoleCluster
+
+QUEUED_OPERATIONS = {"add-dns-record": "add", "delete-dns-record": "delete"}
+
+
+class DaemonClient:
+    def __init__(self, socket_path, timeout=None) -> None:
+        self.socket_path = os.path.expanduser(socket_path)
+        self.timeout = timeout
+
+    def submit(self, request):
+        """sends one request to the daemon and waits for its response. Without
+        a timeout the client waits as long as the operation runs, a rolling
+        update can take far longer than any fixed limit.
+
+        Args:
+            request (dict): request with an `operation` key and its arguments.
+
+        Returns:
+            dict: the daemon response, with a `status` of `ok` or `error`.
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+
+        if not line:
+            return {"status": "error", "error": "Daemon closed the connection."}
+
+        return json.loads(line)
+
+    def is_running(self):
+        """determines whether a daemon is listening on the socket.
+
+        Returns:
+            bool: True when the daemon answered a ping.
+        """
+        if not os.path.exists(self.socket_path):
+            return False
+
+        try:
+            return DaemonClient(self.socket_path, timeout=2).submit(
+                {"operation": "ping"}
+            ).get("status") == "ok"
+
+        except (OSError, ValueError):
+            return False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        """reads newline delimited json requests and answers each one."""
+        for line in self.rfile:
+            try:
+                response = self.server.daemon.handle_request(json.loads(line))
+
+            except Exception as err:
+                self.server.daemon.logger.error(f"Failed to handle request: {err}")
+                response = {"status": "error", "error": str(err)}
+
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class DnsmanDaemon:
+    def __init__(self, logger, config) -> None:
+        self.logger = logger
+        self.config = config
+
+        self.socket_path = config.daemon["socket_path"]
+        self.batch_window = config.daemon["batch_window"]
+
+        self.cluster = PiHoleCluster(logger=logger, config=config)
+
+        # cluster operations read and rewrite custom.list, run them one at a time.
+        self._cluster_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._server = None
+
+    def _wait_for_batch(self):
+        """blocks until at least one queued mutation arrives, then keeps
+        collecting for `batch_window` seconds.
+
+        Returns:
+            list: pending queue items, or an empty list when stopping.
+        """
+        while not self._stopped.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+                break
+
+            except queue.Empty:
+                continue
+        else:
+            return []
+
+        deadline = time.monotonic() + self.batch_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _apply_batch(self, batch):
+        """applies a batch of queued record mutations to every host with one
+        write and one dns reload per host, then answers each waiting request
+        with its own outcome on every host.
+
+        Args:
+            batch (list): pending queue items.
+        """
+        mutations = [item["mutation"] for item in batch]
+        self.logger.info(f"Applying batch of {len(mutations)} record changes.")
+
+        try:
+            with self._cluster_lock:
+                results = self.cluster.apply_mutations(mutations)
+
+        except Exception as err:
+            self.logger.error(f"Batch failed: {err}")
+            results = None
+            error = str(err)
+
+        else:
+            error = "Record validation failed." if results is None else None
+
+        for index, item in enumerate(batch):
+            try:
+                if results is None:
+                    item["response"] = {"status": "error", "error": error}
+
+                else:
+                    item["response"] = {
+                        "status": "ok",
+                        "result": [self._mutation_result(r, index) for r in results],
+                    }
+
+            except Exception as err:
+                self.logger.error(f"Unable to build batch response: {err}")
+                item["response"] = {"status": "error", "error": str(err)}
+
+            finally:
+                # a waiting request must never be left blocked.
+                item["done"].set()
+
+        self.cluster.export_metrics()
+
+    def _mutation_result(self, host_result, index):
+        """extracts the outcome of one mutation from a per-host batch result.
+
+        Args:
+            host_result (dict): per-host result from the cluster.
+            index (int): position of the mutation in the batch.
+
+        Returns:
+            dict: the host `hostname` and its `result` or `error`.
+        """
+        result = host_result.get("result")
+        if result is None or "error" in host_result:
+            return {
+                "hostname": host_result["hostname"],
+                "error": host_result.get("error", "Unable to read custom dns."),
+            }
+
+        if "error" in result.keys():
+            return {"hostname": host_result["hostname"], "error": result["error"]}
+
+        outcomes = result.get("outcomes") or []
+        if index >= len(outcomes):
+            # another process already pushed the journaled change to the host.
+            return {"hostname": host_result["hostname"], "result": {"outcome": "applied"}}
+
+        return {
+            "hostname": host_result["hostname"],
+            "result": {"outcome": outcomes[index]},
+        }
+
+    def _batch_worker(self):
+        """applies queued record mutations in batches until stopped."""
+        while not self._stopped.is_set():
+            batch = self._wait_for_batch()
+            if not batch:
+                continue
+
+            try:
+                self._apply_batch(batch)
+
+            except Exception as err:
+                self.logger.error(f"Batch worker error: {err}")
+                for item in batch:
+                    if not item["done"].is_set():
+                        item["response"] = {"status": "error", "error": str(err)}
+                        item["done"].set()
+
+    def _enqueue(self, operation, ip, hostname):
+        """queues a single record mutation and waits for its batch.
+
+        Args:
+            operation (str): `add` or `delete`.
+            ip (str): ip address.
+            hostname (str): dns hostname.
+
+        Returns:
+            dict: the response for this mutation.
+        """
+        if not self.cluster.validator.validate(ip=ip, hostname=hostname):
+            return {"status": "error", "error": f"Invalid record: {hostname}={ip}"}
+
+        item = {
+            "mutation": (operation, ip, hostname),
+            "done": threading.Event(),
+            "response": None,
+        }
+        self._queue.put(item)
+        item["done"].wait()
+
+        return item["response"]
+
+    def handle_request(self, request):
+        """runs one client request. Single record additions and deletions are
+        queued and applied in batches, everything else runs right away.
+
+        Args:
+            request (dict): request with an `operation` key and its arguments.
+
+        Returns:
+            dict: response with a `status` of `ok` or `error`.
+        """
+        operation = request.get("operation")
+        self.logger.debug(f"Received request: {operation}")
+
+        if operation == "ping":
+            return {"status": "ok"}
+
+        if operation == "metrics":
+            if request.get("format") == "prometheus":
+                return {"status": "ok", "result": self.cluster.metrics.to_prometheus()}
+            return {"status": "ok", "result": self.cluster.metrics.snapshot()}
+
+        if operation in QUEUED_OPERATIONS:
+            return self._enqueue(
+                QUEUED_OPERATIONS[operation],
+                request.get("ipaddress"),
+                request.get("hostname"),
+            )
+
+        records = [tuple(record) for record in request.get("records") or []]
+        handlers = {
+            "check-record-sync": lambda: self.cluster.check_record_sync(
+                ip=request.get("ipaddress"), host=request.get("hostname")
+            ),
+            "bulk-add": lambda: self.cluster.bulk_add_records(records),
+            "bulk-delete": lambda: self.cluster.bulk_delete_records(records),
+            "apply": lambda: self.cluster.apply_records(records),
+            "replay": self.cluster.replay_journal,
+            "drift-report": self.cluster.drift_report,
+            "update-gravity": lambda: self.cluster.invoke_gravity_update(
+                start_from=request.get("start_from") or 0,
+                resume=bool(request.get("resume")),
+            ),
+            "update-pihole": lambda: self.cluster.invoke_pihole_update(
+                start_from=request.get("start_from") or 0,
+                resume=bool(request.get("resume")),
+            ),
+        }
+        if operation not in handlers:
+            return {"status": "error", "error": f"Unsupported operation: {operation}"}
+
+        with self._cluster_lock:
+            result = handlers[operation]()
+
+        self.cluster.export_metrics()
+
+        if result is None:
+            return {"status": "error", "error": f"{operation} failed, see daemon log."}
+
+        return {"status": "ok", "result": result}
+
+    def _prepare_socket(self):
+        """removes a stale socket file left behind by a daemon that did not
+        shut down cleanly, refusing to start if a daemon is still running.
+        """
+        if not os.path.exists(self.socket_path):
+            os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+            return
+
+        if DaemonClient(self.socket_path).is_running():
+            raise RuntimeError(f"dnsman daemon already running on {self.socket_path}")
+
+        os.unlink(self.socket_path)
+
+    def shutdown(self):
+        """stops a running serve loop from another thread."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def serve(self):
+        """listens on the unix socket until SIGTERM or ctrl-c, keeping config
+        and pooled ssh connections warm between requests.
+        """
+        self._prepare_socket()
+
+        self._server = _UnixServer(self.socket_path, _RequestHandler)
+        self._server.daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+        worker = threading.Thread(target=self._batch_worker, name="dnsman-batch")
+        worker.start()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(
+                signal.SIGTERM,
+                lambda signum, frame: threading.Thread(target=self.shutdown).start(),
+            )
+
+        self.logger.info(f"dnsman daemon listening on: {self.socket_path}")
+        try:
+            self._server.serve_forever()
+
+        except KeyboardInterrupt:
+            self.logger.info("dnsman daemon interrupted.")
+
+        finally:
+            self._stopped.set()
+            worker.join()
+            self._server.server_close()
+            self.cluster.close()
+
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+            self.logger.info("dnsman daemon stopped.")
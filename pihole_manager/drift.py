@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import json
+
+
+def build_drift_report(host_records, unreachable=()):
+    """compares the custom dns records of every host in one pass and builds a
+    record by host presence matrix. Hostnames are compared case-insensitively,
+    like dns.
+
+    Args:
+        host_records (dict): (ip, hostname) tuple lists keyed by pihole
+            hostname, in config order.
+        unreachable (iterable, optional): pihole hostnames that could not be
+            read. They are listed but left out of the matrix.
+
+    Returns:
+        dict: the `hosts` compared, the `unreachable` hosts, the `matrix` with
+        one row per record, records `missing` on some hosts, hostnames that
+        `conflict` by resolving to different ips on different hosts, records
+        listed more than once on a host as `duplicates`, and `in_sync`.
+    """
+    hosts = list(host_records)
+
+    matrix = {}
+    host_ips = {}
+    duplicates = []
+    for host, records in host_records.items():
+        counts = {}
+        for ip, hostname in records:
+            key = (ip, hostname.lower())
+            counts[key] = counts.get(key, 0) + 1
+
+            row = matrix.setdefault(
+                key, {"ip": ip, "hostname": hostname, "hosts": dict.fromkeys(hosts, False)}
+            )
+            row["hosts"][host] = True
+            host_ips.setdefault(hostname.lower(), {}).setdefault(host, set()).add(ip)
+
+        duplicates.extend(
+            {"host": host, "ip": ip, "hostname": hostname, "count": count}
+            for (ip, hostname), count in counts.items()
+            if count > 1
+        )
+
+    rows = sorted(matrix.values(), key=lambda row: (row["hostname"].lower(), row["ip"]))
+    missing = [
+        {
+            "ip": row["ip"],
+            "hostname": row["hostname"],
+            "missing_on": [host for host, present in row["hosts"].items() if not present],
+        }
+        for row in rows
+        if not all(row["hosts"].values())
+    ]
+
+    conflicts = [
+        {
+            "hostname": hostname,
+            "ips": {host: sorted(ips) for host, ips in by_host.items()},
+        }
+        for hostname, by_host in sorted(host_ips.items())
+        if len({frozenset(ips) for ips in by_host.values()}) > 1
+    ]
+
+    return {
+        "hosts": hosts,
+        "unreachable": list(unreachable),
+        "matrix": rows,
+        "missing": missing,
+        "conflicts": conflicts,
+        "duplicates": duplicates,
+        "in_sync": not (missing or conflicts or duplicates or unreachable),
+    }
+
+
+def render_drift_table(report):
+    """renders a drift report as plain text tables.
+
+    Args:
+        report (dict): report from build_drift_report.
+
+    Returns:
+        str: the presence matrix followed by the drift findings.
+    """
+    header = ["RECORD"] + report["hosts"]
+    table = [header] + [
+        [f"{row['ip']} {row['hostname']}"]
+        + ["x" if row["hosts"][host] else "-" for host in report["hosts"]]
+        for row in report["matrix"]
+    ]
+    widths = [max(len(line[column]) for line in table) for column in range(len(header))]
+
+    lines = [
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip()
+        for line in table
+    ]
+
+    if report["unreachable"]:
+        lines.append("")
+        lines.append(f"Unreachable hosts: {', '.join(report['unreachable'])}")
+
+    if report["missing"]:
+        lines.append("")
+        lines.append("Missing records:")
+        lines.extend(
+            f"  {item['ip']} {item['hostname']} missing on: {', '.join(item['missing_on'])}"
+            for item in report["missing"]
+        )
+
+    if report["conflicts"]:
+        lines.append("")
+        lines.append("Conflicting hostnames:")
+        for item in report["conflicts"]:
+            ips = "; ".join(
+                f"{host}={','.join(ips)}" for host, ips in item["ips"].items()
+            )
+            lines.append(f"  {item['hostname']}: {ips}")
+
+    if report["duplicates"]:
+        lines.append("")
+        lines.append("Duplicate records:")
+        lines.extend(
+            f"  {item['host']}: {item['ip']} {item['hostname']} x{item['count']}"
+            for item in report["duplicates"]
+        )
+
+    lines.append("")
+    lines.append("Cluster is in sync." if report["in_sync"] else "Cluster has drifted.")
+
+    return "\n".join(lines)
+
+
+def render_drift_report(report, output_format="table"):
+    """renders a drift report in the requested format.
+
+    Args:
+        report (dict): report from build_drift_report.
+        output_format (str, optional): `table` or `json`. Defaults to table.
+
+    Returns:
+        str: rendered report.
+    """
+    if output_format == "json":
+        return json.dumps(report, indent=2)
+
+    return render_drift_table(report)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import fcntl
+import threading
+from contextlib import contextmanager
+
+
+class Journal:
+    def __init__(self, path) -> None:
+        self.path = os.path.expanduser(path)
+        self.acks_path = f"{self.path}.acks"
+
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, path):
+        """holds an exclusive flock on path, shared with every other process
+        using the journal, and the thread lock of this instance.
+
+        Args:
+            path (str): file to lock, created if missing.
+
+        Yields:
+            file: the locked file, opened for reading and appending.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock, open(path, "a+") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield file
+
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _parse_entries(lines):
+        """parses journal lines, skipping torn lines left behind by a crash.
+
+        Args:
+            lines (iterable): journal file lines.
+
+        Returns:
+            list: journal entries in sequence order.
+        """
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+
+            except ValueError:
+                continue
+
+        return entries
+
+    def _read_entries(self):
+        """reads every complete entry from the journal file.
+
+        Returns:
+            list: journal entries in sequence order.
+        """
+        try:
+            with open(self.path, "r") as file:
+                return self._parse_entries(file)
+
+        except FileNotFoundError:
+            return []
+
+    def _load_acks(self):
+        """reads the per-host acknowledgment offsets from disk, so offsets
+        written by other processes are seen.
+
+        Returns:
+            dict: highest acknowledged sequence number keyed by hostname.
+        """
+        try:
+            with open(self.acks_path, "r") as file:
+                return json.load(file)
+
+        except (OSError, ValueError):
+            return {}
+
+    def head(self):
+        """returns the sequence number of the newest journal entry.
+
+        Returns:
+            int: newest sequence number, 0 for an empty journal.
+        """
+        entries = self._read_entries()
+        return entries[-1]["seq"] if entries else 0
+
+    def append(self, mutations):
+        """durably appends record mutations to the journal before they are
+        sent to any host. The head is derived from the file while it is
+        locked, so processes sharing the journal never hand out the same
+        sequence number, and a torn last line is terminated first so the new
+        entries stay readable.
+
+        Args:
+            mutations (list): (operation, ip, hostname) tuples.
+
+        Returns:
+            list: sequence numbers assigned to the mutations, in order.
+        """
+        with self._locked(self.path) as file:
+            file.seek(0)
+            content = file.read()
+            entries = self._parse_entries(content.splitlines())
+            head = entries[-1]["seq"] if entries else 0
+
+            if content and not content.endswith("\n"):
+                file.write("\n")
+
+            seqs = []
+            for operation, ip, hostname in mutations:
+                head += 1
+                entry = {
+                    "seq": head,
+                    "operation": operation,
+                    "ip": ip,
+                    "hostname": hostname,
+                    "time": time.time(),
+                }
+                file.write(json.dumps(entry) + "\n")
+                seqs.append(head)
+
+            file.flush()
+            os.fsync(file.fileno())
+
+            return seqs
+
+    def acked(self, hostname):
+        """returns the highest sequence number applied to a host.
+
+        Args:
+            hostname (str): pihole server hostname.
+
+        Returns:
+            int: acknowledged sequence number, 0 if the host never acked.
+        """
+        return self._load_acks().get(hostname, 0)
+
+    def pending(self, hostname):
+        """returns the journal entries a host has not acknowledged yet.
+
+        Args:
+            hostname (str): pihole server hostname.
+
+        Returns:
+            list: un-acked journal entries in sequence order.
+        """
+        acked = self.acked(hostname)
+        return [entry for entry in self._read_entries() if entry["seq"] > acked]
+
+    def ack(self, hostname, seq):
+        """records that a host has applied every entry up to seq.
+
+        Args:
+            hostname (str): pihole server hostname.
+            seq (int): highest sequence number the host applied.
+        """
+        with self._locked(f"{self.acks_path}.lock"):
+            acks = self._load_acks()
+            if seq <= acks.get(hostname, 0):
+                return
+
+            acks[hostname] = seq
+
+            tmp_path = f"{self.acks_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(acks, file)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(tmp_path, self.acks_path)
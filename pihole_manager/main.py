@@ -1,10 +1,54 @@
 #!/usr/bin/env python3
 
 import sys
+import atexit
 
 from pihole_manager.arguments import Arguments
 from pihole_manager.config import Logging, Config
-from pihole_manager.cluster import PiHoleCluster
+from pihole_manager.drift import render_drift_report
+from pihole_manager.records import load_records
+from pihole_manager.tracing import Tracer, trace_span
+
+
+def forward_to_daemon(options, records, config, logger):
+    """sends the operation to a running dnsman daemon, if there is one.
+
+    Args:
+        options (dict): validated command line options.
+        records (list): records loaded from the records file, if any.
+        config (Config): loaded configuration.
+        logger (Logger): application logger.
+
+    Returns:
+        dict: the daemon response, or None when no daemon is running or it
+        could not be reached, in which case the operation runs locally.
+    """
+    from pihole_manager.daemon import DaemonClient
+
+    client = DaemonClient(config.daemon["socket_path"])
+    if not client.is_running():
+        return None
+
+    logger.info(f"Forwarding operation to dnsman daemon: {client.socket_path}")
+    request = {
+        "operation": options["operation"]["command"],
+        "ipaddress": options.get("ipaddress"),
+        "hostname": options.get("hostname"),
+        "records": records,
+        "start_from": options.get("start_from", 0),
+        "resume": options.get("resume", False),
+    }
+
+    try:
+        return client.submit(request)
+
+    except (ConnectionRefusedError, FileNotFoundError) as err:
+        # nothing was sent, the daemon stopped after answering the ping.
+        logger.warning(f"dnsman daemon went away, running locally: {err}")
+        return None
+
+    except (OSError, ValueError) as err:
+        return {"status": "error", "error": f"Lost connection to dnsman daemon: {err}"}
 
 
 def main():
@@ -22,26 +66,104 @@ def main():
 
     logger.info(f"pihole-manager started. Running on platform: {config.platform}.")
 
-    cluster = PiHoleCluster(logger=logger, config=config)
-
-    if options["operation"]["command"] == "add-dns-record":
-        cluster.add_pihole_record(ip=options["ipaddress"], host=options["hostname"])
-
-    elif options["operation"]["command"] == "delete-dns-record":
-        cluster.delete_pihole_record(ip=options["ipaddress"], host=options["hostname"])
-
-    elif options["operation"]["command"] == "check-record-sync":
-        cluster.check_record_sync(ip=options["ipaddress"], host=options["hostname"])
-
-    elif options["operation"]["command"] == "update-pihole":
-        cluster.invoke_pihole_update()
-
-    elif options["operation"]["command"] == "update-gravity":
-        cluster.invoke_gravity_update()
-
-    else:
-        logger.error("Unsupported operation provided. Try again.")
-        sys.exit(2)
+    records = None
+    if "records_file" in options:
+        try:
+            records = load_records(options["records_file"])
+
+        except (OSError, ValueError) as err:
+            logger.error(f"Unable to read records file: {err}")
+            sys.exit(1)
+
+    # the cluster and daemon modules are only imported once a remote
+    # operation runs, keeping `dnsman -h` and argument errors fast.
+    if options["operation"]["command"] == "serve":
+        from pihole_manager.daemon import DnsmanDaemon
+
+        DnsmanDaemon(logger=logger, config=config).serve()
+        sys.exit(0)
+
+    tracer = None
+    if options.get("trace"):
+        tracer = Tracer()
+        # written at exit, so runs ending in sys.exit are traced as well.
+        atexit.register(tracer.write, options["trace"])
+
+    # a traced run always executes locally, so the timeline covers the work.
+    response = None
+    if tracer is None:
+        response = forward_to_daemon(options, records, config, logger)
+
+    if response is not None:
+        if response["status"] != "ok":
+            logger.error(f"dnsman daemon error: {response['error']}")
+            sys.exit(1)
+
+        if options["operation"]["command"] == "drift-report":
+            print(render_drift_report(response["result"], options["format"]))
+            sys.exit(0 if response["result"]["in_sync"] else 1)
+
+        logger.info(f"dnsman daemon result: {response['result']}")
+
+        if options["operation"]["command"] in ("update-pihole", "update-gravity"):
+            if not response["result"]:
+                sys.exit(1)
+
+        logger.info("pihole-manager has finished.")
+        sys.exit(0)
+
+    from pihole_manager.cluster import PiHoleCluster
+
+    operation_span = trace_span(tracer, options["operation"]["command"], "operation")
+    with PiHoleCluster(logger=logger, config=config, tracer=tracer) as cluster, operation_span:
+        if options["operation"]["command"] == "add-dns-record":
+            cluster.add_pihole_record(ip=options["ipaddress"], host=options["hostname"])
+
+        elif options["operation"]["command"] == "delete-dns-record":
+            cluster.delete_pihole_record(
+                ip=options["ipaddress"], host=options["hostname"]
+            )
+
+        elif options["operation"]["command"] == "check-record-sync":
+            cluster.check_record_sync(ip=options["ipaddress"], host=options["hostname"])
+
+        elif options["operation"]["command"] in ("bulk-add", "bulk-delete", "apply"):
+            if options["operation"]["command"] == "bulk-add":
+                results = cluster.bulk_add_records(records)
+            elif options["operation"]["command"] == "bulk-delete":
+                results = cluster.bulk_delete_records(records)
+            else:
+                results = cluster.apply_records(records)
+
+            if results is None:
+                sys.exit(1)
+
+        elif options["operation"]["command"] == "drift-report":
+            report = cluster.drift_report()
+            print(render_drift_report(report, options["format"]))
+
+            if not report["in_sync"]:
+                sys.exit(1)
+
+        elif options["operation"]["command"] == "replay":
+            if cluster.replay_journal() is None:
+                sys.exit(1)
+
+        elif options["operation"]["command"] == "update-pihole":
+            if not cluster.invoke_pihole_update(
+                start_from=options["start_from"], resume=options["resume"]
+            ):
+                sys.exit(1)
+
+        elif options["operation"]["command"] == "update-gravity":
+            if not cluster.invoke_gravity_update(
+                start_from=options["start_from"], resume=options["resume"]
+            ):
+                sys.exit(1)
+
+        else:
+            logger.error("Unsupported operation provided. Try again.")
+            sys.exit(2)
 
     logger.info("pihole-manager has finished.")
     sys.exit(0)
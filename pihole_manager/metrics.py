@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from contextlib import ExitStack, contextmanager
+
+from .tracing import trace_span
+
+# seconds, from a fast local command up to a slow gravity run.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900
+)
+
+METRIC_NAME = "dnsman_phase_duration_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """records one observation.
+
+        Args:
+            value (float): observed duration in seconds.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self):
+        """returns the cumulative bucket counts, prometheus style.
+
+        Returns:
+            list: (upper bound, count) tuples, the last bound being `+Inf`.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        total, cumulative = 0, []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+
+        return cumulative
+
+
+def _escape_label(value):
+    """escapes a prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._local = threading.local()
+
+    @contextmanager
+    def operation(self, name):
+        """labels every phase timed on this thread inside the block with the
+        cluster operation it belongs to.
+
+        Args:
+            name (str): operation name, e.g. `add_record`.
+        """
+        previous = getattr(self._local, "operation", "")
+        self._local.operation = name
+        try:
+            yield
+
+        finally:
+            self._local.operation = previous
+
+    def observe(self, phase, host, seconds, operation=None):
+        """records the duration of one phase on a host.
+
+        Args:
+            phase (str): phase name, e.g. `connect` or `reload`.
+            host (str): pihole server hostname.
+            seconds (float): measured duration.
+            operation (str, optional): operation label. Defaults to the
+                operation active on this thread.
+        """
+        if operation is None:
+            operation = getattr(self._local, "operation", "")
+
+        key = (host, operation, phase)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, phase, host):
+        """times the block with a monotonic clock and records it, even when the
+        block raises.
+
+        Args:
+            phase (str): phase name.
+            host (str): pihole server hostname.
+        """
+        start = time.monotonic()
+        try:
+            yield
+
+        finally:
+            self.observe(phase, host, time.monotonic() - start)
+
+    def snapshot(self):
+        """returns every histogram as json serializable data.
+
+        Returns:
+            dict: `phases`, one entry per host, operation and phase.
+        """
+        with self._lock:
+            items = sorted(self._histograms.items())
+            phases = [
+                {
+                    "host": host,
+                    "operation": operation,
+                    "phase": phase,
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "min": histogram.min,
+                    "max": histogram.max,
+                    "buckets": dict(histogram.cumulative()),
+                }
+                for (host, operation, phase), histogram in items
+            ]
+
+        return {"phases": phases}
+
+    def to_json(self):
+        """renders the metrics as json.
+
+        Returns:
+            str: json document.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """renders the metrics in the prometheus text exposition format, as
+        read by the node exporter textfile collector.
+
+        Returns:
+            str: exposition text.
+        """
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each phase of a pihole operation.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for phase in self.snapshot()["phases"]:
+            labels = ",".join(
+                f'{name}="{_escape_label(phase[name])}"'
+                for name in ("host", "operation", "phase")
+            )
+            for bound, count in phase["buckets"].items():
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {count}')
+
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {phase['sum']}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {phase['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, output_format):
+        """writes the metrics to a file atomically, so a collector never reads
+        a partial file.
+
+        Args:
+            path (str): destination file.
+            output_format (str): `prometheus` or `json`.
+        """
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        content = self.to_json() if output_format == "json" else self.to_prometheus()
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(content)
+
+        os.replace(tmp_path, path)
+
+
+def timed(phase):
+    """decorates a PiHole method so its duration is recorded as a phase of the
+    host, when the instance has a metrics registry, and as a trace span, when
+    it has a tracer.
+
+    Args:
+        phase (str): phase name.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with ExitStack() as stack:
+                metrics = getattr(self, "metrics", None)
+                if metrics is not None:
+                    stack.enter_context(metrics.timer(phase, self.hostname))
+
+                stack.enter_context(
+                    trace_span(getattr(self, "tracer", None), phase, "phase", host=self.hostname)
+                )
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,12 +1,140 @@
 #!/usr/bin/env python3
 
-import paramiko
-
+import re
+import time
+import uuid
+import codecs
+import socket
+import shlex
+import hashlib
+import threading
+import posixpath
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from .records import (
+    CustomListSnapshot,
+    apply_mutations,
+    diff_records,
+    edit_custom_list,
+    parse_custom_list,
+    render_custom_list,
+)
+from .metrics import timed
+from .tracing import trace_span
 from .validators import PiHoleInstanceValidator
 
+CUSTOM_LIST_PATH = "/etc/pihole/custom.list"
+PLATFORM_COMMAND = 'cat /etc/os-release|grep "ID=raspbian"'
+
+# runs as root through `sudo sh -s -- <add|delete> <ip> <hostname> <reload>`.
+# The check, the write and the reload happen in one ssh round trip while
+# holding a lock, so concurrent operators cannot interleave check and write.
+# Every outcome ends with one `DNSMAN_STATUS <status> [sha256]` line.
+RECORD_TRANSACTION_SCRIPT = r"""
+set -u
+exec 2>&1
+umask 022
+action=$1 ip=$2 host=$3 reload=$4
+list=/etc/pihole/custom.list
+
+status() { echo "DNSMAN_STATUS $*"; exit 0; }
+
+grep -qx 'ID=raspbian' /etc/os-release || status not_raspbian
+exec 9>"$list.dnsman.lock" || status write_failed
+flock -w 30 9 || status lock_timeout
+[ -e "$list" ] || : > "$list" || status write_failed
+tmp=$(mktemp "$list.dnsman.XXXXXX") || status write_failed
+
+case $action in
+add)
+    if awk -v ip="$ip" '
+        { c = index($0, "#"); if (c) $0 = substr($0, 1, c - 1) }
+        NF >= 2 && $1 == ip { found = 1; exit }
+        END { exit found ? 0 : 1 }' "$list"; then
+        rm -f "$tmp"; status exists
+    fi
+    cat "$list" > "$tmp" || { rm -f "$tmp"; status write_failed; }
+    [ -s "$tmp" ] && [ -n "$(tail -c 1 "$tmp")" ] && echo >> "$tmp"
+    printf '%s %s\n' "$ip" "$host" >> "$tmp" || { rm -f "$tmp"; status write_failed; }
+    ;;
+delete)
+    if ! awk -v ip="$ip" -v host="$host" '
+        BEGIN { host = tolower(host) }
+        {
+            raw = $0; c = index(raw, "#")
+            n = split(c ? substr(raw, 1, c - 1) : raw, f, " ")
+            if (n < 2 || f[1] != ip) { print raw; next }
+            out = f[1]; hit = 0
+            for (i = 2; i <= n; i++) {
+                if (tolower(f[i]) == host) hit = 1; else out = out " " f[i]
+            }
+            if (!hit) { print raw; next }
+            removed = 1
+            if (out != f[1]) print out (c ? " " substr(raw, c) : "")
+            else if (c) print substr(raw, c)
+        }
+        END { exit removed ? 0 : 1 }' "$list" > "$tmp"; then
+        rm -f "$tmp"; status missing
+    fi
+    ;;
+*)
+    rm -f "$tmp"; status invalid_action
+    ;;
+esac
+
+chmod 644 "$tmp" && mv -f "$tmp" "$list" || { rm -f "$tmp"; status write_failed; }
+sha256=$(sha256sum "$list" | cut -d " " -f 1)
+
+if [ "$reload" = 1 ]; then
+    pihole restartdns reload > /dev/null || status reload_failed "$sha256"
+    status reloaded "$sha256"
+fi
+status written "$sha256"
+"""
+
+# installs an uploaded custom.list under the same lock as the record
+# transaction, and only when the remote file still has the sha256 the new
+# contents were computed from.
+WRITE_CUSTOM_LIST_SCRIPT = r"""
+set -u
+exec 2>&1
+umask 022
+upload=$1 expected=$2
+list=/etc/pihole/custom.list
+
+status() { rm -f "$upload"; echo "DNSMAN_STATUS $*"; exit 0; }
+
+exec 9>"$list.dnsman.lock" || status write_failed
+flock -w 30 9 || status lock_timeout
+current=$(sha256sum "$list" 2>/dev/null | cut -d " " -f 1)
+[ "$current" = "$expected" ] || status conflict "$current"
+install -m 644 "$upload" "$list.dnsman" && mv -f "$list.dnsman" "$list" || status write_failed
+status written
+"""
+
+STREAM_CHUNK_SIZE = 32768
+STREAM_POLL_INTERVAL = 0.05
+# pihole redraws progress lines with a bare carriage return.
+STREAM_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
 
 class PiHole:
-    def __init__(self, hostname, port, username, key_file, logger) -> None:
+    def __init__(
+        self,
+        hostname,
+        port,
+        username,
+        key_file,
+        logger,
+        facts_cache=None,
+        custom_list_cache=None,
+        min_reload_interval=0,
+        timeouts=None,
+        metrics=None,
+        tracer=None,
+        max_channels=4,
+    ) -> None:
         self.hostname = hostname
         self.port = port
         self.username = username
@@ -15,8 +143,30 @@ class PiHole:
         self.logger = logger
         self.client = None
 
+        self.metrics = metrics
+        self.tracer = tracer
+        self.timeouts = dict(timeouts or {})
+        # concurrent exec channels opened on the transport by execute_many.
+        self.max_channels = max(1, int(max_channels))
+        # monotonic time after which no new command is started on this host.
+        self.deadline = None
+
+        self.facts_cache = facts_cache
+        self.custom_list_cache = custom_list_cache
+        self._platform = None
+        self._snapshot = None
+        self._snapshot_stale = False
+
+        self.min_reload_interval = min_reload_interval
+        self.last_reload_result = None
+        self._reload_lock = threading.Lock()
+        self._session_depth = 0
+        self._dirty = False
+        self._last_reload = None
+
         self.validator = PiHoleInstanceValidator(self.logger)
 
+    @timed("platform_check")
     def _get_remote_platform(self):
         """_summary_
 
@@ -24,8 +174,8 @@ class PiHole:
             _type_: _description_
         """
         try:           
-            command = 'cat /etc/os-release|grep "ID=raspbian"'
-            _, stdout, stderr = self.client.exec_command(command)
+            command = PLATFORM_COMMAND
+            _, stdout, stderr = self._exec_command(command)
 
             output = str(stdout.read().decode("utf-8"))
             error = str(stderr.read().decode("utf-8"))
@@ -47,52 +197,447 @@ class PiHole:
             self.logger.error(f"Unable to fetch platform information. Error={err}")
             return None
 
-    def _execute(self, cmd):
-        """_summary_
+    def _host_key_fingerprint(self):
+        """computes the sha256 fingerprint of the remote ssh host key.
+
+        Returns:
+            str: hex digest of the host key, or None if unavailable.
+        """
+        try:
+            key = self.client.get_transport().get_remote_server_key()
+            return hashlib.sha256(key.asbytes()).hexdigest()
+
+        except Exception as err:
+            self.logger.debug(f"Unable to read host key fingerprint. Error={err}")
+            return None
+
+    def _get_platform(self):
+        """returns the remote platform, checking the remote host at most once per
+        connection. When a host facts cache is configured, the platform is also
+        looked up there by host key fingerprint before asking the remote host.
+
+        Returns:
+            str: the remote platform id, or None/error dict from the check.
+        """
+        platform = self._known_platform()
+        if platform is not None:
+            return platform
+
+        platform = self._get_remote_platform()
+        if isinstance(platform, str):
+            self._store_platform(platform)
+
+        return platform
+
+    def _known_platform(self):
+        """returns the platform when it is known without asking the remote
+        host, from this connection or from the host facts cache.
+
+        Returns:
+            str: the platform id, or None when it is not known yet.
+        """
+        if self._platform is not None or self.facts_cache is None:
+            return self._platform
+
+        fingerprint = self._host_key_fingerprint()
+        if fingerprint is not None:
+            self._platform = self.facts_cache.get(
+                self.hostname, self.port, fingerprint, "platform"
+            )
+            if self._platform is not None:
+                self.logger.debug(f"Using cached platform: {self._platform}")
+
+        return self._platform
+
+    def _store_platform(self, platform):
+        """remembers the platform for this connection and, when a host facts
+        cache is configured, for later connections to the same host key.
 
         Args:
-            cmd (_type_): _description_
+            platform (str): the platform id.
+        """
+        self._platform = platform
+        if self.facts_cache is None:
+            return
+
+        fingerprint = self._host_key_fingerprint()
+        if fingerprint is not None:
+            self.facts_cache.set(self.hostname, self.port, fingerprint, "platform", platform)
+
+    def _command_timeout(self):
+        """works out how long the next command may run, from the configured
+        command timeout and the operation deadline, whichever is sooner.
 
         Returns:
-            _type_: _description_
+            float: seconds, or None to wait forever.
+        """
+        timeout = self.timeouts.get("command")
+
+        if self.deadline is not None:
+            remaining = max(0.001, self.deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        return timeout
+
+    def _exec_command(self, cmd):
+        """starts a command, applying the command timeout to its channel.
+
+        Args:
+            cmd (str): command to run.
+
+        Returns:
+            tuple: paramiko stdin, stdout and stderr files.
+        """
+        timeout = self._command_timeout()
+        if timeout is None:
+            return self.client.exec_command(cmd)
+
+        return self.client.exec_command(cmd, timeout=timeout)
+
+    def _check_executable(self, check_platform=True):
+        """makes sure commands can be run on this host.
+
+        Args:
+            check_platform (bool, optional): check the remote platform too.
+                Defaults to True, pass False for scripts that check it
+                themselves.
+
+        Returns:
+            dict: an `error` result when commands cannot run, otherwise None.
         """
         if self.client is None:
             self.logger.error("No available pihole client. Cannot execute command.")
             return {"error": "No available pihole client. Cannot execute command."}
 
-        platform = self._get_remote_platform()        
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.logger.error(f"Operation deadline exceeded on {self.hostname}.")
+            return {"error": "Operation deadline exceeded."}
+
+        if not check_platform:
+            return None
+
+        platform = self._get_platform()
         if platform != "raspbian":
             self.logger.error("Not a raspbian host. Cannot execute command.")
             return {'error': "Not a raspbian host. Cannot execute command."}
 
-        else:
-            self.logger.info(f"Executing command on platform: {platform}")
+        self.logger.info(f"Executing command on platform: {platform}")
+        return None
+
+    def _execute(self, cmd, stdin_data=None, strip=True, check_platform=True):
+        """_summary_
+
+        Args:
+            cmd (_type_): _description_
+            stdin_data (str, optional): text written to the command's stdin.
+            strip (bool, optional): strip newlines from the output. Defaults
+                to True, pass False when the exact output bytes matter.
+            check_platform (bool, optional): check the remote platform before
+                running the command. Defaults to True.
+
+        Returns:
+            _type_: _description_
+        """
+        not_ready = self._check_executable(check_platform=check_platform)
+        if not_ready is not None:
+            return not_ready
+
+        with trace_span(self.tracer, cmd, "command", host=self.hostname):
+            stdin, stdout, stderr = self._exec_command(cmd)
+
+            try:
+                if stdin_data is not None:
+                    stdin.write(stdin_data)
+                    stdin.channel.shutdown_write()
+
+                output = stdout.read().decode("utf-8")
+                error = stderr.read().decode("utf-8")
+
+            except socket.timeout:
+                stdout.channel.close()
+                self.logger.error(f"Command timed out on {self.hostname}: {cmd}")
+                return {"error": f"Command timed out: {cmd}"}
+
+
+            if len(error) > 0:
+                self.logger.error(f"Received command execution error: {error}")
+                return {"error": error.strip("\n")}
+
+            return {"output": output.strip("\n") if strip else output}
+
+    def _execute_stream(self, cmd, on_line=None, tail_lines=200):
+        """runs a command and hands its output to on_line line by line as it
+        arrives, instead of buffering everything until the command exits. Only
+        the last tail_lines lines of each stream are kept for the result, so
+        memory stays flat however much the command prints.
+
+        Args:
+            cmd (str): command to run.
+            on_line (callable, optional): called as on_line(stream, line) for
+                every line, where stream is `stdout` or `stderr`.
+            tail_lines (int, optional): lines of each stream kept for the
+                result. Defaults to 200.
 
-        _, stdout, stderr = self.client.exec_command(cmd)
+        Returns:
+            dict: the `output` and `stderr` tails and the command
+            `exit_status`. Long-running pihole commands print progress to
+            stderr, so `error` is only set when the command exited non-zero or
+            timed out.
+        """
+        not_ready = self._check_executable()
+        if not_ready is not None:
+            return not_ready
+
+        timeout = self._command_timeout()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        _, stdout, _ = self._exec_command(cmd)
+        channel = stdout.channel
+
+        streams = {
+            name: {
+                "decoder": codecs.getincrementaldecoder("utf-8")(errors="replace"),
+                "partial": "",
+                "tail": deque(maxlen=tail_lines),
+            }
+            for name in ("stdout", "stderr")
+        }
+
+        def feed(name, data, final=False):
+            stream = streams[name]
+            text = stream["partial"] + stream["decoder"].decode(data, final=final)
+            lines = STREAM_LINE_BREAK.split(text)
+            stream["partial"] = "" if final else lines.pop()
+
+            for line in lines:
+                if not line:
+                    continue
+
+                stream["tail"].append(line)
+                if on_line is not None:
+                    on_line(name, line)
+
+        while True:
+            received = False
+            if channel.recv_ready():
+                feed("stdout", channel.recv(STREAM_CHUNK_SIZE))
+                received = True
+
+            if channel.recv_stderr_ready():
+                feed("stderr", channel.recv_stderr(STREAM_CHUNK_SIZE))
+                received = True
+
+            if received:
+                continue
+
+            if channel.exit_status_ready():
+                if not (channel.recv_ready() or channel.recv_stderr_ready()):
+                    break
+                continue
+
+            if deadline is not None and time.monotonic() >= deadline:
+                channel.close()
+                self.logger.error(f"Command timed out on {self.hostname}: {cmd}")
+                return {"error": f"Command timed out: {cmd}", "exit_status": None}
+
+            time.sleep(STREAM_POLL_INTERVAL)
+
+        feed("stdout", b"", final=True)
+        feed("stderr", b"", final=True)
+        exit_status = channel.recv_exit_status()
+
+        result = {
+            "output": "\n".join(streams["stdout"]["tail"]),
+            "stderr": "\n".join(streams["stderr"]["tail"]),
+            "exit_status": exit_status,
+        }
+        if exit_status != 0:
+            result["error"] = result["stderr"] or f"Exit status {exit_status}."
+            self.logger.error(f"Received command execution error: {result['error']}")
 
-        output = stdout.read().decode("utf-8")
-        error = stderr.read().decode("utf-8")
-                
-        if len(error) > 0:
-            self.logger.error(f"Received command execution error: {error}")
-            return {"error": error.strip("\n")}
+        return result
 
-        return {"output": output.strip("\n")}
+    @timed("execute_many")
+    def execute_many(self, commands, strip=True):
+        """runs independent read-only commands concurrently, each on its own
+        exec channel of the existing ssh transport, with at most max_channels
+        open at once. A group of commands costs about one round trip instead
+        of one per command. When the platform is not known yet, the platform
+        check runs in the same group and the results are only returned once
+        it passed.
 
+        Args:
+            commands (list): commands to run. They must not depend on each
+                other, as they run in no particular order.
+            strip (bool, optional): strip newlines from the output. Defaults
+                to True.
+
+        Returns:
+            list: one `output` or `error` dict per command, in command order.
+        """
+        if self.client is None or (
+            self.deadline is not None and time.monotonic() >= self.deadline
+        ):
+            return [self._check_executable()] * len(commands)
+
+        check_platform = self._known_platform() is None
+        if not check_platform and self._platform != "raspbian":
+            return [self._check_executable()] * len(commands)
+
+        pending = deque(enumerate(commands))
+        if check_platform:
+            pending.appendleft((None, PLATFORM_COMMAND))
+
+        transport = self.client.get_transport()
+        timeout = self._command_timeout()
+        limit = self.max_channels
+        results = [None] * len(commands)
+        platform_output = None
+        active = []
+
+        while pending or active:
+            while pending and len(active) < limit:
+                index, cmd = pending.popleft()
+                try:
+                    channel = transport.open_session(timeout=timeout)
+                    channel.exec_command(cmd)
+
+                except Exception as err:
+                    if active:
+                        # the server refused another session, wait for a free one.
+                        self.logger.debug(f"Channel limit reached at {len(active)}: {err}")
+                        pending.appendleft((index, cmd))
+                        limit = len(active)
+                        break
+
+                    self.logger.error(f"Unable to open channel on {self.hostname}: {err}")
+                    error = {"error": f"Unable to run command: {cmd}"}
+                    if index is None:
+                        return [error] * len(commands)
+
+                    results[index] = error
+                    continue
+
+                started = time.monotonic()
+                active.append(
+                    {
+                        "index": index,
+                        "cmd": cmd,
+                        "channel": channel,
+                        "stdout": bytearray(),
+                        "stderr": bytearray(),
+                        "deadline": started + timeout if timeout is not None else None,
+                    }
+                )
+
+            received = False
+            for entry in list(active):
+                channel = entry["channel"]
+                if channel.recv_ready():
+                    entry["stdout"] += channel.recv(STREAM_CHUNK_SIZE)
+                    received = True
+
+                if channel.recv_stderr_ready():
+                    entry["stderr"] += channel.recv_stderr(STREAM_CHUNK_SIZE)
+                    received = True
+
+                finished = channel.exit_status_ready() and not (
+                    channel.recv_ready() or channel.recv_stderr_ready()
+                )
+                timed_out = (
+                    not finished
+                    and entry["deadline"] is not None
+                    and time.monotonic() >= entry["deadline"]
+                )
+                if not (finished or timed_out):
+                    continue
+
+                channel.close()
+                active.remove(entry)
+
+                if timed_out:
+                    self.logger.error(f"Command timed out on {self.hostname}: {entry['cmd']}")
+                    result = {"error": f"Command timed out: {entry['cmd']}"}
+                else:
+                    output = entry["stdout"].decode("utf-8", errors="replace")
+                    error = entry["stderr"].decode("utf-8", errors="replace")
+                    if error:
+                        self.logger.error(f"Received command execution error: {error}")
+                        result = {"error": error.strip("\n")}
+                    else:
+                        result = {"output": output.strip("\n") if strip else output}
+
+                if entry["index"] is None:
+                    platform_output = result
+                else:
+                    results[entry["index"]] = result
+
+            if not received and active:
+                time.sleep(STREAM_POLL_INTERVAL)
+
+        if check_platform:
+            self.logger.debug(f"Results from {PLATFORM_COMMAND} : {platform_output}")
+            if platform_output.get("output", "").strip("\n") == "ID=raspbian":
+                self._store_platform("raspbian")
+            else:
+                self.logger.error("Not a raspbian host. Cannot execute command.")
+                return [{"error": "Not a raspbian host. Cannot execute command."}] * len(
+                    commands
+                )
+
+        return results
+
+    def _log_output_line(self, stream, line):
+        """logs one line of streamed command output, tagged with the host.
+
+        Args:
+            stream (str): `stdout` or `stderr`.
+            line (str): output line.
+        """
+        if stream == "stderr":
+            self.logger.warning(f"[{self.hostname}] {line}")
+        else:
+            self.logger.info(f"[{self.hostname}] {line}")
+
+    @timed("connect")
     def _create_ph_client(self):
         """_summary_
 
         Returns:
             _type_: _description_
         """
+        # paramiko pulls in the whole crypto stack, only load it to connect.
+        import paramiko
+
         client = paramiko.SSHClient()
         client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
         self.logger.debug(
             f"Attempting SSH connection to socket: {self.hostname}:{self.port}"
         )
+        timeouts = {
+            keyword: self.timeouts[name]
+            for name, keyword in (
+                ("connect", "timeout"),
+                ("banner", "banner_timeout"),
+                ("auth", "auth_timeout"),
+            )
+            if self.timeouts.get(name) is not None
+        }
+        if self.deadline is not None:
+            # a blackholed host must not outlast its share of the deadline.
+            remaining = max(0.001, self.deadline - time.monotonic())
+            timeouts = {
+                keyword: min(timeouts.get(keyword, remaining), remaining)
+                for keyword in ("timeout", "banner_timeout", "auth_timeout")
+            }
+
         client.connect(
-            self.hostname, self.port, self.username, key_filename=self.key_file
+            self.hostname,
+            self.port,
+            self.username,
+            key_filename=self.key_file,
+            **timeouts,
         )
 
         return client
@@ -111,24 +656,12 @@ class PiHole:
             self.logger.error("IPAddress Input Validation Failure.")
             return None
 
-        command = f"cat /etc/pihole/custom.list | grep -i '{ip} ' | wc -l"
-        self.logger.debug(f"Checking for existing ip with command: {command}")
-
-        result = self._execute(command)
-
-        if result is None:
-            self.logger.debug(
-                f"Invalid result from command execution, Returning False."
-            )
+        snapshot = self.snapshot()
+        if snapshot is None:
+            self.logger.debug(f"Unable to read custom dns list, Returning False.")
             return False
 
-        if "error" in result.keys():
-            self.logger.debug(f"Error Fron Existing IP Check: {result['error']}")
-
-        else:
-            self.logger.debug(f"Results Frin Existing IP Check: {result['output']}")
-
-        resp = True if result["output"] == "1\n" else False
+        resp = snapshot.has_ip(ip)
         self.logger.debug(f"IP Check in DNS Result: ---> {resp} <---")
         return resp
 
@@ -139,17 +672,221 @@ class PiHole:
             _type_: _description_
         """
         self.client = self._create_ph_client()
+        self._platform = None
+        self.invalidate_snapshot()
         resp = True if self.client else False
 
         self.logger.debug(f"Successfully created pihole client: {resp}")
         return resp
 
-    def add_dns_record(self, ip_addr, hostname):
+    def is_alive(self):
+        """determines whether the ssh transport is still usable.
+
+        Returns:
+            bool: True when the client has an active transport.
+        """
+        if self.client is None:
+            return False
+
+        transport = self.client.get_transport()
+        return bool(transport is not None and transport.is_active())
+
+    def set_keepalive(self, interval):
+        """enables ssh keepalive packets on the transport so that idle pooled
+        connections are not dropped by firewalls or NAT.
+
+        Args:
+            interval (int): seconds between keepalive packets. 0 disables.
+        """
+        if self.client is None:
+            return
+
+        transport = self.client.get_transport()
+        if transport is not None:
+            transport.set_keepalive(interval)
+
+    def reload_dns(self):
+        """reloads dns on the pihole if this instance changed the custom dns
+        list since the last reload. When a minimum reload interval is set, waits
+        until that much time has passed since the previous reload.
+
+        Returns:
+            dict: `output` or `error` of the reload, or None if not needed.
+        """
+        with self._reload_lock:
+            if not self._dirty:
+                return None
+
+            if self._last_reload is not None and self.min_reload_interval > 0:
+                wait = self.min_reload_interval - (time.monotonic() - self._last_reload)
+                if wait > 0:
+                    self.logger.info(f"Waiting {wait:.1f}s before reloading dns.")
+                    time.sleep(wait)
+
+            command = "pihole restartdns reload"
+            self.logger.debug(f"Reloading dns with command: {command}")
+
+            self._dirty = False
+            self._last_reload = time.monotonic()
+            with self._timed("reload"):
+                self.last_reload_result = self._execute(command)
+
+            if "error" in self.last_reload_result.keys():
+                self.logger.error(
+                    f"DNS reload failed on {self.hostname}: {self.last_reload_result['error']}"
+                )
+
+            return self.last_reload_result
+
+    def _timed(self, phase):
+        """times a block as a phase of this host, when metrics are enabled.
+
+        Args:
+            phase (str): phase name.
+
+        Returns:
+            context manager timing the block.
+        """
+        if self.metrics is None:
+            return nullcontext()
+
+        return self.metrics.timer(phase, self.hostname)
+
+    @contextmanager
+    def session(self):
+        """groups custom dns list changes so that dns is reloaded at most once,
+        when the outermost session ends. Sessions may be nested.
+
+        Yields:
+            PiHole: this instance.
+        """
+        with self._reload_lock:
+            self._session_depth += 1
+
+        try:
+            yield self
+
+        finally:
+            with self._reload_lock:
+                self._session_depth -= 1
+                outermost = self._session_depth == 0
+
+            if outermost:
+                self.reload_dns()
+
+    def close(self):
+        """reloads dns if changes are pending, then closes the ssh client."""
+        if self.client is not None:
+            if self._dirty:
+                self.reload_dns()
+            self.client.close()
+            self.client = None
+
+    def _inline_reload(self, reload):
+        """decides whether a record transaction reloads dns itself. Changes
+        already pending, or a reload too soon after the previous one, leave
+        the reload to the end of the session instead.
+
+        Args:
+            reload (bool): whether the caller asked for the reload.
+
+        Returns:
+            bool: True to reload within the transaction.
+        """
+        if not reload or self._dirty:
+            return False
+
+        if self._last_reload is not None and self.min_reload_interval > 0:
+            return time.monotonic() - self._last_reload >= self.min_reload_interval
+
+        return True
+
+    @timed("record_transaction")
+    def _record_transaction(self, action, ip, hostname, reload=False):
+        """adds or deletes one record with a single remote script that checks
+        the platform and the current list, writes the list atomically and
+        reloads dns, all in one ssh round trip.
+
+        Args:
+            action (str): `add` or `delete`.
+            ip (str): ip address, already validated.
+            hostname (str): hostname, already validated.
+            reload (bool, optional): reload dns within the transaction, see
+                _inline_reload. Defaults to False.
+
+        Returns:
+            dict: `output` or `error` of the transaction with its `status`, or
+            False when there was nothing to change.
+        """
+        with self._reload_lock:
+            reload = self._inline_reload(reload)
+
+        command = " ".join(
+            shlex.quote(arg)
+            for arg in ("sudo", "sh", "-s", "--", action, ip, hostname, str(int(reload)))
+        )
+        self.logger.debug(f"Executing record transaction: {command}")
+
+        result = self._execute(
+            command, stdin_data=RECORD_TRANSACTION_SCRIPT, check_platform=False
+        )
+        if "error" in result.keys():
+            return result
+
+        lines = result["output"].splitlines()
+        fields = lines[-1].split() if lines else []
+        if len(fields) < 2 or fields[0] != "DNSMAN_STATUS":
+            self.logger.error(f"Record transaction failed on {self.hostname}: {result['output']}")
+            return {"error": result["output"] or "No status from record transaction."}
+
+        status = fields[1]
+        details = "\n".join(lines[:-1])
+
+        if status == "not_raspbian":
+            self.logger.error("Not a raspbian host. Cannot execute command.")
+            return {"error": "Not a raspbian host. Cannot execute command."}
+
+        if self._platform is None:
+            self._store_platform("raspbian")
+
+        if status in ("exists", "missing"):
+            self.logger.debug(f"Record transaction made no change: {status}")
+            return False
+
+        if status not in ("written", "reloaded", "reload_failed"):
+            self.logger.error(f"Record transaction failed on {self.hostname}: {status} {details}")
+            return {"error": f"Record transaction failed: {status}", "status": status}
+
+        self.invalidate_snapshot()
+        with self._reload_lock:
+            if status == "written":
+                self._dirty = True
+            else:
+                self._last_reload = time.monotonic()
+                self.last_reload_result = (
+                    {"output": details} if status == "reloaded" else {"error": details}
+                )
+
+        if status == "reload_failed":
+            # the list was written, so the new fingerprint is still returned.
+            self.logger.error(f"DNS reload failed on {self.hostname}: {details}")
+            return {
+                "error": f"DNS reload failed: {details}",
+                "status": status,
+                "sha256": fields[2],
+            }
+
+        return {"output": "", "status": status, "sha256": fields[2]}
+
+    def add_dns_record(self, ip_addr, hostname, reload=None):
         """_summary_
 
         Args:
             ip_addr (_type_): _description_
             hostname (_type_): _description_
+            reload (bool, optional): reload dns in the same round trip as the
+                write. Defaults to None, which reloads unless a session is
+                open.
 
         Returns:
             _type_: _description_
@@ -161,23 +898,26 @@ class PiHole:
             self.logger.error("Input Validation Failure.")
             return None
 
-        ip_exists = self._check_ip_in_dns(ip_addr)
-        if ip_exists:
-            self.logger.debug("Unable to add dns record. IP exists on host.")
-            return False
+        if reload is None:
+            reload = self._session_depth == 0
 
-        command = f'echo "{ip_addr} {hostname}" | sudo tee -a /etc/pihole/custom.list && pihole restartdns reload'
-        self.logger.debug(f"Executing Command: {command}")
+        with self.session():
+            result = self._record_transaction("add", ip_addr, hostname, reload=reload)
+
+        if result is False:
+            self.logger.debug("Unable to add dns record. IP exists on host.")
 
-        result = self._execute(command)
         return result
 
-    def delete_dns_record(self, ip, hostname):
+    def delete_dns_record(self, ip, hostname, reload=None):
         """_summary_
 
         Args:
             ip (_type_): _description_
             hostname (_type_): _description_
+            reload (bool, optional): reload dns in the same round trip as the
+                write. Defaults to None, which reloads unless a session is
+                open.
 
         Returns:
             _type_: _description_
@@ -186,17 +926,18 @@ class PiHole:
         if not is_valid:
             return None
 
-        ip_exists = self._check_ip_in_dns(ip)
-        if not ip_exists:
-            self.logger.error("IP wasnt found in custom dns. Nothing to delete.")
-            return False
+        if reload is None:
+            reload = self._session_depth == 0
 
-        command = f"sudo sed -i '/{ip} {hostname}/d' /etc/pihole/custom.list && pihole restartdns reload"
-        self.logger.debug(f"Executing Command: {command}")
+        with self.session():
+            result = self._record_transaction("delete", ip, hostname, reload=reload)
+
+        if result is False:
+            self.logger.error("Record wasnt found in custom dns. Nothing to delete.")
 
-        result = self._execute(command)
         return result
 
+    @timed("update_pihole")
     def update_pihole(self):
         """_summary_
 
@@ -206,11 +947,12 @@ class PiHole:
         command = "pihole -up"
 
         self.logger.debug(f"Updating Pihole with command: {command}")
-        result = self._execute(command)
+        result = self._execute_stream(command, on_line=self._log_output_line)
         self.logger.debug(f"Update Pihole Result: {result}")
 
         return result
 
+    @timed("update_gravity")
     def update_gravity(self):
         """_summary_
 
@@ -220,11 +962,26 @@ class PiHole:
         command = "pihole -g"
 
         self.logger.debug(f"Updating gravity with command: {command}")
-        result = self._execute(command)
+        result = self._execute_stream(command, on_line=self._log_output_line)
         self.logger.debug(f"Update Gravity Result: {result}")
 
         return result
 
+    @timed("health_check")
+    def check_health(self):
+        """asks pihole whether its dns service is listening.
+
+        Returns:
+            bool: True when `pihole status` reports dns is listening.
+        """
+        result = self._execute("pihole status")
+        self.logger.debug(f"Pihole Status Result: {result}")
+
+        if result is None or "error" in result.keys():
+            return False
+
+        return "is listening" in result["output"]
+
     def check_record_in_dns(self, ip, host):
         """_summary_
 
@@ -239,21 +996,340 @@ class PiHole:
         if not is_valid:
             return None
 
-        command = (
-            f"cat /etc/pihole/custom.list | grep -i '{ip}' | grep -i '{host}' | wc -l"
+        snapshot = self.snapshot()
+        if snapshot is None:
+            self.logger.debug(f"Unable to read custom dns list, Returning False.")
+            return False
+
+        resp = snapshot.has_record(ip, host)
+        self.logger.debug(f"Record Check in DNS Result: ---> {resp} <---")
+
+        return resp
+
+    @timed("fingerprint")
+    def _remote_fingerprint(self):
+        """asks the remote host for the sha256 digest of its custom dns list,
+        which is far cheaper than transferring the whole file.
+
+        Returns:
+            str: hex digest, or None if it could not be computed.
+        """
+        command = f"sha256sum {CUSTOM_LIST_PATH}"
+        if self.client is not None and self._known_platform() is None:
+            # on a fresh connection the platform check runs alongside it.
+            result = self.execute_many([command])[0]
+        else:
+            result = self._execute(command)
+
+        if result is None or "error" in result.keys() or not result["output"]:
+            self.logger.debug(f"Unable to fingerprint {CUSTOM_LIST_PATH}: {result}")
+            return None
+
+        return result["output"].split()[0]
+
+    @timed("read_custom_list")
+    def _read_custom_list(self):
+        """fetches the remote custom dns list and stores a copy in the custom
+        list cache, when one is configured.
+
+        Returns:
+            CustomListSnapshot: the parsed file, or None if it could not be read.
+        """
+        result = self._execute(f"cat {CUSTOM_LIST_PATH}", strip=False)
+        if result is None or "error" in result.keys():
+            self.logger.error(f"Unable to read {CUSTOM_LIST_PATH}: {result}")
+            return None
+
+        content = result["output"]
+        sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if self.custom_list_cache is not None:
+            self.custom_list_cache.set(self.hostname, self.port, sha256, content)
+
+        return CustomListSnapshot(parse_custom_list(content), sha256=sha256, content=content)
+
+    def snapshot(self):
+        """returns the parsed and indexed custom dns list. The file is only
+        transferred when there is no local copy, or when the remote sha256
+        digest no longer matches the in-memory or cached copy. The snapshot is
+        dropped whenever this instance changes the list.
+
+        Returns:
+            CustomListSnapshot: the current records, or None if unreadable.
+        """
+        if self._snapshot is not None and not self._snapshot_stale:
+            return self._snapshot
+
+        cached = None
+        if self._snapshot is None and self.custom_list_cache is not None:
+            cached = self.custom_list_cache.get(self.hostname, self.port)
+
+        if self._snapshot is not None or cached is not None:
+            fingerprint = self._remote_fingerprint()
+
+            if self._snapshot is not None and fingerprint == self._snapshot.sha256:
+                self.logger.debug(f"{CUSTOM_LIST_PATH} unchanged, reusing snapshot.")
+                self._snapshot_stale = False
+                return self._snapshot
+
+            if cached is not None and fingerprint == cached["sha256"]:
+                self.logger.debug(f"{CUSTOM_LIST_PATH} unchanged, using cached copy.")
+                self._snapshot = CustomListSnapshot(
+                    parse_custom_list(cached["content"]),
+                    sha256=fingerprint,
+                    content=cached["content"],
+                )
+                self._snapshot_stale = False
+                return self._snapshot
+
+        self._snapshot = self._read_custom_list()
+        self._snapshot_stale = False
+        if self._snapshot is not None:
+            self.logger.debug(f"Loaded {len(self._snapshot)} custom dns records.")
+
+        return self._snapshot
+
+    def invalidate_snapshot(self):
+        """forgets the cached custom dns list."""
+        self._snapshot = None
+        self._snapshot_stale = False
+
+    def revalidate_snapshot(self):
+        """marks the snapshot as possibly outdated, so the next use confirms it
+        against the remote sha256 digest instead of trusting it blindly.
+        """
+        self._snapshot_stale = True
+
+    @timed("upload")
+    def _upload_custom_list(self, content):
+        """uploads new custom dns list contents to a temporary file in the ssh
+        user's home directory over the sftp channel of the existing transport.
+        The channel gets the command timeout, so a stalled upload cannot hang.
+
+        Args:
+            content (str): full file contents.
+
+        Returns:
+            str: absolute remote path of the uploaded file.
+        """
+        sftp = self.client.open_sftp()
+        try:
+            timeout = self._command_timeout()
+            if timeout is not None:
+                sftp.get_channel().settimeout(timeout)
+
+            remote_path = posixpath.join(
+                sftp.normalize("."), f".dnsman-custom.list.{uuid.uuid4().hex}"
+            )
+            with sftp.file(remote_path, "w") as file:
+                file.write(content)
+
+        finally:
+            sftp.close()
+
+        return remote_path
+
+    @timed("write_custom_list")
+    def _write_custom_list(self, records):
+        """replaces the remote custom dns list with the given records and marks
+        dns as needing a reload at the end of the session. The new file is
+        rendered locally, uploaded over sftp and moved into place with an
+        atomic rename, so readers see either the old or the new file and never
+        a partial one. Nothing is written when the rendered file is identical
+        to the remote one. The current file is edited rather than replaced, so
+        comments, aliases and lines dnsman does not understand are kept. The
+        file is moved into place under the record transaction lock, and only
+        if it still has the sha256 it was read with, so a concurrent change is
+        never overwritten.
+
+        Args:
+            records (list): (ip, hostname) tuples to write.
+
+        Returns:
+            dict: `output` or `error` of the write, with `unchanged` set when
+            the write was skipped and `status` set to `conflict` when the
+            remote file changed since it was read.
+        """
+        current = self._snapshot.content if self._snapshot is not None else None
+        if current is None:
+            content = render_custom_list(records)
+        else:
+            content = edit_custom_list(current, records)
+        sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        if self._snapshot is not None and not self._snapshot_stale:
+            remote_sha256 = self._snapshot.sha256
+        else:
+            remote_sha256 = self._remote_fingerprint()
+
+        if remote_sha256 == sha256:
+            self.logger.info(f"{CUSTOM_LIST_PATH} already up to date. Skipping write.")
+            return {"output": "", "unchanged": True}
+
+        # the file the new contents were computed from.
+        base_sha256 = remote_sha256
+        if self._snapshot is not None and self._snapshot.sha256 is not None:
+            base_sha256 = self._snapshot.sha256
+
+        upload_path = self._upload_custom_list(content)
+        command = " ".join(
+            shlex.quote(arg)
+            for arg in ("sudo", "sh", "-s", "--", upload_path, base_sha256 or "")
         )
+        self.logger.debug(f"Executing Command: {command}")
 
-        self.logger.debug(f"Checking for existing ip with command: {command}")
-        result = self._execute(command)
-        self.logger.debug(f"Results From Existing IP Check: {result['output']}")
+        result = self._execute(command, stdin_data=WRITE_CUSTOM_LIST_SCRIPT)
+        self.invalidate_snapshot()
+        if "error" in result.keys():
+            return result
+
+        lines = result["output"].splitlines()
+        fields = lines[-1].split() if lines else []
+        status = fields[1] if len(fields) >= 2 and fields[0] == "DNSMAN_STATUS" else None
 
-        if result is None:
-            self.logger.debug(
-                f"Invalid result from command execution, Returning False."
+        if status == "conflict":
+            self.logger.error(
+                f"{CUSTOM_LIST_PATH} on {self.hostname} changed since it was read. Not writing."
             )
-            return False
+            return {
+                "error": f"{CUSTOM_LIST_PATH} changed during the write, retry the operation.",
+                "status": status,
+            }
+
+        if status != "written":
+            self.logger.error(
+                f"Unable to write {CUSTOM_LIST_PATH} on {self.hostname}: {result['output']}"
+            )
+            return {"error": f"Unable to write {CUSTOM_LIST_PATH}: {status or result['output']}"}
 
-        resp = True if result["output"] == "1" else False
-        self.logger.debug(f"Record Check in DNS Result: ---> {resp} <---")
+        self._dirty = True
+        if self.custom_list_cache is not None:
+            self.custom_list_cache.set(self.hostname, self.port, sha256, content)
 
-        return resp
+        return {"output": ""}
+
+    def add_dns_records(self, records):
+        """adds many dns records with a single write of the custom dns list and
+        a single dns reload. Records already present, or whose ip is already
+        mapped on the host, are skipped.
+
+        Args:
+            records (list): (ip, hostname) tuples, already validated.
+
+        Returns:
+            dict: `output`/`error` of the write plus the `added` and `skipped`
+            records, or None if the current list could not be read.
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+
+        existing_ips = set(snapshot.by_ip)
+        added, skipped = [], []
+        for ip, hostname in records:
+            if ip in existing_ips:
+                skipped.append((ip, hostname))
+                continue
+
+            existing_ips.add(ip)
+            added.append((ip, hostname))
+
+        self.logger.info(f"Adding {len(added)} records, skipping {len(skipped)}.")
+        if not added:
+            return {"output": "", "added": added, "skipped": skipped}
+
+        with self.session():
+            result = self._write_custom_list(snapshot.records + added)
+        result.update({"added": added, "skipped": skipped})
+        return result
+
+    def delete_dns_records(self, records):
+        """deletes many dns records by rewriting the custom dns list once and
+        reloading dns once. Records not present on the host are skipped.
+
+        Args:
+            records (list): (ip, hostname) tuples, already validated.
+
+        Returns:
+            dict: `output`/`error` of the write plus the `deleted` and `skipped`
+            records, or None if the current list could not be read.
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+
+        current = snapshot.records
+        # hostnames match case-insensitively, as in the record transaction.
+        present = {(ip, hostname.lower()) for ip, hostname in current}
+        deleted = [record for record in records if (record[0], record[1].lower()) in present]
+        skipped = [
+            record for record in records if (record[0], record[1].lower()) not in present
+        ]
+
+        to_delete = {(ip, hostname.lower()) for ip, hostname in deleted}
+        remaining = [
+            record for record in current if (record[0], record[1].lower()) not in to_delete
+        ]
+
+        self.logger.info(f"Deleting {len(deleted)} records, skipping {len(skipped)}.")
+        if not deleted:
+            return {"output": "", "deleted": deleted, "skipped": skipped}
+
+        with self.session():
+            result = self._write_custom_list(remaining)
+        result.update({"deleted": deleted, "skipped": skipped})
+        return result
+
+    def apply_dns_mutations(self, mutations):
+        """applies an ordered list of record additions and deletions with a
+        single write of the custom dns list and a single dns reload.
+
+        Args:
+            mutations (list): (operation, ip, hostname) tuples, already
+                validated, where operation is `add` or `delete`.
+
+        Returns:
+            dict: `output`/`error` of the write plus one `outcomes` entry per
+            mutation, or None if the current list could not be read.
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+
+        records, outcomes = apply_mutations(snapshot.records, mutations)
+        if records == snapshot.records:
+            return {"output": "", "outcomes": outcomes}
+
+        with self.session():
+            result = self._write_custom_list(records)
+        result.update({"outcomes": outcomes})
+        return result
+
+    def apply_dns_records(self, desired):
+        """converges the custom dns list on the desired records. The current
+        list is read once and only written, followed by one dns reload, when it
+        differs from the desired state.
+
+        Args:
+            desired (list): (ip, hostname) tuples, already validated.
+
+        Returns:
+            dict: `output`/`error` of the write plus the computed `diff` and
+            whether the host was already `converged`, or None if the current
+            list could not be read.
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+
+        diff = diff_records(snapshot.records, desired)
+        self.logger.info(
+            f"{self.hostname}: {len(diff['add'])} to add, {len(diff['delete'])} to delete, {len(diff['changed'])} changed."
+        )
+
+        if not diff["add"] and not diff["delete"]:
+            return {"output": "", "diff": diff, "converged": True}
+
+        with self.session():
+            result = self._write_custom_list(diff["records"])
+        result.update({"diff": diff, "converged": False})
+        return result
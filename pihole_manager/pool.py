@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class ConnectionPool:
+    def __init__(
+        self, logger, factory, max_size=16, idle_timeout=300, keepalive_interval=30
+    ) -> None:
+        self.logger = logger
+        self.factory = factory
+
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+
+        self._lock = threading.Lock()
+        # signalled whenever a leased connection is handed back.
+        self._available = threading.Condition(self._lock)
+        self._connections = OrderedDict()
+
+    def _close_entry(self, key, entry):
+        """closes a pooled connection, ignoring errors from dead transports.
+
+        Args:
+            key (tuple): pool key of the connection.
+            entry (dict): pool entry holding the PiHole instance.
+        """
+        if entry["pihole"] is None:
+            return
+
+        self.logger.debug(f"Closing pooled SSH connection to: {key[0]}:{key[1]}")
+        try:
+            entry["pihole"].close()
+
+        except Exception as err:
+            self.logger.debug(f"Error closing connection to {key[0]}: {err}")
+
+    def _evict(self):
+        """drops idle and dead connections, then the least recently used idle
+        connections until the pool fits in `max_size`. Connections currently
+        leased out are never evicted. Must be called with the lock held.
+
+        Returns:
+            list: (key, entry) pairs removed from the pool, to be closed.
+        """
+        now = time.monotonic()
+        evicted = []
+
+        for key, entry in list(self._connections.items()):
+            if entry["leases"] > 0:
+                continue
+
+            idle = now - entry["last_used"] > self.idle_timeout
+            if idle or not entry["pihole"].is_alive():
+                evicted.append((key, self._connections.pop(key)))
+
+        for key, entry in list(self._connections.items()):
+            if len(self._connections) <= self.max_size:
+                break
+
+            if entry["leases"] == 0:
+                evicted.append((key, self._connections.pop(key)))
+
+        return evicted
+
+    def acquire(self, hostname, port, username, key_file):
+        """returns a connected PiHole for the host, reusing a live pooled ssh
+        transport when one exists and connecting otherwise. A PiHole keeps
+        per-operation state, so each one is leased to a single caller at a
+        time and other callers for the same host wait for its release. Every
+        successful acquire must be paired with a release.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+            username (str): ssh username.
+            key_file (str): path to the ssh private key.
+
+        Returns:
+            tuple: the PiHole instance and whether it is connected.
+        """
+        key = (hostname, port, username, key_file)
+        evicted = []
+
+        with self._available:
+            while True:
+                evicted.extend(self._evict())
+                entry = self._connections.get(key)
+                if entry is None or entry["leases"] == 0:
+                    break
+
+                self._available.wait()
+
+            if entry is None:
+                # placeholder, so concurrent callers wait for this connection.
+                entry = {"pihole": None, "leases": 1, "last_used": time.monotonic()}
+                self._connections[key] = entry
+                reuse = False
+
+            else:
+                entry["leases"] = 1
+                entry["last_used"] = time.monotonic()
+                self._connections.move_to_end(key)
+                reuse = True
+
+        for evicted_key, evicted_entry in evicted:
+            self._close_entry(evicted_key, evicted_entry)
+
+        if reuse:
+            self.logger.debug(f"Reusing pooled SSH connection to: {hostname}:{port}")
+            return entry["pihole"], True
+
+        try:
+            pihole, is_connected = self.factory(hostname, port, username, key_file)
+            if is_connected:
+                pihole.set_keepalive(self.keepalive_interval)
+
+        except BaseException:
+            self._discard(key, entry)
+            raise
+
+        if not is_connected:
+            self._discard(key, entry)
+            return pihole, False
+
+        with self._lock:
+            entry["pihole"] = pihole
+
+        return pihole, True
+
+    def _discard(self, key, entry):
+        """drops a placeholder whose connection failed and wakes the callers
+        waiting for it.
+
+        Args:
+            key (tuple): pool key of the connection.
+            entry (dict): the placeholder entry.
+        """
+        with self._available:
+            if self._connections.get(key) is entry:
+                del self._connections[key]
+
+            self._available.notify_all()
+
+    def release(self, pihole):
+        """hands a PiHole acquired from the pool back to it.
+
+        Args:
+            pihole (PiHole): instance returned by acquire.
+        """
+        with self._available:
+            for entry in self._connections.values():
+                if entry["pihole"] is pihole and entry["leases"] > 0:
+                    entry["leases"] = 0
+                    entry["last_used"] = time.monotonic()
+                    self._available.notify_all()
+                    break
+
+    def close(self):
+        """closes every pooled connection."""
+        with self._available:
+            entries = list(self._connections.items())
+            self._connections.clear()
+            self._available.notify_all()
+
+        for key, entry in entries:
+            self._close_entry(key, entry)
+
+    def __len__(self):
+        return len(self._connections)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
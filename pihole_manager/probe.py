@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import time
+import errno
+import socket
+import selectors
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+# most concurrent dns lookups of one probe.
+MAX_RESOLVERS = 8
+
+
+class ReachabilityProbe:
+    def __init__(self, logger, timeout=0.5, ttl=10) -> None:
+        self.logger = logger
+        self.timeout = timeout
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._results = {}
+
+    def _cached(self, endpoint):
+        """looks up a fresh probe result. Must be called with the lock held.
+
+        Args:
+            endpoint (tuple): (hostname, port).
+
+        Returns:
+            bool: the cached result, or None when missing or expired.
+        """
+        cached = self._results.get(endpoint)
+        if cached is None or time.monotonic() - cached[1] > self.ttl:
+            return None
+
+        return cached[0]
+
+    def _resolve(self, endpoint):
+        """looks up the first tcp address of an endpoint.
+
+        Args:
+            endpoint (tuple): (hostname, port).
+
+        Returns:
+            tuple: (family, socktype, proto, address), or None when the
+            hostname does not resolve.
+        """
+        hostname, port = endpoint
+        try:
+            family, socktype, proto, _, address = socket.getaddrinfo(
+                hostname, port, type=socket.SOCK_STREAM
+            )[0]
+
+        except OSError as err:
+            self.logger.debug(f"Unable to resolve {hostname}: {err}")
+            return None
+
+        return family, socktype, proto, address
+
+    def _resolve_all(self, endpoints, deadline):
+        """resolves the endpoints in parallel, so one slow dns answer does not
+        hold up the others. Lookups still running at the deadline are given
+        up and not yielded.
+
+        Args:
+            endpoints (list): (hostname, port) tuples.
+            deadline (float): time.monotonic() value to give up at.
+
+        Yields:
+            tuple: (endpoint, _resolve result), in the order lookups finish.
+        """
+        if len(endpoints) == 1:
+            yield endpoints[0], self._resolve(endpoints[0])
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(len(endpoints), MAX_RESOLVERS))
+        futures = {
+            executor.submit(self._resolve, endpoint): endpoint for endpoint in endpoints
+        }
+
+        try:
+            timeout = max(deadline - time.monotonic(), 0)
+            for future in as_completed(futures, timeout=timeout):
+                yield futures[future], future.result()
+
+        except TimeoutError:
+            self.logger.debug("DNS lookups did not finish within the probe timeout.")
+
+        finally:
+            # getaddrinfo cannot be interrupted, late lookups finish in the background.
+            executor.shutdown(wait=False)
+
+    def _start_connect(self, addrinfo):
+        """starts a non-blocking tcp connect to a resolved address.
+
+        Args:
+            addrinfo (tuple): (family, socktype, proto, address) from _resolve.
+
+        Returns:
+            socket: the connecting socket, or None when the connect already
+            failed.
+        """
+        family, socktype, proto, address = addrinfo
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(False)
+
+        result = sock.connect_ex(address)
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+            sock.close()
+            return None
+
+        return sock
+
+    def _probe_endpoints(self, endpoints):
+        """resolves and connects to every endpoint at once and waits at most
+        `timeout` seconds in total for the answers.
+
+        Args:
+            endpoints (list): (hostname, port) tuples.
+
+        Returns:
+            dict: True or False keyed by endpoint.
+        """
+        results = {endpoint: False for endpoint in endpoints}
+        deadline = time.monotonic() + self.timeout
+
+        with selectors.DefaultSelector() as selector:
+            # connects start as soon as their own lookup finishes.
+            for endpoint, addrinfo in self._resolve_all(endpoints, deadline):
+                if addrinfo is None:
+                    continue
+
+                sock = self._start_connect(addrinfo)
+                if sock is not None:
+                    selector.register(sock, selectors.EVENT_WRITE, endpoint)
+
+            while selector.get_map():
+                # polls once more at the deadline, for connects started late.
+                remaining = max(deadline - time.monotonic(), 0)
+                for key, _ in selector.select(remaining):
+                    error = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    results[key.data] = error == 0
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+                if remaining == 0:
+                    break
+
+            for key in list(selector.get_map().values()):
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+
+        return results
+
+    def probe(self, endpoints):
+        """checks which endpoints accept tcp connections. Endpoints probed
+        within the last `ttl` seconds are answered from the cache, the rest
+        are probed in parallel.
+
+        Args:
+            endpoints (iterable): (hostname, port) tuples.
+
+        Returns:
+            dict: True for reachable endpoints, False otherwise, keyed by
+            endpoint.
+        """
+        endpoints = list(dict.fromkeys(endpoints))
+
+        with self._lock:
+            results = {endpoint: self._cached(endpoint) for endpoint in endpoints}
+
+        missing = [endpoint for endpoint, result in results.items() if result is None]
+        if missing:
+            probed = self._probe_endpoints(missing)
+            now = time.monotonic()
+
+            with self._lock:
+                for endpoint, reachable in probed.items():
+                    self._results[endpoint] = (reachable, now)
+
+            results.update(probed)
+
+            for (hostname, port), reachable in probed.items():
+                if not reachable:
+                    self.logger.error(f"Host unreachable: {hostname}:{port}")
+
+        return results
+
+    def is_reachable(self, hostname, port):
+        """checks a single endpoint, using the cache when possible.
+
+        Args:
+            hostname (str): pihole server hostname.
+            port (int): ssh port.
+
+        Returns:
+            bool: True when the endpoint accepts tcp connections.
+        """
+        return self.probe([(hostname, port)])[(hostname, port)]
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+import os
+import csv
+from collections import Counter
+
+
+def _parse_hosts_lines(lines, strict=True):
+    """parses hosts-file style lines (`ip hostname [alias ...]`). Blank lines
+    and `#` comments are ignored, and aliases become records of their own.
+
+    Args:
+        lines (iterable): lines of text.
+        strict (bool, optional): raise on malformed lines instead of skipping
+            them. Defaults to True.
+
+    Returns:
+        list: (ip, hostname) tuples in file order.
+    """
+    records = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+
+        fields = line.split()
+        if len(fields) < 2:
+            if not strict:
+                continue
+            raise ValueError(f"Invalid record line: {line}")
+
+        records.extend((fields[0], hostname) for hostname in fields[1:])
+
+    return records
+
+
+def _load_csv_records(path):
+    """reads `ip,hostname` rows from a csv file. A header row naming the
+    `ip` and `hostname` columns is optional.
+
+    Args:
+        path (str): path to the csv file.
+
+    Returns:
+        list: (ip, hostname) tuples in file order.
+    """
+    records = []
+    with open(path, "r", newline="") as file:
+        for row in csv.reader(file):
+            row = [field.strip() for field in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+
+            if [field.lower() for field in row[:2]] == ["ip", "hostname"]:
+                continue
+
+            if len(row) < 2:
+                raise ValueError(f"Invalid record row: {','.join(row)}")
+
+            records.append((row[0], row[1]))
+
+    return records
+
+
+def _load_yaml_records(path):
+    """reads records from a yaml file, either a top level list or a list
+    under a `records` key, where every item has `ip` and `hostname` keys.
+
+    Args:
+        path (str): path to the yaml file.
+
+    Returns:
+        list: (ip, hostname) tuples in file order.
+    """
+    import yaml
+
+    with open(path, "r") as file:
+        data = yaml.safe_load(file) or []
+
+    if isinstance(data, dict):
+        data = data.get("records") or []
+
+    records = []
+    for item in data:
+        if not isinstance(item, dict) or "ip" not in item or "hostname" not in item:
+            raise ValueError(f"Invalid record entry: {item}")
+
+        records.append((str(item["ip"]), str(item["hostname"])))
+
+    return records
+
+
+def load_records(path):
+    """loads dns records from a csv, yaml or hosts-format file. The format is
+    picked from the file extension, anything other than .csv/.yaml/.yml is
+    read as hosts format.
+
+    Args:
+        path (str): path to the records file.
+
+    Returns:
+        list: (ip, hostname) tuples in file order.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        return _load_csv_records(path)
+
+    if extension in (".yaml", ".yml"):
+        return _load_yaml_records(path)
+
+    with open(path, "r") as file:
+        return _parse_hosts_lines(file)
+
+
+def parse_custom_list(content):
+    """parses the contents of a pihole /etc/pihole/custom.list file. Malformed
+    lines are skipped rather than failing the whole host.
+
+    Args:
+        content (str): file contents.
+
+    Returns:
+        list: (ip, hostname) tuples in file order.
+    """
+    return _parse_hosts_lines(content.splitlines(), strict=False)
+
+
+def render_custom_list(records):
+    """renders records in pihole custom.list format.
+
+    Args:
+        records (iterable): (ip, hostname) tuples.
+
+    Returns:
+        str: file contents, one `ip hostname` line per record.
+    """
+    return "".join(f"{ip} {hostname}\n" for ip, hostname in records)
+
+
+def edit_custom_list(content, records):
+    """rewrites a custom.list so it holds exactly the given records while
+    keeping everything else an operator put there. Comments, blank lines and
+    lines that do not parse stay as they are, and so do record lines whose
+    names are all kept. Names that are no longer wanted are removed from
+    their line, and records that are not in the file yet are appended.
+
+    Args:
+        content (str): current file contents.
+        records (iterable): (ip, hostname) tuples the file should hold.
+
+    Returns:
+        str: new file contents.
+    """
+    wanted = Counter(records)
+    lines = []
+
+    for raw in content.splitlines():
+        body, hash_sign, comment = raw.partition("#")
+        fields = body.split()
+        if len(fields) < 2:
+            lines.append(raw)
+            continue
+
+        ip, hostnames = fields[0], fields[1:]
+        kept = []
+        for hostname in hostnames:
+            if wanted[(ip, hostname)] > 0:
+                wanted[(ip, hostname)] -= 1
+                kept.append(hostname)
+
+        if len(kept) == len(hostnames):
+            lines.append(raw)
+        elif kept:
+            lines.append(" ".join([ip] + kept) + (f" {hash_sign}{comment}" if hash_sign else ""))
+        elif hash_sign:
+            lines.append(f"{hash_sign}{comment}")
+
+    for record in records:
+        if wanted[record] > 0:
+            wanted[record] -= 1
+            lines.append(f"{record[0]} {record[1]}")
+
+    return "".join(f"{line}\n" for line in lines)
+
+
+def diff_records(current, desired):
+    """computes the changes needed to turn the current records into the desired
+    records.
+
+    Args:
+        current (list): (ip, hostname) tuples present on a host.
+        desired (list): (ip, hostname) tuples that should be present.
+
+    Returns:
+        dict: `add` and `delete` record lists, the `changed` hostnames whose ips
+        differ as (hostname, current_ips, desired_ips) tuples, and the full
+        `records` list to write, which keeps the current order for records
+        that stay and appends new ones.
+    """
+    current_set = set(current)
+    desired_set = set(desired)
+
+    add = [record for record in dict.fromkeys(desired) if record not in current_set]
+    delete = [record for record in current if record not in desired_set]
+
+    current_ips, desired_ips = {}, {}
+    for ip, hostname in current:
+        current_ips.setdefault(hostname, set()).add(ip)
+    for ip, hostname in desired:
+        desired_ips.setdefault(hostname, set()).add(ip)
+
+    changed = [
+        (hostname, sorted(current_ips[hostname]), sorted(ips))
+        for hostname, ips in desired_ips.items()
+        if hostname in current_ips and current_ips[hostname] != ips
+    ]
+
+    records = [record for record in dict.fromkeys(current) if record in desired_set]
+    records.extend(add)
+
+    return {"add": add, "delete": delete, "changed": changed, "records": records}
+
+
+class CustomListSnapshot:
+    def __init__(self, records, sha256=None, content=None) -> None:
+        self.records = list(records)
+        self.sha256 = sha256
+        # raw file contents, kept so writes can preserve comments and aliases.
+        self.content = content
+
+        self.by_ip = {}
+        self.by_hostname = {}
+        for ip, hostname in self.records:
+            self.by_ip.setdefault(ip, []).append(hostname)
+            self.by_hostname.setdefault(hostname.lower(), []).append(ip)
+
+    def has_ip(self, ip):
+        """determines whether the ip is mapped to any hostname.
+
+        Args:
+            ip (str): ip address.
+
+        Returns:
+            bool: True when the exact ip is present.
+        """
+        return ip in self.by_ip
+
+    def has_hostname(self, hostname):
+        """determines whether the hostname is mapped to any ip. Hostnames are
+        compared case-insensitively, like dns.
+
+        Args:
+            hostname (str): dns hostname.
+
+        Returns:
+            bool: True when the hostname is present.
+        """
+        return hostname.lower() in self.by_hostname
+
+    def has_record(self, ip, hostname):
+        """determines whether the exact ip to hostname mapping is present.
+
+        Args:
+            ip (str): ip address.
+            hostname (str): dns hostname.
+
+        Returns:
+            bool: True when the record is present.
+        """
+        return ip in self.by_hostname.get(hostname.lower(), [])
+
+    def hostnames_for(self, ip):
+        """returns the hostnames mapped to an ip, in file order."""
+        return list(self.by_ip.get(ip, []))
+
+    def ips_for(self, hostname):
+        """returns the ips mapped to a hostname, in file order."""
+        return list(self.by_hostname.get(hostname.lower(), []))
+
+    def __len__(self):
+        return len(self.records)
+
+
+def apply_mutations(records, mutations):
+    """applies an ordered list of add/delete mutations to a list of records,
+    with the same rules as single record changes: an add is skipped when its
+    ip is already mapped, a delete is skipped when the record is absent.
+    Hostnames match case-insensitively, like dns itself.
+
+    Args:
+        records (list): current (ip, hostname) tuples.
+        mutations (list): (operation, ip, hostname) tuples, where operation is
+            `add` or `delete`.
+
+    Returns:
+        tuple: the resulting records and one outcome per mutation, which is
+        one of `added`, `exists`, `deleted` or `missing`.
+    """
+    # index records by position, so each mutation is O(1) and the list is
+    # only rebuilt once at the end.
+    records = list(records)
+    ip_counts = Counter(ip for ip, _ in records)
+    positions = {}
+    for position, (ip, hostname) in enumerate(records):
+        positions.setdefault((ip, hostname.lower()), []).append(position)
+    removed = set()
+
+    outcomes = []
+    for operation, ip, hostname in mutations:
+        key = (ip, hostname.lower())
+
+        if operation == "add":
+            if ip_counts[ip]:
+                outcomes.append("exists")
+                continue
+
+            positions.setdefault(key, []).append(len(records))
+            records.append((ip, hostname))
+            ip_counts[ip] = 1
+            outcomes.append("added")
+
+        elif operation == "delete":
+            matches = positions.pop(key, [])
+            if not matches:
+                outcomes.append("missing")
+                continue
+
+            removed.update(matches)
+            ip_counts[ip] -= len(matches)
+            outcomes.append("deleted")
+
+        else:
+            raise ValueError(f"Unsupported mutation: {operation}")
+
+    records = [record for position, record in enumerate(records) if position not in removed]
+
+    return records, outcomes
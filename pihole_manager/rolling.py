@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RollingScheduler:
+    def __init__(
+        self,
+        logger,
+        cluster,
+        batch_size=1,
+        max_unavailable=1,
+        health_check=True,
+        health_retries=10,
+        health_interval=6,
+        state_file=None,
+    ) -> None:
+        self.logger = logger
+        self.cluster = cluster
+
+        self.batch_size = max(1, batch_size)
+        self.max_unavailable = max(1, max_unavailable)
+        self.health_check = health_check
+        self.health_retries = health_retries
+        self.health_interval = health_interval
+        self.state_file = os.path.expanduser(state_file) if state_file else None
+
+    def _load_state(self, operation):
+        """reads the hosts already finished by an interrupted run of the same
+        operation.
+
+        Args:
+            operation (str): maintenance operation name.
+
+        Returns:
+            list: hostnames already completed.
+        """
+        if self.state_file is None:
+            return []
+
+        try:
+            with open(self.state_file, "r") as file:
+                state = json.load(file)
+
+        except (OSError, ValueError):
+            return []
+
+        if state.get("operation") != operation:
+            return []
+
+        return state.get("completed", [])
+
+    def _save_state(self, operation, completed):
+        """records the hosts finished so far, so an interrupted run can resume.
+
+        Args:
+            operation (str): maintenance operation name.
+            completed (list): hostnames already completed.
+        """
+        if self.state_file is None:
+            return
+
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"operation": operation, "completed": completed}, file)
+
+        os.replace(tmp_path, self.state_file)
+
+    def _clear_state(self):
+        """removes the resume state after a completed run."""
+        if self.state_file is not None and os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+    def _wait_healthy(self, ph_host):
+        """polls a host until its dns service reports healthy.
+
+        Args:
+            ph_host (dict): a single `host` entry from the config file.
+
+        Returns:
+            bool: True once healthy, False after health_retries attempts.
+        """
+        for attempt in range(1, self.health_retries + 1):
+            if self.cluster.check_host_health(ph_host):
+                return True
+
+            self.logger.info(
+                f"Waiting for {ph_host['hostname']} to become healthy ({attempt}/{self.health_retries})."
+            )
+            time.sleep(self.health_interval)
+
+        return False
+
+    def _task_failed(self, result):
+        """determines whether a per-host task failed, either in the task
+        wrapper, in the task itself or through the exit status of the
+        remote command. A streamed command that exited 0 succeeded, even if
+        it printed progress to stderr.
+
+        Args:
+            result (dict): per-host result from PiHoleCluster._run_task.
+
+        Returns:
+            str: the reason the task failed, or None when it succeeded.
+        """
+        if "error" in result.keys():
+            return result["error"]
+
+        task_result = result.get("result")
+        if not isinstance(task_result, dict):
+            return None
+
+        exit_status = task_result.get("exit_status")
+        if exit_status is not None:
+            if exit_status == 0:
+                return None
+
+            return task_result.get("error") or f"Exit status {exit_status}."
+
+        return task_result.get("error")
+
+    def run(self, operation, task, start_from=0, resume=False):
+        """runs a maintenance task across the cluster in waves of batch_size
+        hosts, with at most max_unavailable hosts under maintenance at a time.
+        After each wave every host in it must pass the health gate before the
+        next wave starts. An unhealthy wave stops the rollout, and finished
+        hosts are saved so a run with resume set can continue from there.
+
+        Args:
+            operation (str): maintenance operation name, e.g. `update-gravity`.
+            task (callable): PiHoleCluster per-host task, called as task(ph_host).
+            start_from (int, optional): index of the first host to run on.
+            resume (bool, optional): skip the hosts finished by the last
+                interrupted run of the same operation. Defaults to False, a
+                fresh run updates every host and replaces the saved state.
+
+        Returns:
+            dict: `completed` is True when every host finished, `results`
+            holds per-host results and `failed` the hostname that stopped
+            the rollout, if any.
+        """
+        completed = self._load_state(operation) if resume else []
+        if completed:
+            self.logger.info(f"Resuming {operation}. Skipping: {', '.join(completed)}")
+
+        hosts = [ph_host["host"] for ph_host in self.cluster.config.pihole_hosts]
+        hosts = [h for h in hosts[start_from:] if h["hostname"] not in completed]
+        waves = [
+            hosts[i : i + self.batch_size] for i in range(0, len(hosts), self.batch_size)
+        ]
+
+        results = []
+        workers = min(self.batch_size, self.max_unavailable)
+        for number, wave in enumerate(waves, start=1):
+            self.logger.info(
+                f"{operation} wave {number}/{len(waves)}: {', '.join(h['hostname'] for h in wave)}"
+            )
+
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="pihole-rolling"
+            ) as executor:
+                wave_results = list(
+                    executor.map(lambda h: self.cluster._run_task(task, h), wave)
+                )
+            results.extend(wave_results)
+
+            for ph_host, result in zip(wave, wave_results):
+                failure = self._task_failed(result)
+                if failure is None and self.health_check and not self._wait_healthy(ph_host):
+                    failure = "unhealthy"
+
+                if failure is not None:
+                    self.logger.error(
+                        f"{operation} stopped. {ph_host['hostname']} failed: {failure}"
+                    )
+                    self._save_state(operation, completed)
+                    return {
+                        "completed": False,
+                        "results": results,
+                        "failed": ph_host["hostname"],
+                    }
+
+                completed.append(ph_host["hostname"])
+
+            self._save_state(operation, completed)
+
+        self._clear_state()
+        self.logger.info(f"{operation} finished on all hosts.")
+        return {"completed": True, "results": results, "failed": None}
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._events = []
+        self._threads = set()
+
+    def _add(self, event):
+        """stores an event, naming its thread the first time it is seen.
+
+        Args:
+            event (dict): trace event.
+        """
+        thread = threading.current_thread()
+        with self._lock:
+            if event["tid"] not in self._threads:
+                self._threads.add(event["tid"])
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": self._pid,
+                        "tid": event["tid"],
+                        "args": {"name": thread.name},
+                    }
+                )
+
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """records the block as a complete event, even when it raises.
+
+        Args:
+            name (str): span name shown in the timeline.
+            category (str): span category, e.g. `host` or `command`.
+            **args: extra details attached to the span.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+
+        finally:
+            end = time.perf_counter_ns()
+            self._add(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self._origin) / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": self._pid,
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def events(self):
+        """returns a copy of the recorded events.
+
+        Returns:
+            list: trace events in recording order.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def write(self, path):
+        """writes the events in chrome trace event format, which chrome's
+        about:tracing and perfetto open directly.
+
+        Args:
+            path (str): destination file.
+        """
+        with open(os.path.expanduser(path), "w") as file:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, file)
+
+
+def trace_span(tracer, name, category, **args):
+    """returns a span on the tracer, or a no-op when tracing is off.
+
+    Args:
+        tracer (Tracer): tracer, or None.
+        name (str): span name.
+        category (str): span category.
+        **args: extra details attached to the span.
+
+    Returns:
+        context manager recording the span.
+    """
+    if tracer is None:
+        return nullcontext()
+
+    return tracer.span(name, category, **args)
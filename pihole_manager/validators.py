@@ -1,7 +1,17 @@
 #!/usr/bin/env python3
 
 import re
-import ipaddress
+import logging
+
+# dotted quad without leading zeros, matching what ipaddress accepts for ipv4.
+IPV4_PATTERN = re.compile(
+    r"(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])"
+    r"(?:\.(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])){3}"
+)
+
+HOSTNAME_PATTERN = re.compile(
+    r"^(?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)*[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?$"
+)
 
 
 class PiHoleInstanceValidator:
@@ -9,29 +19,18 @@ class PiHoleInstanceValidator:
         self.logger = logger
 
     def _validate_ip(self, ip):
-        """_summary_
+        """determines whether the value is a valid ipv4 address.
 
         Args:
-            ip (_type_): _description_
+            ip (str): ip address as a string.
 
         Returns:
-            _type_: _description_
+            bool: True for a dotted quad ipv4 address.
         """
         if not isinstance(ip, str):
             return False
 
-        try:
-            ipaddr = str(ipaddress.ip_address(ip))
-            is_valid = True if len(ipaddr) > 0 else False
-
-        except ValueError as val_err:
-            is_valid = False
-
-        pattern = re.compile(
-            r"^(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
-        )
-        passes_pattern_match = bool(pattern.fullmatch(ip))
-        return True if is_valid and passes_pattern_match else False
+        return IPV4_PATTERN.fullmatch(ip) is not None
 
     def _validate_hostname(self, hostname):
         """determines the validity of the provided dns hostname by evaluating
@@ -46,25 +45,99 @@ class PiHoleInstanceValidator:
         if not isinstance(hostname, str):
             return False
 
-        pattern = re.compile(
-            r"^(?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)*[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?$"
-        )
-
-        return bool(pattern.fullmatch(hostname))
+        return HOSTNAME_PATTERN.fullmatch(hostname) is not None
 
     def validate(self, ip=None, hostname=None):
         """_summary_
 
         Args:
             ip (_type_): _description_
-            hostname (_type_, optional): _description_. Defaults to None.
+            hostname (_type_, optional): _description_. Defaults to None, in
+                which case only the ip is validated.
 
         Returns:
             _type_: _description_
         """
-        self.logger.debug(f"Validating: ip={ip} | hostname={hostname}")
         valid_ip = self._validate_ip(ip)
-        valid_dns = self._validate_hostname(hostname)
-        self.logger.debug(f"IP-Valid={valid_ip} | HN-Valid={valid_dns}")
+        valid_dns = self._validate_hostname(hostname) if hostname is not None else True
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"Validating: ip={ip} | hostname={hostname} | IP-Valid={valid_ip} | HN-Valid={valid_dns}"
+            )
 
         return True if valid_ip and valid_dns else False
+
+    def validate_records(self, records):
+        """validates a batch of records in one pass and reports every problem.
+        Besides invalid values, it finds exact duplicate records, ips mapped to
+        more than one hostname and hostnames mapped to more than one ip within
+        the batch. Hostnames are compared case-insensitively.
+
+        Args:
+            records (iterable): (ip, hostname) tuples.
+
+        Returns:
+            list: one dict per problem with the 1-based `row`, the `ip` and
+            `hostname`, a `code` (`invalid_ip`, `invalid_hostname`,
+            `duplicate_record`, `duplicate_ip` or `duplicate_hostname`) and a
+            readable `reason`. Empty when the batch is clean.
+        """
+        errors = []
+        seen_records, seen_ips, seen_hostnames = {}, {}, {}
+
+        def error(row, ip, hostname, code, reason):
+            errors.append(
+                {"row": row, "ip": ip, "hostname": hostname, "code": code, "reason": reason}
+            )
+
+        for row, (ip, hostname) in enumerate(records, start=1):
+            valid_ip = self._validate_ip(ip)
+            valid_hostname = self._validate_hostname(hostname)
+
+            if not valid_ip:
+                error(row, ip, hostname, "invalid_ip", f"invalid ip address: {ip}")
+
+            if not valid_hostname:
+                error(row, ip, hostname, "invalid_hostname", f"invalid hostname: {hostname}")
+
+            if not (valid_ip and valid_hostname):
+                continue
+
+            key = (ip, hostname.lower())
+            if key in seen_records:
+                error(
+                    row,
+                    ip,
+                    hostname,
+                    "duplicate_record",
+                    f"duplicate of row {seen_records[key]}",
+                )
+                continue
+
+            seen_records[key] = row
+
+            first = seen_ips.setdefault(ip, (row, hostname))
+            if first[0] != row:
+                error(
+                    row,
+                    ip,
+                    hostname,
+                    "duplicate_ip",
+                    f"{ip} already mapped to {first[1]} on row {first[0]}",
+                )
+
+            first = seen_hostnames.setdefault(key[1], (row, ip))
+            if first[0] != row:
+                error(
+                    row,
+                    ip,
+                    hostname,
+                    "duplicate_hostname",
+                    f"{hostname} already mapped to {first[1]} on row {first[0]}",
+                )
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Validated batch: {len(errors)} problems found.")
+
+        return errors
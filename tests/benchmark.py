@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Offline microbenchmarks for the local code paths that grow with fleet size
+and record count. Nothing here touches the network.
+
+    python -m tests.benchmark --output benchmark.json
+    python -m tests.benchmark --compare benchmark.json --threshold 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+
+import yaml
+
+from pihole_manager.config import Config
+from pihole_manager.records import (
+    CustomListSnapshot,
+    diff_records,
+    parse_custom_list,
+    render_custom_list,
+)
+from pihole_manager.validators import PiHoleInstanceValidator
+
+SIZES = {"full": [1000, 10000], "quick": [100]}
+
+
+def make_records(count, seed=0):
+    """builds a deterministic list of unique records.
+
+    Args:
+        count (int): number of records.
+        seed (int, optional): random seed.
+
+    Returns:
+        list: (ip, hostname) tuples.
+    """
+    rng = random.Random(seed)
+    return [
+        (
+            f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+            f"host-{i}-{rng.randrange(10**6)}.lan.example.com",
+        )
+        for i in range(count)
+    ]
+
+
+def write_inventory(directory, count):
+    """writes a config file with count pihole hosts.
+
+    Args:
+        directory (str): directory to write into.
+        count (int): number of hosts.
+
+    Returns:
+        str: path of the config file.
+    """
+    path = os.path.join(directory, f"inventory_{count}.yaml")
+    content = {
+        "pihole": {
+            "hosts": [
+                {
+                    "host": {
+                        "hostname": f"pihole-{i}.example.com",
+                        "port": 22,
+                        "username": "pi",
+                        "ssh_key": "/home/pi/.ssh/id_ed25519",
+                    }
+                }
+                for i in range(count)
+            ]
+        },
+        "logging": {"log_level": "info"},
+    }
+    with open(path, "w") as file:
+        yaml.safe_dump(content, file)
+
+    return path
+
+
+def load_config_cold(path):
+    """loads a config with its compiled cache removed first, so the yaml is
+    parsed and checked on every call, as on a first run.
+
+    Args:
+        path (str): path of the config file.
+
+    Returns:
+        Config: the loaded config.
+    """
+    directory, name = os.path.split(path)
+    try:
+        os.remove(os.path.join(directory, f".{name}.cache.json"))
+
+    except FileNotFoundError:
+        pass
+
+    return Config(path)
+
+
+def measure(func, repeat, number=1):
+    """times func, best of repeat runs of number calls each.
+
+    Args:
+        func (callable): code to time.
+        repeat (int): number of timed runs.
+        number (int, optional): calls per run.
+
+    Returns:
+        dict: min, median and mean seconds per call.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def benchmarks(sizes, workdir):
+    """yields every benchmark as (name, size, callable).
+
+    Args:
+        sizes (list): record and host counts to run.
+        workdir (str): scratch directory for generated files.
+    """
+    logger = logging.getLogger("dnsman.benchmark")
+    logger.setLevel(logging.WARNING)
+    validator = PiHoleInstanceValidator(logger)
+
+    for size in sizes:
+        records = make_records(size)
+        content = render_custom_list(records)
+        desired = records[size // 10 :] + make_records(size // 10, seed=1)
+        inventory = write_inventory(workdir, size // 10 or 1)
+
+        yield "validate_records", size, lambda records=records: [
+            validator.validate(ip=ip, hostname=hostname) for ip, hostname in records
+        ]
+        yield "validate_records_batch", size, lambda records=records: validator.validate_records(
+            records
+        )
+        yield "config_load", size // 10 or 1, lambda inventory=inventory: load_config_cold(
+            inventory
+        )
+        yield "config_load_cached", size // 10 or 1, lambda inventory=inventory: Config(
+            inventory
+        )
+        yield "parse_custom_list", size, lambda content=content: parse_custom_list(content)
+        yield "snapshot_index", size, lambda records=records: CustomListSnapshot(records)
+        yield "diff_records", size, lambda records=records, desired=desired: diff_records(
+            records, desired
+        )
+
+
+def run(sizes, repeat):
+    """runs the suite.
+
+    Args:
+        sizes (list): record and host counts to run.
+        repeat (int): timed runs per benchmark.
+
+    Returns:
+        dict: environment `meta` data and one entry per benchmark in `results`.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, size, func in benchmarks(sizes, workdir):
+            func()  # warm up caches and imports.
+            results.append({"name": name, "size": size, **measure(func, repeat)})
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """finds benchmarks whose median got slower than the baseline by more than
+    threshold.
+
+    Args:
+        report (dict): current results.
+        baseline (dict): earlier results.
+        threshold (float): allowed slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list: (name, size, baseline median, current median) regressions.
+    """
+    previous = {(r["name"], r["size"]): r["median"] for r in baseline["results"]}
+
+    return [
+        (r["name"], r["size"], previous[(r["name"], r["size"])], r["median"])
+        for r in report["results"]
+        if (r["name"], r["size"]) in previous
+        and r["median"] > previous[(r["name"], r["size"])] * (1 + threshold)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dnsman local microbenchmarks.")
+    parser.add_argument("--output", "-o", help="Write json results to this file")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--quick", action="store_true", help="Small sizes only")
+    parser.add_argument("--compare", help="Baseline json results to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)"
+    )
+    args = parser.parse_args(argv)
+
+    report = run(SIZES["quick" if args.quick else "full"], args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+
+        for name, size, before, after in regressions:
+            print(
+                f"REGRESSION {name}[{size}]: {before * 1e3:.3f}ms -> {after * 1e3:.3f}ms",
+                file=sys.stderr,
+            )
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
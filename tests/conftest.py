@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.config.yaml")
+
+
+@pytest.fixture
+def make_config():
+    """builds the test config with fake hosts named pihole-01.local and up.
+
+    Returns:
+        callable: called as make_config(count) to get a Config.
+    """
+    from pihole_manager.config import Config
+
+    def make(count):
+        config = Config(CONFIG_FILE)
+        config.pihole_hosts = [
+            {
+                "host": {
+                    "hostname": f"pihole-{i:02d}.local",
+                    "port": 22,
+                    "username": "pi",
+                    "ssh_key": "rsa.key",
+                }
+            }
+            for i in range(1, count + 1)
+        ]
+        config.pihole_hostnames = [h["host"]["hostname"] for h in config.pihole_hosts]
+        return config
+
+    return make
+
+
+@pytest.fixture
+def config(make_config):
+    """builds the test config with four fake hosts.
+
+    Returns:
+        Config: config under test.
+    """
+    return make_config(4)
+
+
+@pytest.fixture
+def cluster(config):
+    """builds a cluster over the fake hosts with a mocked logger.
+
+    Returns:
+        PiHoleCluster: cluster under test.
+    """
+    from pihole_manager.cluster import PiHoleCluster
+
+    return PiHoleCluster(logger=MagicMock(), config=config)
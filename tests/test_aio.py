@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestAsyncPiHoleCluster:
+    from pihole_manager.aio import AsyncPiHole, AsyncPiHoleCluster
+
+    @pytest.fixture
+    def config(self, make_config):
+        """builds the test config with twenty fake hosts.
+
+        Returns:
+            Config: config under test.
+        """
+        return make_config(20)
+
+    def test_fan_out_is_bounded_and_ordered(self, config):
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config, max_concurrency=3)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def task(ph_host, ip, host):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return {"output": ph_host["hostname"]}
+
+        cluster.cluster._add_record_on_host = task
+
+        async def run():
+            async with cluster:
+                return await cluster.add_pihole_record("192.168.1.1", "test.local")
+
+        results = asyncio.run(run())
+
+        assert [r["hostname"] for r in results] == config.pihole_hostnames
+        assert [r["result"]["output"] for r in results] == config.pihole_hostnames
+        assert state["peak"] <= 3
+
+    def test_errors_are_isolated(self, config):
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config, max_concurrency=4)
+
+        def task(ph_host, ip, host):
+            if ph_host["hostname"] == "pihole-05.local":
+                raise RuntimeError("boom")
+            return True
+
+        cluster.cluster._check_record_on_host = task
+
+        assert asyncio.run(cluster.check_record_sync("192.168.1.1", "test.local")) is False
+
+    def test_record_changes_are_journaled(self, config, tmp_path):
+        config.journal["path"] = str(tmp_path / "journal.jsonl")
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config)
+
+        def bulk(ph_host, method, mutations):
+            return {"output": "", "outcomes": ["added"] * len(mutations)}
+
+        cluster.cluster._bulk_on_host = bulk
+
+        async def run():
+            async with cluster:
+                return await cluster.add_pihole_record("192.168.1.1", "test.local")
+
+        results = asyncio.run(run())
+
+        assert [r["result"]["outcomes"] for r in results] == [["added"]] * 20
+        assert (tmp_path / "journal.jsonl").exists()
+        assert cluster.cluster.journal.pending("pihole-01.local") == []
+
+    def test_hosts_run_through_the_cluster_task_wrapper(self, config):
+        from pihole_manager.probe import ReachabilityProbe
+
+        config.timeouts["operation_deadline"] = 10
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config, max_concurrency=5)
+        cluster.cluster.probe = ReachabilityProbe(MagicMock())
+        cluster.cluster.probe._probe_endpoints = lambda endpoints: {
+            endpoint: endpoint[0] != "pihole-04.local" for endpoint in endpoints
+        }
+        budgets = {}
+
+        def task(ph_host, ip, host):
+            budgets[ph_host["hostname"]] = (
+                cluster.cluster._local.deadline - time.monotonic()
+            )
+            return {"output": ""}
+
+        cluster.cluster._delete_record_on_host = task
+
+        results = asyncio.run(cluster.delete_pihole_record("192.168.1.1", "test.local"))
+
+        assert results[3] == {"hostname": "pihole-04.local", "error": "Host unreachable."}
+        assert len(budgets) == 19
+        # the first wave of five gets a quarter of the deadline.
+        assert budgets["pihole-01.local"] <= 2.5
+
+    def test_cancellation(self, config, tmp_path):
+        config.maintenance.update(
+            health_check=False, state_file=str(tmp_path / "maintenance.json")
+        )
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config, max_concurrency=1)
+        cluster.cluster._update_gravity_on_host = lambda ph_host: time.sleep(0.05)
+
+        async def run():
+            task = asyncio.ensure_future(cluster.invoke_gravity_update())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+
+    def test_updates_roll_in_waves(self, config, tmp_path):
+        config.maintenance.update(
+            batch_size=4, max_unavailable=2, state_file=str(tmp_path / "maintenance.json")
+        )
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config, max_concurrency=8)
+        cluster.cluster.check_host_health = MagicMock(return_value=True)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def task(ph_host):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return {"output": "", "exit_status": 0}
+
+        cluster.cluster._update_pihole_on_host = task
+
+        async def run():
+            async with cluster:
+                return await cluster.invoke_pihole_update(start_from=10)
+
+        assert asyncio.run(run()) is True
+        assert state["peak"] <= 2
+        assert cluster.cluster.check_host_health.call_count == 10
+
+    def test_aclose_does_not_block_the_loop(self, config):
+        cluster = self.AsyncPiHoleCluster(MagicMock(), config)
+        cluster.cluster.close = MagicMock(side_effect=lambda: time.sleep(0.1))
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            ticker = asyncio.ensure_future(tick())
+            await cluster.aclose()
+            ticker.cancel()
+
+        asyncio.run(run())
+
+        cluster.cluster.close.assert_called_once()
+        assert len(ticks) > 2
+
+    def test_async_pihole_wraps_blocking_calls(self):
+        pihole = self.AsyncPiHole("test.local", 22, "pi", "rsa.key", MagicMock())
+        pihole.pihole = MagicMock()
+        pihole.pihole.add_dns_record.return_value = {"output": "ok"}
+
+        result = asyncio.run(pihole.add_dns_record("192.168.1.1", "test.local"))
+
+        assert result == {"output": "ok"}
+        pihole.pihole.add_dns_record.assert_called_once_with(
+            ip_addr="192.168.1.1", hostname="test.local"
+        )
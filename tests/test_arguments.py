@@ -126,3 +126,81 @@ class TestArguments:
         )
 
         assert options is None
+
+    def test_bulk_add_arguments(self, tmp_path):
+        from pihole_manager.arguments import Arguments
+
+        records = tmp_path / "records.csv"
+        records.write_text("192.168.1.10,nas.local\n")
+
+        args = Arguments()
+        options = args.validate_arguments(
+            args.parse_arguments(
+                ["-c", "config.yaml", "-o", "bulk-add", "-f", str(records)]
+            )
+        )
+
+        assert options["records_file"] == str(records)
+        assert options["operation"]["requires"] == ["records_file"]
+
+    def test_bulk_delete_missing_file_arguments(self):
+        from pihole_manager.arguments import Arguments
+
+        args = Arguments()
+        options = args.validate_arguments(
+            args.parse_arguments(
+                ["-c", "config.yaml", "-o", "bulk-delete", "-f", "missing.csv"]
+            )
+        )
+
+        assert options is None
+
+    def test_start_from_arguments(self):
+        from pihole_manager.arguments import Arguments
+
+        args = Arguments()
+        options = args.validate_arguments(
+            args.parse_arguments(
+                ["-c", "config.yaml", "-o", "update-gravity", "--start-from", "2"]
+            )
+        )
+
+        assert options["start_from"] == 2
+        assert options["resume"] is False
+
+        options = args.validate_arguments(
+            args.parse_arguments(["-c", "config.yaml", "-o", "update-gravity", "--resume"])
+        )
+        assert options["resume"] is True
+
+        options = args.validate_arguments(
+            args.parse_arguments(
+                ["-c", "config.yaml", "-o", "update-pihole", "--start-from", "-1"]
+            )
+        )
+
+        assert options is None
+
+    def test_drift_report_arguments(self):
+        from pihole_manager.arguments import Arguments
+
+        args = Arguments()
+        options = args.validate_arguments(
+            args.parse_arguments(
+                ["-c", "config.yaml", "-o", "drift-report", "--format", "json"]
+            )
+        )
+
+        assert options["format"] == "json"
+
+    def test_trace_arguments(self):
+        from pihole_manager.arguments import Arguments
+
+        args = Arguments()
+        options = args.validate_arguments(
+            args.parse_arguments(
+                ["-c", "config.yaml", "-o", "update-gravity", "--trace", "trace.json"]
+            )
+        )
+
+        assert options["trace"] == "trace.json"
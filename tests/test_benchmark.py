@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+import json
+
+from tests import benchmark
+
+
+class TestBenchmark:
+    def test_quick_run_writes_json(self, tmp_path):
+        output = tmp_path / "benchmark.json"
+
+        assert benchmark.main(["--quick", "--repeat", "1", "-o", str(output)]) == 0
+
+        report = json.loads(output.read_text())
+        assert {r["name"] for r in report["results"]} == {
+            "validate_records",
+            "validate_records_batch",
+            "config_load",
+            "config_load_cached",
+            "parse_custom_list",
+            "snapshot_index",
+            "diff_records",
+        }
+        assert all(r["min"] <= r["median"] for r in report["results"])
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": [{"name": "diff_records", "size": 10, "median": 1.0}]}
+        report = {
+            "results": [
+                {"name": "diff_records", "size": 10, "median": 1.5},
+                {"name": "config_load", "size": 1, "median": 9.0},
+            ]
+        }
+
+        assert benchmark.compare(report, baseline, 0.2) == [("diff_records", 10, 1.0, 1.5)]
+        assert benchmark.compare(report, baseline, 0.6) == []
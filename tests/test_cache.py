@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+
+class TestHostFactsCache:
+    from pihole_manager.cache import HostFactsCache
+
+    def test_fact_roundtrip(self, tmp_path):
+        path = str(tmp_path / "facts.json")
+        self.HostFactsCache(path).set("pihole.local", 22, "abc", "platform", "raspbian")
+
+        cache = self.HostFactsCache(path)
+        assert cache.get("pihole.local", 22, "abc", "platform") == "raspbian"
+
+    def test_fact_keyed_by_fingerprint(self, tmp_path):
+        cache = self.HostFactsCache(str(tmp_path / "facts.json"))
+        cache.set("pihole.local", 22, "abc", "platform", "raspbian")
+
+        assert cache.get("pihole.local", 22, "def", "platform") is None
+
+    def test_fact_expires(self, tmp_path):
+        cache = self.HostFactsCache(str(tmp_path / "facts.json"), ttl=-1)
+        cache.set("pihole.local", 22, "abc", "platform", "raspbian")
+
+        assert cache.get("pihole.local", 22, "abc", "platform") is None
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / "facts.json"
+        path.write_text("{not json")
+
+        assert self.HostFactsCache(str(path)).get("a", 22, "b", "platform") is None
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+from unittest.mock import MagicMock
+
+
+class TestPiHoleCluster:
+    def test_run_on_hosts_keeps_config_order(self, cluster):
+        cluster.config.max_parallel_hosts = 4
+
+        def task(ph_host):
+            # finish the first host last to prove ordering is by config.
+            if ph_host["hostname"] == "pihole-01.local":
+                time.sleep(0.05)
+            return ph_host["hostname"]
+
+        results = cluster._run_on_hosts(task)
+
+        assert [r["hostname"] for r in results] == cluster.config.pihole_hostnames
+        assert [r["result"] for r in results] == cluster.config.pihole_hostnames
+
+    def test_run_on_hosts_isolates_errors(self, cluster):
+        cluster.config.max_parallel_hosts = 2
+
+        def task(ph_host):
+            if ph_host["hostname"] == "pihole-02.local":
+                raise RuntimeError("boom")
+            return True
+
+        results = cluster._run_on_hosts(task)
+
+        assert results[1] == {"hostname": "pihole-02.local", "error": "boom"}
+        assert all(r["result"] for i, r in enumerate(results) if i != 1)
+
+    def test_run_on_hosts_runs_concurrently(self, cluster):
+        cluster.config.max_parallel_hosts = 4
+        barrier = threading.Barrier(4, timeout=2)
+
+        results = cluster._run_on_hosts(lambda ph_host: barrier.wait() >= 0)
+
+        assert all(r["result"] for r in results)
+
+    def test_check_record_sync(self, cluster, mocker):
+        cluster.config.max_parallel_hosts = 4
+        mocker.patch.object(cluster, "_check_record_on_host", return_value=True)
+        assert cluster.check_record_sync("192.168.1.1", "test.local") is True
+
+        cluster._check_record_on_host.side_effect = lambda h, ip, host: (
+            h["hostname"] != "pihole-03.local"
+        )
+        assert cluster.check_record_sync("192.168.1.1", "test.local") is False
+
+    def test_connections_are_pooled_across_operations(self, cluster, mocker):
+        pihole = MagicMock()
+        pihole.is_alive.return_value = True
+        pihole.check_record_in_dns.return_value = True
+        factory = mocker.patch.object(
+            cluster.pool, "factory", return_value=(pihole, True)
+        )
+
+        cluster.check_record_sync("192.168.1.1", "test.local")
+        cluster.check_record_sync("192.168.1.1", "test.local")
+        assert factory.call_count == len(cluster.config.pihole_hosts)
+
+        cluster.close()
+        assert pihole.close.call_count == len(cluster.config.pihole_hosts)
+
+    def test_failed_reload_is_not_reported_as_created(self, cluster, mocker):
+        pihole = MagicMock()
+        pihole.add_dns_record.return_value = {
+            "error": "DNS reload failed: FTL failed",
+            "status": "reload_failed",
+            "sha256": "abc",
+        }
+        mocker.patch.object(cluster.pool, "acquire", return_value=(pihole, True))
+        mocker.patch.object(cluster.pool, "release")
+
+        cluster._add_record_on_host(
+            cluster.config.pihole_hosts[0]["host"], "192.168.1.10", "nas.local"
+        )
+
+        cluster.logger.error.assert_called_with(
+            "Failed To add new record: DNS reload failed: FTL failed"
+        )
+        assert "Created new record successfully." not in str(
+            cluster.logger.info.call_args_list
+        )
+
+    def test_bulk_add_validates_before_touching_hosts(self, cluster, mocker):
+        run = mocker.patch.object(cluster, "_run_on_hosts")
+
+        result = cluster.bulk_add_records(
+            [("192.168.1.10", "nas.local"), ("not-an-ip", "printer.local")]
+        )
+
+        assert result is None
+        run.assert_not_called()
+
+    def test_bulk_add_drops_duplicates(self, cluster, mocker):
+        run = mocker.patch.object(cluster, "_run_on_hosts", return_value=[])
+
+        cluster.bulk_add_records([("192.168.1.10", "nas.local")] * 2)
+
+        run.assert_called_once_with(
+            cluster._bulk_on_host, "add_dns_records", [("192.168.1.10", "nas.local")]
+        )
+
+    def test_journal_replays_missed_entries(self, cluster, mocker, tmp_path):
+        from pihole_manager.journal import Journal
+
+        cluster.journal = Journal(str(tmp_path / "journal.jsonl"))
+        online = {"pihole-01.local", "pihole-02.local", "pihole-04.local"}
+        applied = {}
+
+        def bulk(ph_host, method, mutations):
+            if ph_host["hostname"] not in online:
+                return {"error": "Server not connected."}
+            applied.setdefault(ph_host["hostname"], []).append(mutations)
+            return {"output": "", "outcomes": ["added"] * len(mutations)}
+
+        mocker.patch.object(cluster, "_bulk_on_host", side_effect=bulk)
+
+        cluster.add_pihole_record("10.0.0.1", "a.local")
+        online.add("pihole-03.local")
+        results = cluster.add_pihole_record("10.0.0.2", "b.local")
+
+        assert applied["pihole-01.local"][-1] == [("add", "10.0.0.2", "b.local")]
+        assert applied["pihole-03.local"] == [
+            [("add", "10.0.0.1", "a.local"), ("add", "10.0.0.2", "b.local")]
+        ]
+        assert results[2]["result"]["replayed"] == 1
+        assert results[2]["result"]["outcomes"] == ["added"]
+
+        assert [r["result"]["outcomes"] for r in cluster.replay_journal()] == [[]] * 4
+
+    def test_operation_deadline_is_shared_between_hosts(self, cluster):
+        cluster.config.timeouts["operation_deadline"] = 0.4
+        budgets = {}
+
+        def task(ph_host):
+            budgets[ph_host["hostname"]] = cluster._local.deadline - time.monotonic()
+            if ph_host["hostname"] == "pihole-01.local":
+                time.sleep(0.5)
+            return True
+
+        results = cluster._run_on_hosts(task)
+
+        # the first host only gets a quarter of the deadline.
+        assert budgets["pihole-01.local"] <= 0.1
+        assert [r.get("error") for r in results] == [None] + [
+            "Operation deadline exceeded."
+        ] * 3
+        assert cluster._local.deadline is None
+
+    def test_host_session_applies_deadline(self, cluster, mocker):
+        pihole = MagicMock()
+        mocker.patch.object(cluster.pool, "acquire", return_value=(pihole, True))
+        mocker.patch.object(cluster.pool, "release")
+        cluster._local.deadline = 123.0
+
+        with cluster._host_session(cluster.config.pihole_hosts[0]["host"]) as session:
+            assert session.deadline == 123.0
+
+        assert pihole.deadline is None
+
+    def test_connect_uses_host_deadline(self, cluster, mocker):
+        deadlines = []
+
+        def connect(pihole):
+            deadlines.append(pihole.deadline)
+            return False
+
+        mocker.patch("pihole_manager.cluster.PiHole.connect", autospec=True, side_effect=connect)
+        cluster._local.deadline = 123.0
+
+        pihole, is_connected = cluster._create_pihole_connection(
+            "pihole-01.local", 22, "pi", "rsa.key"
+        )
+
+        assert is_connected is False
+        assert deadlines == [123.0]
+
+    def test_unreachable_hosts_are_skipped(self, cluster, mocker):
+        from pihole_manager.probe import ReachabilityProbe
+
+        cluster.probe = ReachabilityProbe(MagicMock())
+        probe_endpoints = mocker.patch.object(
+            cluster.probe,
+            "_probe_endpoints",
+            side_effect=lambda endpoints: {
+                endpoint: endpoint[0] != "pihole-03.local" for endpoint in endpoints
+            },
+        )
+        task = MagicMock(return_value=True)
+
+        results = cluster._run_on_hosts(task)
+
+        assert results[2] == {"hostname": "pihole-03.local", "error": "Host unreachable."}
+        assert task.call_count == 3
+        probe_endpoints.assert_called_once()
+
+    def test_drift_report_reads_each_host_once(self, cluster, mocker):
+        read = mocker.patch.object(
+            cluster,
+            "_read_records_on_host",
+            side_effect=lambda ph_host: None
+            if ph_host["hostname"] == "pihole-04.local"
+            else [("10.0.0.10", "nas.local")],
+        )
+
+        report = cluster.drift_report()
+
+        assert read.call_count == 4
+        assert report["hosts"] == cluster.config.pihole_hostnames[:3]
+        assert report["unreachable"] == ["pihole-04.local"]
+        assert report["missing"] == []
+        assert report["in_sync"] is False
+
+    def test_run_task_records_operation_timings(self, cluster, tmp_path):
+        cluster.config.metrics["textfile"] = str(tmp_path / "dnsman.prom")
+
+        def _add_record_on_host(ph_host):
+            cluster.metrics.observe("reload", ph_host["hostname"], 0.01)
+            return True
+
+        cluster._run_on_hosts(_add_record_on_host)
+        cluster.close()
+
+        phases = cluster.metrics.snapshot()["phases"]
+        assert {(p["operation"], p["phase"]) for p in phases} == {
+            ("add_record", "reload"),
+            ("add_record", "total"),
+        }
+        assert len(phases) == 8
+        assert "phase=\"total\"" in (tmp_path / "dnsman.prom").read_text()
+
+    def test_validate_records_reports_rows(self, cluster):
+        records = [
+            ("10.0.0.1", "nas.local"),
+            ("10.0.0.1", "nas.local"),
+            ("10.0.0.1", "files.local"),
+        ]
+
+        assert cluster._validate_records(records) == [
+            ("10.0.0.1", "nas.local"),
+            ("10.0.0.1", "files.local"),
+        ]
+        cluster.logger.warning.assert_called_once_with(
+            "Record on row 3: 10.0.0.1 already mapped to nas.local on row 1"
+        )
+
+        assert cluster._validate_records([("10.0.0.01", "nas_local")]) is None
+        cluster.logger.error.assert_called_with("1 invalid records. No hosts changed.")
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 import os
+import json
+
+import pytest
 
 
 class TestConfig:
@@ -35,3 +38,123 @@ class TestConfig:
 
     def test_config_loglevel(self):
         assert self.config.log_level is not None
+
+    def test_max_parallel_hosts_default(self):
+        assert self.config.max_parallel_hosts == 1
+
+    def test_max_channels_default(self):
+        assert self.config.connection_pool["max_channels"] == 4
+
+    def test_maintenance_defaults(self):
+        assert self.config.maintenance["batch_size"] == 1
+        assert self.config.maintenance["max_unavailable"] == 1
+        assert self.config.maintenance["health_check"] is True
+
+    def test_timeouts_defaults(self):
+        assert self.config.timeouts == {
+            "connect": 10.0,
+            "banner": 15.0,
+            "auth": 15.0,
+            "command": None,
+            "operation_deadline": None,
+        }
+
+    def test_probe_disabled_by_default(self):
+        assert self.config.probe["enabled"] is False
+
+    def test_metrics_export_disabled_by_default(self):
+        assert self.config.metrics == {"textfile": None, "json_file": None}
+
+
+class TestConfigCache:
+    content = """pihole:
+  hosts:
+    - host:
+        hostname: pihole-01.example.com
+        port: 22
+        username: pi
+        ssh_key: /home/pi/.ssh/id_ed25519
+logging:
+  log_level: info
+"""
+
+    def _write(self, tmp_path, content=None):
+        path = tmp_path / "config.yaml"
+        path.write_text(self.content if content is None else content)
+        return str(path)
+
+    def test_compiles_cache_next_to_yaml(self, tmp_path):
+        from pihole_manager.config import Config, HostRecord
+
+        config = Config(self._write(tmp_path))
+
+        assert (tmp_path / ".config.yaml.cache.json").exists()
+        assert isinstance(config.host_records[0], HostRecord)
+        assert config.pihole_hostnames == ["pihole-01.example.com"]
+        assert config.pihole_hosts[0]["host"]["port"] == 22
+
+    def test_cache_hit_skips_yaml(self, tmp_path, mocker):
+        from pihole_manager.config import Config
+
+        path = self._write(tmp_path)
+        first = Config(path)
+
+        safe_load = mocker.patch("yaml.safe_load")
+        second = Config(path)
+
+        safe_load.assert_not_called()
+        assert second.pihole_hosts == first.pihole_hosts
+        assert second.config_file_content == first.config_file_content
+
+    def test_changed_yaml_invalidates_cache(self, tmp_path):
+        from pihole_manager.config import Config
+
+        path = self._write(tmp_path)
+        Config(path)
+
+        self._write(tmp_path, self.content.replace("pihole-01", "pihole-02"))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert Config(path).pihole_hostnames == ["pihole-02.example.com"]
+
+    @pytest.mark.parametrize(
+        "damage",
+        [
+            lambda cached: [cached],
+            lambda cached: {k: v for k, v in cached.items() if k != "content"},
+            lambda cached: {k: v for k, v in cached.items() if k != "hosts"},
+            lambda cached: {**cached, "hosts": [["pihole-01.example.com"]]},
+            lambda cached: {**cached, "content": ["pihole"]},
+        ],
+    )
+    def test_malformed_cache_is_recompiled(self, tmp_path, damage):
+        from pihole_manager.config import Config
+
+        path = self._write(tmp_path)
+        Config(path)
+        cache = tmp_path / ".config.yaml.cache.json"
+        cache.write_text(json.dumps(damage(json.loads(cache.read_text()))))
+
+        assert Config(path).pihole_hostnames == ["pihole-01.example.com"]
+
+    def test_schema_error_reported_at_compile(self, tmp_path):
+        import pytest
+
+        from pihole_manager.config import Config
+
+        path = self._write(tmp_path, self.content.replace("        port: 22\n", ""))
+
+        with pytest.raises(ValueError, match=r"pihole.hosts\[0\].host.port"):
+            Config(path)
+
+        assert not (tmp_path / ".config.yaml.cache.json").exists()
+
+    def test_unwritable_cache_is_ignored(self, tmp_path, mocker):
+        from pihole_manager.config import Config
+
+        path = self._write(tmp_path)
+        mocker.patch("pihole_manager.config.os.replace", side_effect=OSError)
+
+        assert Config(path).pihole_hostnames == ["pihole-01.example.com"]
+        assert list(tmp_path.iterdir()) == [tmp_path / "config.yaml"]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestDnsmanDaemon:
+    from pihole_manager.config import Config
+    from pihole_manager.daemon import DaemonClient, DnsmanDaemon
+
+    config_file = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "test.config.yaml"
+    )
+
+    @pytest.fixture
+    def daemon(self, tmp_path):
+        """starts a daemon on a temporary socket and stops it afterwards.
+
+        Yields:
+            DnsmanDaemon: running daemon.
+        """
+        config = self.Config(self.config_file)
+        config.daemon = {"socket_path": str(tmp_path / "d.sock"), "batch_window": 0.2}
+
+        daemon = self.DnsmanDaemon(logger=MagicMock(), config=config)
+        thread = threading.Thread(target=daemon.serve)
+        thread.start()
+
+        client = self.DaemonClient(daemon.socket_path)
+        for _ in range(100):
+            if client.is_running():
+                break
+            time.sleep(0.01)
+
+        yield daemon
+
+        daemon.shutdown()
+        thread.join(timeout=5)
+        assert not os.path.exists(daemon.socket_path)
+
+    def test_ping(self, daemon):
+        assert self.DaemonClient(daemon.socket_path).is_running() is True
+
+    def test_not_running(self, tmp_path):
+        assert self.DaemonClient(str(tmp_path / "none.sock")).is_running() is False
+
+    def test_record_changes_are_batched(self, daemon, mocker):
+        apply = mocker.patch.object(
+            daemon.cluster,
+            "apply_mutations",
+            side_effect=lambda mutations: [
+                {
+                    "hostname": "test.example.com",
+                    "result": {"output": "", "outcomes": ["added"] * len(mutations)},
+                }
+            ],
+        )
+        responses = []
+
+        def submit(i):
+            responses.append(
+                self.DaemonClient(daemon.socket_path).submit(
+                    {
+                        "operation": "add-dns-record",
+                        "ipaddress": f"192.168.1.{i}",
+                        "hostname": f"host{i}.local",
+                    }
+                )
+            )
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(1, 6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert apply.call_count == 1
+        assert len(apply.call_args.args[0]) == 5
+        assert all(r["status"] == "ok" for r in responses)
+        assert responses[0]["result"][0]["result"] == {"outcome": "added"}
+
+    def test_change_already_pushed_by_another_process(self, daemon, mocker):
+        mocker.patch.object(
+            daemon.cluster,
+            "apply_mutations",
+            return_value=[
+                {
+                    "hostname": "test.example.com",
+                    "result": {"output": "", "outcomes": [], "replayed": 0},
+                }
+            ],
+        )
+
+        response = self.DaemonClient(daemon.socket_path).submit(
+            {"operation": "add-dns-record", "ipaddress": "192.168.1.1", "hostname": "a.local"}
+        )
+
+        assert response["status"] == "ok"
+        assert response["result"][0]["result"] == {"outcome": "applied"}
+
+    def test_batch_worker_survives_errors(self, daemon, mocker):
+        mocker.patch.object(
+            daemon, "_mutation_result", side_effect=[KeyError("outcomes"), {"result": {}}]
+        )
+        mocker.patch.object(
+            daemon.cluster, "apply_mutations", return_value=[{"hostname": "a"}]
+        )
+        request = {
+            "operation": "add-dns-record",
+            "ipaddress": "192.168.1.1",
+            "hostname": "a.local",
+        }
+
+        first = self.DaemonClient(daemon.socket_path).submit(request)
+        second = self.DaemonClient(daemon.socket_path).submit(request)
+
+        assert first["status"] == "error"
+        assert second["status"] == "ok"
+
+    def test_invalid_record_is_rejected(self, daemon):
+        response = self.DaemonClient(daemon.socket_path).submit(
+            {"operation": "add-dns-record", "ipaddress": "nope", "hostname": "a.local"}
+        )
+
+        assert response["status"] == "error"
+
+    def test_unsupported_operation(self, daemon):
+        response = self.DaemonClient(daemon.socket_path).submit({"operation": "foo"})
+
+        assert response["status"] == "error"
+
+    def test_update_request_passes_rollout_options(self, daemon, mocker):
+        update = mocker.patch.object(
+            daemon.cluster, "invoke_gravity_update", return_value=False
+        )
+
+        response = self.DaemonClient(daemon.socket_path).submit(
+            {"operation": "update-gravity", "start_from": 2, "resume": True}
+        )
+
+        assert response == {"status": "ok", "result": False}
+        update.assert_called_once_with(start_from=2, resume=True)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import json
+
+from pihole_manager.drift import build_drift_report, render_drift_report
+
+
+class TestDriftReport:
+    host_records = {
+        "pihole-01.local": [
+            ("10.0.0.10", "nas.local"),
+            ("10.0.0.11", "printer.local"),
+            ("10.0.0.11", "printer.local"),
+        ],
+        "pihole-02.local": [
+            ("10.0.0.10", "NAS.local"),
+            ("10.0.0.12", "printer.local"),
+        ],
+    }
+
+    def test_in_sync(self):
+        records = [("10.0.0.10", "nas.local")]
+        report = build_drift_report({"a": records, "b": list(records)})
+
+        assert report["in_sync"] is True
+        assert report["matrix"] == [
+            {"ip": "10.0.0.10", "hostname": "nas.local", "hosts": {"a": True, "b": True}}
+        ]
+
+    def test_missing_conflicts_and_duplicates(self):
+        report = build_drift_report(self.host_records, unreachable=["pihole-03.local"])
+
+        assert report["in_sync"] is False
+        assert report["unreachable"] == ["pihole-03.local"]
+        assert report["missing"] == [
+            {
+                "ip": "10.0.0.11",
+                "hostname": "printer.local",
+                "missing_on": ["pihole-02.local"],
+            },
+            {
+                "ip": "10.0.0.12",
+                "hostname": "printer.local",
+                "missing_on": ["pihole-01.local"],
+            },
+        ]
+        assert report["conflicts"] == [
+            {
+                "hostname": "printer.local",
+                "ips": {
+                    "pihole-01.local": ["10.0.0.11"],
+                    "pihole-02.local": ["10.0.0.12"],
+                },
+            }
+        ]
+        assert report["duplicates"] == [
+            {
+                "host": "pihole-01.local",
+                "ip": "10.0.0.11",
+                "hostname": "printer.local",
+                "count": 2,
+            }
+        ]
+
+    def test_render_formats(self):
+        report = build_drift_report(self.host_records)
+
+        assert json.loads(render_drift_report(report, "json")) == report
+
+        table = render_drift_report(report).splitlines()
+        assert table[0].split() == ["RECORD", "pihole-01.local", "pihole-02.local"]
+        assert table[1].split() == ["10.0.0.10", "nas.local", "x", "x"]
+        assert table[2].split() == ["10.0.0.11", "printer.local", "x", "-"]
+        assert table[-1] == "Cluster has drifted."
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+
+class TestJournal:
+    from pihole_manager.journal import Journal
+
+    def test_append_assigns_sequence_numbers(self, tmp_path):
+        journal = self.Journal(str(tmp_path / "journal.jsonl"))
+
+        assert journal.append([("add", "10.0.0.1", "a.local")]) == [1]
+        assert journal.append(
+            [("add", "10.0.0.2", "b.local"), ("delete", "10.0.0.1", "a.local")]
+        ) == [2, 3]
+
+        # a new instance continues from the file on disk.
+        assert self.Journal(str(tmp_path / "journal.jsonl")).head() == 3
+
+    def test_pending_is_unacked_suffix(self, tmp_path):
+        journal = self.Journal(str(tmp_path / "journal.jsonl"))
+        journal.append([("add", f"10.0.0.{i}", f"h{i}.local") for i in range(1, 5)])
+
+        journal.ack("pihole-01.local", 3)
+        journal.ack("pihole-01.local", 2)
+
+        reopened = self.Journal(str(tmp_path / "journal.jsonl"))
+        assert [e["seq"] for e in reopened.pending("pihole-01.local")] == [4]
+        assert len(reopened.pending("pihole-02.local")) == 4
+
+    def test_torn_last_line_is_ignored(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = self.Journal(str(path))
+        journal.append([("add", "10.0.0.1", "a.local")])
+        with open(path, "a") as file:
+            file.write('{"seq": 2, "operat')
+
+        assert self.Journal(str(path)).head() == 1
+
+    def test_append_after_torn_last_line(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = self.Journal(str(path))
+        journal.append([("add", "10.0.0.1", "a.local")])
+        with open(path, "a") as file:
+            file.write('{"seq": 2, "operation": "add"')
+
+        assert journal.append([("add", "10.0.0.2", "b.local")]) == [2]
+        assert [e["seq"] for e in journal.pending("pihole-01.local")] == [1, 2]
+
+    def test_instances_sharing_a_file_never_reuse_seqs(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        first, second = self.Journal(path), self.Journal(path)
+
+        assert first.append([("add", "10.0.0.1", "a.local")]) == [1]
+        assert second.append([("add", "10.0.0.2", "b.local")]) == [2]
+        assert first.append([("add", "10.0.0.3", "c.local")]) == [3]
+
+        second.ack("pihole-01.local", 2)
+        first.ack("pihole-02.local", 3)
+        assert second.acked("pihole-02.local") == 3
+        assert first.acked("pihole-01.local") == 2
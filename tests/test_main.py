@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestMain:
+    config_file = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "test.config.yaml"
+    )
+
+    def _run(self, mocker, argv, response):
+        from pihole_manager import main
+
+        mocker.patch.object(sys, "argv", ["dnsman", "-c", self.config_file, *argv])
+        forward = mocker.patch.object(main, "forward_to_daemon", return_value=response)
+
+        with pytest.raises(SystemExit) as exit_info:
+            main.main()
+
+        return exit_info.value.code, forward
+
+    def test_forwarded_update_failure_exits_nonzero(self, mocker):
+        code, _ = self._run(
+            mocker, ["-o", "update-gravity"], {"status": "ok", "result": False}
+        )
+        assert code == 1
+
+        code, _ = self._run(
+            mocker, ["-o", "update-gravity"], {"status": "ok", "result": True}
+        )
+        assert code == 0
+
+    def test_forward_sends_rollout_options(self, mocker):
+        from pihole_manager.main import forward_to_daemon
+
+        client = mocker.patch("pihole_manager.daemon.DaemonClient").return_value
+        client.is_running.return_value = True
+        options = {
+            "operation": {"command": "update-pihole"},
+            "start_from": 3,
+            "resume": True,
+        }
+
+        forward_to_daemon(options, None, MagicMock(daemon={"socket_path": "d.sock"}), MagicMock())
+
+        request = client.submit.call_args.args[0]
+        assert request["start_from"] == 3
+        assert request["resume"] is True
+
+    @pytest.mark.parametrize(
+        "error, fallback",
+        [(ConnectionRefusedError("refused"), True), (TimeoutError("timed out"), False)],
+    )
+    def test_forward_survives_daemon_failure(self, mocker, error, fallback):
+        from pihole_manager.main import forward_to_daemon
+
+        client = mocker.patch("pihole_manager.daemon.DaemonClient").return_value
+        client.is_running.return_value = True
+        client.submit.side_effect = error
+        options = {"operation": {"command": "update-gravity"}}
+
+        response = forward_to_daemon(
+            options, None, MagicMock(daemon={"socket_path": "d.sock"}), MagicMock()
+        )
+
+        if fallback:
+            assert response is None
+        else:
+            assert response["status"] == "error"
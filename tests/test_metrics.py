@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import json
+import pytest
+
+from pihole_manager.metrics import timed
+
+
+class TestMetricsRegistry:
+    from pihole_manager.metrics import Histogram, MetricsRegistry
+
+    def test_histogram_buckets(self):
+        histogram = self.Histogram(buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+        assert histogram.count == 4
+        assert histogram.min == 0.05
+        assert histogram.max == 2
+
+    def test_operation_label_and_timer(self):
+        metrics = self.MetricsRegistry(buckets=(1,))
+
+        with metrics.operation("add_record"):
+            with metrics.timer("connect", "pihole-01.local"):
+                pass
+
+            with pytest.raises(RuntimeError):
+                with metrics.timer("reload", "pihole-01.local"):
+                    raise RuntimeError("boom")
+
+        metrics.observe("connect", "pihole-01.local", 2)
+
+        phases = {
+            (p["operation"], p["phase"]): p for p in metrics.snapshot()["phases"]
+        }
+        assert set(phases) == {
+            ("add_record", "connect"),
+            ("add_record", "reload"),
+            ("", "connect"),
+        }
+        assert phases[("", "connect")]["buckets"] == {"1": 0, "+Inf": 1}
+
+    def test_prometheus_export(self, tmp_path):
+        metrics = self.MetricsRegistry(buckets=(0.5,))
+        metrics.observe("reload", 'pi"hole', 0.25, operation="add_record")
+
+        path = tmp_path / "dnsman.prom"
+        metrics.write(str(path), "prometheus")
+
+        assert path.read_text().splitlines()[2:] == [
+            'dnsman_phase_duration_seconds_bucket{host="pi\\"hole",operation="add_record",phase="reload",le="0.5"} 1',
+            'dnsman_phase_duration_seconds_bucket{host="pi\\"hole",operation="add_record",phase="reload",le="+Inf"} 1',
+            'dnsman_phase_duration_seconds_sum{host="pi\\"hole",operation="add_record",phase="reload"} 0.25',
+            'dnsman_phase_duration_seconds_count{host="pi\\"hole",operation="add_record",phase="reload"} 1',
+        ]
+
+        metrics.write(str(tmp_path / "dnsman.json"), "json")
+        assert json.loads((tmp_path / "dnsman.json").read_text()) == metrics.snapshot()
+
+    def test_timed_decorator(self):
+        class Host:
+            hostname = "pihole-01.local"
+            metrics = self.MetricsRegistry()
+
+            @timed("read_custom_list")
+            def read(self):
+                return "content"
+
+        host = Host()
+        assert host.read() == "content"
+        assert host.metrics.snapshot()["phases"][0]["phase"] == "read_custom_list"
+
+        host.metrics = None
+        assert host.read() == "content"
@@ -1,10 +1,74 @@
 #!/usr/bin/env python3
 
 import os
+import shutil
+import hashlib
+import subprocess
 from unittest.mock import patch, MagicMock
 
 import pytest
 
+from pihole_manager.pihole import RECORD_TRANSACTION_SCRIPT, WRITE_CUSTOM_LIST_SCRIPT
+
+
+class FakeChannel:
+    """paramiko channel stand-in that hands out queued output chunks."""
+
+    def __init__(self, stdout_chunks, stderr_chunks=(), exit_status=0):
+        self.stdout_chunks = list(stdout_chunks)
+        self.stderr_chunks = list(stderr_chunks)
+        self.exit_status = exit_status
+
+    def recv_ready(self):
+        return bool(self.stdout_chunks)
+
+    def recv_stderr_ready(self):
+        return bool(self.stderr_chunks)
+
+    def recv(self, size):
+        return self.stdout_chunks.pop(0)
+
+    def recv_stderr(self, size):
+        return self.stderr_chunks.pop(0)
+
+    def exit_status_ready(self):
+        return not (self.stdout_chunks or self.stderr_chunks)
+
+    def recv_exit_status(self):
+        return self.exit_status
+
+
+class FakeTransport:
+    """paramiko transport stand-in whose sessions answer from a command table
+    and record how many were open at the same time."""
+
+    def __init__(self, replies, max_sessions=None):
+        self.replies = replies
+        self.max_sessions = max_sessions
+        self.commands = []
+        self.open = 0
+        self.peak = 0
+
+    def open_session(self, timeout=None):
+        if self.max_sessions is not None and self.open >= self.max_sessions:
+            raise RuntimeError("administratively prohibited")
+
+        transport = self
+
+        class Session(FakeChannel):
+            def exec_command(self, cmd):
+                transport.commands.append(cmd)
+                stdout, stderr = transport.replies[cmd]
+                self.stdout_chunks = [stdout] if stdout else []
+                self.stderr_chunks = [stderr] if stderr else []
+
+            def close(self):
+                transport.open -= 1
+
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        return Session([])
+
 
 class TestPiHole:
     from pihole_manager.config import Config, Logging
@@ -177,7 +241,9 @@ class TestPiHole:
             mocker (_type_): _description_
         """
         mocker.patch.object(
-            pi_hole_instance, "_execute", return_value={"output": "1\n"}
+            pi_hole_instance,
+            "_execute",
+            return_value={"output": "192.168.1.1 test.local\n192.168.1.10 nas.local"},
         )
         mocker.patch.object(pi_hole_instance.validator, "validate", return_value=True)
 
@@ -191,7 +257,9 @@ class TestPiHole:
             mocker (_type_): _description_
         """
         mocker.patch.object(
-            pi_hole_instance, "_execute", return_value={"output": "0\n"}
+            pi_hole_instance,
+            "_execute",
+            return_value={"output": "192.168.1.20 test.local\n192.168.1.21 nas.local"},
         )
         mocker.patch.object(pi_hole_instance.validator, "validate", return_value=True)
         assert pi_hole_instance._check_ip_in_dns("192.168.1.2") == False
@@ -229,3 +297,980 @@ class TestPiHole:
         )
         mocker.patch.object(pi_hole_instance.validator, "validate", return_value=True)
         assert pi_hole_instance._check_ip_in_dns("192.168.1.4") == False
+
+    def test_platform_checked_once_per_connection(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        pi_hole_instance.client = MagicMock()
+        stdout, stderr = MagicMock(), MagicMock()
+        stdout.read.return_value = b"1\n"
+        stderr.read.return_value = b""
+        pi_hole_instance.client.exec_command.return_value = (None, stdout, stderr)
+        platform = mocker.patch.object(
+            pi_hole_instance, "_get_remote_platform", return_value="raspbian"
+        )
+
+        assert pi_hole_instance._execute("true") == {"output": "1"}
+        assert pi_hole_instance._execute("true") == {"output": "1"}
+        assert platform.call_count == 1
+
+    def test_platform_read_from_facts_cache(self, pi_hole_instance, mocker, tmp_path):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+            tmp_path (_type_): _description_
+        """
+        from pihole_manager.cache import HostFactsCache
+
+        pi_hole_instance.client = MagicMock()
+        pi_hole_instance.facts_cache = HostFactsCache(str(tmp_path / "facts.json"))
+        mocker.patch.object(
+            pi_hole_instance, "_host_key_fingerprint", return_value="abc123"
+        )
+        platform = mocker.patch.object(
+            pi_hole_instance, "_get_remote_platform", return_value="raspbian"
+        )
+
+        assert pi_hole_instance._get_platform() == "raspbian"
+
+        pi_hole_instance._platform = None
+        pi_hole_instance.facts_cache = HostFactsCache(str(tmp_path / "facts.json"))
+        assert pi_hole_instance._get_platform() == "raspbian"
+        assert platform.call_count == 1
+
+    def test_add_dns_records_single_write(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        execute = mocker.patch.object(
+            pi_hole_instance,
+            "_execute",
+            side_effect=[
+                {"output": "192.168.1.10 nas.local"},
+                {"output": "DNSMAN_STATUS written"},
+                {"output": ""},
+            ],
+        )
+        upload = mocker.patch.object(
+            pi_hole_instance, "_upload_custom_list", return_value="/home/pi/upload"
+        )
+
+        result = pi_hole_instance.add_dns_records(
+            [("192.168.1.10", "nas.local"), ("192.168.1.11", "printer.local")]
+        )
+
+        assert result["added"] == [("192.168.1.11", "printer.local")]
+        assert result["skipped"] == [("192.168.1.10", "nas.local")]
+        assert execute.call_count == 3
+        assert execute.call_args.args[0] == "pihole restartdns reload"
+        upload.assert_called_once_with(
+            "192.168.1.10 nas.local\n192.168.1.11 printer.local\n"
+        )
+
+    def test_delete_dns_records_nothing_to_do(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        execute = mocker.patch.object(
+            pi_hole_instance, "_execute", return_value={"output": "192.168.1.10 nas.local"}
+        )
+
+        result = pi_hole_instance.delete_dns_records([("192.168.1.11", "printer.local")])
+
+        assert result["deleted"] == []
+        assert execute.call_count == 1
+
+    def test_delete_dns_records_ignores_hostname_case(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        result = pi_hole_instance.delete_dns_records([("192.168.1.10", "NAS.local")])
+
+        assert result["deleted"] == [("192.168.1.10", "NAS.local")]
+        assert "nas.local" not in remote_list["content"]
+
+        remote_list["content"] = "192.168.1.10 nas.local\n"
+        pi_hole_instance.invalidate_snapshot()
+        result = pi_hole_instance.apply_dns_mutations([("delete", "192.168.1.10", "NAS.local")])
+
+        assert result["outcomes"] == ["deleted"]
+        assert remote_list["content"] == ""
+
+    def test_apply_dns_records_converged_host_not_written(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        execute = mocker.patch.object(
+            pi_hole_instance, "_execute", return_value={"output": "192.168.1.10 nas.local"}
+        )
+
+        result = pi_hole_instance.apply_dns_records([("192.168.1.10", "nas.local")])
+
+        assert result["converged"] is True
+        assert execute.call_count == 1
+
+    def test_apply_dns_records_writes_delta(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        mocker.patch.object(
+            pi_hole_instance, "_execute", return_value={"output": "192.168.1.10 nas.local"}
+        )
+        write = mocker.patch.object(
+            pi_hole_instance, "_write_custom_list", return_value={"output": ""}
+        )
+
+        result = pi_hole_instance.apply_dns_records([("192.168.1.11", "nas.local")])
+
+        assert result["converged"] is False
+        write.assert_called_once_with([("192.168.1.11", "nas.local")])
+
+    def test_snapshot_fetched_once_and_exact(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        execute = mocker.patch.object(
+            pi_hole_instance,
+            "_execute",
+            return_value={"output": "10.0.0.10 nas.local\n10.0.0.11 Printer.local"},
+        )
+
+        assert pi_hole_instance._check_ip_in_dns("10.0.0.1") is False
+        assert pi_hole_instance._check_ip_in_dns("10.0.0.10") is True
+        assert pi_hole_instance.check_record_in_dns("10.0.0.11", "printer.local") is True
+        assert pi_hole_instance.check_record_in_dns("10.0.0.1", "nas.local") is False
+        assert execute.call_count == 1
+
+    def test_snapshot_invalidated_after_mutation(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        pi_hole_instance.snapshot()
+        pi_hole_instance.add_dns_record("10.0.0.1", "nas.local")
+        assert pi_hole_instance._check_ip_in_dns("10.0.0.1") is True
+
+        # read, one transaction with the reload, then a fresh read.
+        assert remote_list["commands"] == ["cat", "sudo", "cat"]
+
+    @pytest.fixture
+    def remote_list(self, pi_hole_instance, mocker):
+        """fakes a remote custom.list, answering cat and sha256sum commands
+        and record transactions.
+
+        Returns:
+            dict: remote `content`, the list of executed `commands` and the
+            `reload` flag of each transaction.
+        """
+        import shlex
+        import hashlib
+
+        from pihole_manager.records import parse_custom_list, render_custom_list
+
+        remote = {"content": "192.168.1.10 nas.local\n", "commands": [], "reloads": []}
+
+        def transaction(action, ip, hostname, reload):
+            records = parse_custom_list(remote["content"])
+            if action == "add":
+                if any(record[0] == ip for record in records):
+                    return {"output": "DNSMAN_STATUS exists"}
+                records.append((ip, hostname))
+            else:
+                if (ip, hostname) not in records:
+                    return {"output": "DNSMAN_STATUS missing"}
+                records.remove((ip, hostname))
+
+            remote["content"] = render_custom_list(records)
+            remote["reloads"].append(reload == "1")
+            digest = hashlib.sha256(remote["content"].encode("utf-8")).hexdigest()
+            status = "reloaded" if reload == "1" else "written"
+            return {"output": f"DNSMAN_STATUS {status} {digest}"}
+
+        def write(upload_path, expected):
+            digest = hashlib.sha256(remote["content"].encode("utf-8")).hexdigest()
+            if digest != expected:
+                return {"output": f"DNSMAN_STATUS conflict {digest}"}
+            remote["content"] = remote.pop("upload")
+            return {"output": "DNSMAN_STATUS written"}
+
+        def execute(cmd, stdin_data=None, strip=True, check_platform=True):
+            remote["commands"].append(cmd.split()[0])
+            if cmd.startswith("sudo sh -s --") and stdin_data == WRITE_CUSTOM_LIST_SCRIPT:
+                return write(*shlex.split(cmd)[4:])
+            if cmd.startswith("sudo sh -s --"):
+                assert stdin_data == RECORD_TRANSACTION_SCRIPT
+                assert check_platform is False
+                return transaction(*shlex.split(cmd)[4:])
+            if cmd.startswith("sha256sum"):
+                digest = hashlib.sha256(remote["content"].encode("utf-8")).hexdigest()
+                return {"output": f"{digest}  /etc/pihole/custom.list"}
+            if cmd.startswith("cat"):
+                return {"output": remote["content"]}
+            if cmd.startswith("sudo"):
+                remote["content"] = remote.pop("upload")
+            return {"output": ""}
+
+        def upload(content):
+            remote["upload"] = content
+            return "/home/pi/upload"
+
+        mocker.patch.object(pi_hole_instance, "_execute", side_effect=execute)
+        mocker.patch.object(pi_hole_instance, "_upload_custom_list", side_effect=upload)
+        return remote
+
+    def test_write_aborts_when_list_changed_since_read(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        snapshot = pi_hole_instance.snapshot()
+        remote_list["content"] += "192.168.1.12 tv.local\n"
+
+        with pi_hole_instance.session():
+            result = pi_hole_instance._write_custom_list(
+                snapshot.records + [("192.168.1.11", "printer.local")]
+            )
+
+        assert result["status"] == "conflict"
+        assert "error" in result
+        assert "tv.local" in remote_list["content"]
+        assert "printer.local" not in remote_list["content"]
+
+    def test_snapshot_revalidated_by_fingerprint(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        pi_hole_instance.snapshot()
+        pi_hole_instance.revalidate_snapshot()
+        assert pi_hole_instance._check_ip_in_dns("192.168.1.10") is True
+        assert remote_list["commands"] == ["cat", "sha256sum"]
+
+        remote_list["content"] += "192.168.1.11 printer.local\n"
+        pi_hole_instance.revalidate_snapshot()
+        assert pi_hole_instance._check_ip_in_dns("192.168.1.11") is True
+        assert remote_list["commands"] == ["cat", "sha256sum", "sha256sum", "cat"]
+
+    def test_snapshot_uses_custom_list_cache(self, pi_hole_instance, remote_list, tmp_path):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+            tmp_path (_type_): _description_
+        """
+        from pihole_manager.cache import CustomListCache
+
+        pi_hole_instance.custom_list_cache = CustomListCache(str(tmp_path))
+        pi_hole_instance.snapshot()
+        pi_hole_instance.invalidate_snapshot()
+
+        assert pi_hole_instance._check_ip_in_dns("192.168.1.10") is True
+        assert remote_list["commands"] == ["cat", "sha256sum"]
+
+    def test_identical_write_is_skipped(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        result = pi_hole_instance.apply_dns_records([("192.168.1.10", "nas.local")])
+        assert result["converged"] is True
+
+        result = pi_hole_instance._write_custom_list([("192.168.1.10", "nas.local")])
+        assert result["unchanged"] is True
+        assert remote_list["commands"] == ["cat"]
+
+    def test_bulk_add_keeps_comments_and_aliases(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        remote_list["content"] = "# office\n10.0.0.5 printer.lan printer\n"
+
+        result = pi_hole_instance.add_dns_records([("10.0.0.6", "scanner.lan")])
+
+        assert result["added"] == [("10.0.0.6", "scanner.lan")]
+        assert remote_list["content"] == (
+            "# office\n10.0.0.5 printer.lan printer\n10.0.0.6 scanner.lan\n"
+        )
+
+    def test_delete_dns_record_atomic_write(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        remote_list["content"] = "10.0.0.1 nas.local\n10.0.0.10 nas.local\n"
+
+        result = pi_hole_instance.delete_dns_record("10.0.0.1", "nas.local")
+
+        assert result["status"] == "reloaded"
+        assert remote_list["content"] == "10.0.0.10 nas.local\n"
+        # check, write and reload in a single round trip.
+        assert remote_list["commands"] == ["sudo"]
+        assert pi_hole_instance.reload_dns() is None
+
+        assert pi_hole_instance.delete_dns_record("10.0.0.1", "nas.local") is False
+
+    def test_record_transaction_failures(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        execute = mocker.patch.object(
+            pi_hole_instance,
+            "_execute",
+            return_value={"output": "flock: timeout\nDNSMAN_STATUS lock_timeout"},
+        )
+        assert pi_hole_instance.add_dns_record("10.0.0.1", "nas.local") == {
+            "error": "Record transaction failed: lock_timeout",
+            "status": "lock_timeout",
+        }
+        assert pi_hole_instance._dirty is False
+
+        execute.return_value = {"output": "DNSMAN_STATUS not_raspbian"}
+        assert pi_hole_instance.add_dns_record("10.0.0.1", "nas.local") == {
+            "error": "Not a raspbian host. Cannot execute command."
+        }
+
+        execute.return_value = {"output": "FTL failed\nDNSMAN_STATUS reload_failed abc"}
+        result = pi_hole_instance.delete_dns_record("10.0.0.1", "nas.local")
+        assert result == {
+            "error": "DNS reload failed: FTL failed",
+            "status": "reload_failed",
+            "sha256": "abc",
+        }
+        assert pi_hole_instance.last_reload_result == {"error": "FTL failed"}
+
+        command = execute.call_args.args[0]
+        assert command == "sudo sh -s -- delete 10.0.0.1 nas.local 1"
+
+    def test_upload_custom_list_uses_sftp(self, pi_hole_instance):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+        """
+        pi_hole_instance.client = MagicMock()
+        sftp = pi_hole_instance.client.open_sftp.return_value
+        sftp.normalize.return_value = "/home/pi"
+
+        remote_path = pi_hole_instance._upload_custom_list("10.0.0.1 nas.local\n")
+
+        assert remote_path.startswith("/home/pi/.dnsman-custom.list.")
+        sftp.file.return_value.__enter__.return_value.write.assert_called_once_with(
+            "10.0.0.1 nas.local\n"
+        )
+        sftp.close.assert_called_once()
+        sftp.get_channel.assert_not_called()
+
+        pi_hole_instance.timeouts = {"command": 20}
+        pi_hole_instance._upload_custom_list("10.0.0.1 nas.local\n")
+
+        sftp.get_channel.return_value.settimeout.assert_called_once_with(20)
+
+    def test_reload_coalesced_per_session(self, pi_hole_instance, remote_list):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+        """
+        with pi_hole_instance.session():
+            pi_hole_instance.add_dns_record("10.0.0.1", "a.local")
+            pi_hole_instance.add_dns_record("10.0.0.2", "b.local")
+            pi_hole_instance.delete_dns_record("10.0.0.1", "a.local")
+            assert "pihole" not in remote_list["commands"]
+
+        assert remote_list["commands"].count("sudo") == 3
+        assert remote_list["reloads"] == [False, False, False]
+        assert remote_list["commands"].count("pihole") == 1
+
+        # nothing changed since the last reload, so nothing to do.
+        assert pi_hole_instance.reload_dns() is None
+
+    def test_min_reload_interval(self, pi_hole_instance, remote_list, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            remote_list (_type_): _description_
+            mocker (_type_): _description_
+        """
+        sleep = mocker.patch("pihole_manager.pihole.time.sleep")
+        pi_hole_instance.min_reload_interval = 30
+
+        pi_hole_instance.add_dns_record("10.0.0.1", "a.local")
+        sleep.assert_not_called()
+
+        # too soon for a reload within the transaction, so it waits after it.
+        pi_hole_instance.add_dns_record("10.0.0.2", "b.local")
+        sleep.assert_called_once()
+        assert 0 < sleep.call_args.args[0] <= 30
+        assert remote_list["reloads"] == [True, False]
+        assert remote_list["commands"] == ["sudo", "sudo", "pihole"]
+
+    def test_check_health(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        execute = mocker.patch.object(
+            pi_hole_instance,
+            "_execute",
+            return_value={"output": "[✓] FTL is listening on port 53"},
+        )
+        assert pi_hole_instance.check_health() is True
+        execute.assert_called_once_with("pihole status")
+
+        execute.return_value = {"output": "[✗] DNS service is NOT running"}
+        assert pi_hole_instance.check_health() is False
+
+        execute.return_value = {"error": "sudo: pihole: command not found"}
+        assert pi_hole_instance.check_health() is False
+
+    def _stream_client(self, pi_hole_instance, mocker, channel):
+        mocker.patch.object(pi_hole_instance, "_get_platform", return_value="raspbian")
+        stdout = MagicMock()
+        stdout.channel = channel
+        pi_hole_instance.client = MagicMock()
+        pi_hole_instance.client.exec_command.return_value = (
+            MagicMock(),
+            stdout,
+            MagicMock(),
+        )
+
+    def test_execute_stream_yields_lines(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        channel = FakeChannel(
+            [b"  [i] Downloading\r  [\xe2\x9c", b"\x93] Downloaded\n  [i] Build", b"ing tree\n"]
+        )
+        self._stream_client(pi_hole_instance, mocker, channel)
+        lines = []
+
+        result = pi_hole_instance._execute_stream(
+            "pihole -g", on_line=lambda stream, line: lines.append((stream, line))
+        )
+
+        assert lines == [
+            ("stdout", "  [i] Downloading"),
+            ("stdout", "  [\u2713] Downloaded"),
+            ("stdout", "  [i] Building tree"),
+        ]
+        assert result == {
+            "output": "  [i] Downloading\n  [\u2713] Downloaded\n  [i] Building tree",
+            "stderr": "",
+            "exit_status": 0,
+        }
+
+    def test_execute_stream_keeps_bounded_tail(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        channel = FakeChannel(
+            [f"line {i}\n".encode() for i in range(1000)],
+            [b"warning"],
+            exit_status=1,
+        )
+        self._stream_client(pi_hole_instance, mocker, channel)
+
+        result = pi_hole_instance._execute_stream("pihole -up", tail_lines=3)
+
+        assert result == {
+            "error": "warning",
+            "output": "line 997\nline 998\nline 999",
+            "stderr": "warning",
+            "exit_status": 1,
+        }
+
+        channel = FakeChannel([f"line {i}\n".encode() for i in range(1000)])
+        self._stream_client(pi_hole_instance, mocker, channel)
+
+        result = pi_hole_instance._execute_stream("pihole -up", tail_lines=3)
+
+        assert result["output"] == "line 997\nline 998\nline 999"
+
+    def test_execute_stream_stderr_with_exit_zero_is_not_an_error(
+        self, pi_hole_instance, mocker
+    ):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        channel = FakeChannel(
+            [b"  [i] Checking for updates\n"],
+            [b"From https://github.com/pi-hole/pi-hole\n"],
+        )
+        self._stream_client(pi_hole_instance, mocker, channel)
+
+        result = pi_hole_instance._execute_stream("pihole -up")
+
+        assert result == {
+            "output": "  [i] Checking for updates",
+            "stderr": "From https://github.com/pi-hole/pi-hole",
+            "exit_status": 0,
+        }
+
+    def test_execute_stream_exit_status_without_stderr(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        channel = FakeChannel([b"  [i] Building tree\n"], exit_status=2)
+        self._stream_client(pi_hole_instance, mocker, channel)
+
+        result = pi_hole_instance._execute_stream("pihole -g")
+
+        assert result["error"] == "Exit status 2."
+
+    def test_update_gravity_streams_output(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        self._stream_client(
+            pi_hole_instance, mocker, FakeChannel([b"  [i] Pi-hole blocking is enabled\n"])
+        )
+
+        result = pi_hole_instance.update_gravity()
+
+        assert result["output"] == "  [i] Pi-hole blocking is enabled"
+        pi_hole_instance.client.exec_command.assert_called_once_with("pihole -g")
+        pi_hole_instance.logger.info.assert_any_call(
+            "[example.com]   [i] Pi-hole blocking is enabled"
+        )
+
+    def test_create_ph_client_timeouts(self):
+        """_summary_"""
+        pihole = self.PiHole(
+            "example.com",
+            22,
+            "user",
+            "path/to/key",
+            MagicMock(),
+            timeouts={"connect": 5, "banner": 7, "auth": None},
+        )
+
+        with patch("paramiko.SSHClient") as mock_ssh:
+            pihole._create_ph_client()
+
+        mock_ssh.return_value.connect.assert_called_once_with(
+            "example.com",
+            22,
+            "user",
+            key_filename="path/to/key",
+            timeout=5,
+            banner_timeout=7,
+        )
+
+    def test_create_ph_client_timeouts_capped_by_deadline(self):
+        """_summary_"""
+        import time
+
+        pihole = self.PiHole(
+            "example.com",
+            22,
+            "user",
+            "path/to/key",
+            MagicMock(),
+            timeouts={"connect": 10, "banner": 0.5, "auth": None},
+        )
+        pihole.deadline = time.monotonic() + 2
+
+        with patch("paramiko.SSHClient") as mock_ssh:
+            pihole._create_ph_client()
+
+        timeouts = mock_ssh.return_value.connect.call_args.kwargs
+        assert 1 < timeouts["timeout"] <= 2
+        assert timeouts["banner_timeout"] == 0.5
+        assert 1 < timeouts["auth_timeout"] <= 2
+
+    def test_execute_command_timeout(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        import socket
+
+        mocker.patch.object(pi_hole_instance, "_get_platform", return_value="raspbian")
+        pi_hole_instance.timeouts = {"command": 30}
+        stdout = MagicMock()
+        stdout.read.side_effect = socket.timeout()
+        pi_hole_instance.client = MagicMock()
+        pi_hole_instance.client.exec_command.return_value = (
+            MagicMock(),
+            stdout,
+            MagicMock(),
+        )
+
+        result = pi_hole_instance._execute("pihole -up")
+
+        assert result == {"error": "Command timed out: pihole -up"}
+        pi_hole_instance.client.exec_command.assert_called_once_with(
+            "pihole -up", timeout=30
+        )
+        stdout.channel.close.assert_called_once()
+
+    def test_execute_stream_command_timeout(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        channel = FakeChannel([])
+        channel.exit_status_ready = lambda: False
+        channel.close = MagicMock()
+        self._stream_client(pi_hole_instance, mocker, channel)
+        pi_hole_instance.timeouts = {"command": 0.1}
+
+        result = pi_hole_instance._execute_stream("pihole -g")
+
+        assert result == {"error": "Command timed out: pihole -g", "exit_status": None}
+        channel.close.assert_called_once()
+
+    def test_execute_after_deadline(self, pi_hole_instance, mocker):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            mocker (_type_): _description_
+        """
+        import time
+
+        pi_hole_instance.client = MagicMock()
+        pi_hole_instance.deadline = time.monotonic() - 1
+
+        assert pi_hole_instance._execute("pihole -g") == {
+            "error": "Operation deadline exceeded."
+        }
+        pi_hole_instance.client.exec_command.assert_not_called()
+
+    def _transport_client(self, pi_hole_instance, transport):
+        pi_hole_instance.client = MagicMock()
+        pi_hole_instance.client.get_transport.return_value = transport
+
+    def test_execute_many_runs_commands_concurrently(self, pi_hole_instance):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+        """
+        from pihole_manager.pihole import PLATFORM_COMMAND
+
+        transport = FakeTransport(
+            {
+                PLATFORM_COMMAND: (b"ID=raspbian\n", b""),
+                "sha256sum /etc/pihole/custom.list": (b"abc  /etc/pihole/custom.list\n", b""),
+                "cat /etc/pihole/setupVars.conf": (b"PIHOLE_INTERFACE=eth0\n", b""),
+                "cat /missing": (b"", b"cat: /missing: No such file or directory\n"),
+            }
+        )
+        self._transport_client(pi_hole_instance, transport)
+
+        results = pi_hole_instance.execute_many(
+            [
+                "sha256sum /etc/pihole/custom.list",
+                "cat /etc/pihole/setupVars.conf",
+                "cat /missing",
+            ]
+        )
+
+        assert results == [
+            {"output": "abc  /etc/pihole/custom.list"},
+            {"output": "PIHOLE_INTERFACE=eth0"},
+            {"error": "cat: /missing: No such file or directory"},
+        ]
+        # the platform check shares the round trip with the commands.
+        assert transport.peak == 4
+        assert pi_hole_instance._platform == "raspbian"
+        pi_hole_instance.client.exec_command.assert_not_called()
+
+    def test_cached_snapshot_fingerprint_shares_platform_round_trip(
+        self, pi_hole_instance, tmp_path
+    ):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+            tmp_path (_type_): _description_
+        """
+        import hashlib
+
+        from pihole_manager.cache import CustomListCache
+        from pihole_manager.pihole import PLATFORM_COMMAND
+
+        content = "192.168.1.10 nas.local\n"
+        sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        pi_hole_instance.custom_list_cache = CustomListCache(str(tmp_path))
+        pi_hole_instance.custom_list_cache.set(
+            pi_hole_instance.hostname, pi_hole_instance.port, sha256, content
+        )
+        transport = FakeTransport(
+            {
+                PLATFORM_COMMAND: (b"ID=raspbian\n", b""),
+                "sha256sum /etc/pihole/custom.list": (
+                    f"{sha256}  /etc/pihole/custom.list\n".encode(),
+                    b"",
+                ),
+            }
+        )
+        self._transport_client(pi_hole_instance, transport)
+
+        snapshot = pi_hole_instance.snapshot()
+
+        assert snapshot.content == content
+        assert transport.peak == 2
+        pi_hole_instance.client.exec_command.assert_not_called()
+
+    def test_execute_many_respects_channel_limit(self, pi_hole_instance):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+        """
+        commands = [f"cat /tmp/{i}" for i in range(6)]
+        transport = FakeTransport({cmd: (cmd.encode(), b"") for cmd in commands})
+        self._transport_client(pi_hole_instance, transport)
+        pi_hole_instance._platform = "raspbian"
+        pi_hole_instance.max_channels = 2
+
+        results = pi_hole_instance.execute_many(commands)
+
+        assert results == [{"output": cmd} for cmd in commands]
+        assert transport.peak == 2
+
+    def test_execute_many_backs_off_when_server_refuses_channels(self, pi_hole_instance):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+        """
+        commands = [f"cat /tmp/{i}" for i in range(5)]
+        transport = FakeTransport(
+            {cmd: (cmd.encode(), b"") for cmd in commands}, max_sessions=3
+        )
+        self._transport_client(pi_hole_instance, transport)
+        pi_hole_instance._platform = "raspbian"
+        pi_hole_instance.max_channels = 8
+
+        results = pi_hole_instance.execute_many(commands)
+
+        assert results == [{"output": cmd} for cmd in commands]
+        assert transport.peak == 3
+
+    def test_execute_many_not_raspbian(self, pi_hole_instance):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+        """
+        from pihole_manager.pihole import PLATFORM_COMMAND
+
+        transport = FakeTransport({PLATFORM_COMMAND: (b"", b""), "cat /a": (b"a", b"")})
+        self._transport_client(pi_hole_instance, transport)
+
+        assert pi_hole_instance.execute_many(["cat /a"]) == [
+            {"error": "Not a raspbian host. Cannot execute command."}
+        ]
+        assert pi_hole_instance._platform is None
+
+    def test_execute_many_command_timeout(self, pi_hole_instance):
+        """_summary_
+
+        Args:
+            pi_hole_instance (_type_): _description_
+        """
+        transport = FakeTransport({"sleep 60": (b"", b"")})
+        self._transport_client(pi_hole_instance, transport)
+        pi_hole_instance._platform = "raspbian"
+        pi_hole_instance.timeouts = {"command": 0.1}
+
+        original = transport.open_session
+
+        def open_session(timeout=None):
+            session = original(timeout=timeout)
+            session.exit_status_ready = lambda: False
+            return session
+
+        transport.open_session = open_session
+
+        assert pi_hole_instance.execute_many(["sleep 60"]) == [
+            {"error": "Command timed out: sleep 60"}
+        ]
+        assert transport.open == 0
+
+
+@pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("sh", "awk", "flock", "sha256sum", "mktemp")),
+    reason="needs a posix shell with flock",
+)
+class TestRecordTransactionScript:
+    """runs the remote record transaction script against a local custom.list."""
+
+    @pytest.fixture
+    def remote(self, tmp_path):
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        pihole = bin_dir / "pihole"
+        pihole.write_text(f'#!/bin/sh\necho "$@" >> {tmp_path}/reloads\n')
+        pihole.chmod(0o755)
+
+        (tmp_path / "os-release").write_text('NAME="Raspbian"\nID=raspbian\n')
+        custom_list = tmp_path / "custom.list"
+        custom_list.write_text("# managed\n10.0.0.1 nas.local NAS-alias.local # storage\n")
+
+        script = RECORD_TRANSACTION_SCRIPT.replace(
+            "/etc/pihole/custom.list", str(custom_list)
+        ).replace("/etc/os-release", str(tmp_path / "os-release"))
+
+        def run(*args):
+            result = subprocess.run(
+                ["sh", "-s", "--", *args],
+                input=script,
+                capture_output=True,
+                text=True,
+                env={**os.environ, "PATH": f"{bin_dir}:{os.environ['PATH']}"},
+            )
+            return result.stdout.split()
+
+        return {"run": run, "list": custom_list, "reloads": tmp_path / "reloads", "dir": tmp_path}
+
+    def test_add_appends_and_reloads(self, remote):
+        status = remote["run"]("add", "10.0.0.2", "printer.local", "1")
+
+        content = remote["list"].read_text()
+        assert status[:2] == ["DNSMAN_STATUS", "reloaded"]
+        assert status[2] == hashlib.sha256(content.encode("utf-8")).hexdigest()
+        assert content.endswith("# storage\n10.0.0.2 printer.local\n")
+        assert remote["reloads"].read_text() == "restartdns reload\n"
+
+    def test_add_existing_ip_is_not_written(self, remote):
+        assert remote["run"]("add", "10.0.0.1", "other.local", "1") == [
+            "DNSMAN_STATUS",
+            "exists",
+        ]
+        assert not remote["reloads"].exists()
+
+    def test_delete_keeps_other_names_and_comments(self, remote):
+        status = remote["run"]("delete", "10.0.0.1", "nas-alias.local", "0")
+
+        assert status[:2] == ["DNSMAN_STATUS", "written"]
+        assert remote["list"].read_text() == "# managed\n10.0.0.1 nas.local # storage\n"
+        assert not remote["reloads"].exists()
+        assert [path.name for path in remote["dir"].glob("custom.list.dnsman.??????")] == []
+
+    def test_delete_missing_record(self, remote):
+        assert remote["run"]("delete", "10.0.0.9", "nas.local", "0") == [
+            "DNSMAN_STATUS",
+            "missing",
+        ]
+
+    def test_not_raspbian(self, remote):
+        (remote["dir"] / "os-release").write_text("ID=debian\n")
+
+        assert remote["run"]("add", "10.0.0.2", "printer.local", "1") == [
+            "DNSMAN_STATUS",
+            "not_raspbian",
+        ]
+        assert "printer.local" not in remote["list"].read_text()
+
+
+@pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("sh", "flock", "sha256sum", "install")),
+    reason="needs a posix shell with flock",
+)
+class TestWriteCustomListScript:
+    """runs the remote custom.list write script against a local custom.list."""
+
+    @pytest.fixture
+    def remote(self, tmp_path):
+        custom_list = tmp_path / "custom.list"
+        custom_list.write_text("10.0.0.1 nas.local\n")
+        upload = tmp_path / "upload"
+        upload.write_text("10.0.0.1 nas.local\n10.0.0.2 printer.local\n")
+
+        script = WRITE_CUSTOM_LIST_SCRIPT.replace("/etc/pihole/custom.list", str(custom_list))
+
+        def run(expected):
+            result = subprocess.run(
+                ["sh", "-s", "--", str(upload), expected],
+                input=script,
+                capture_output=True,
+                text=True,
+            )
+            return result.stdout.split()
+
+        return {"run": run, "list": custom_list, "upload": upload}
+
+    def test_write_when_unchanged(self, remote):
+        expected = hashlib.sha256(b"10.0.0.1 nas.local\n").hexdigest()
+
+        assert remote["run"](expected) == ["DNSMAN_STATUS", "written"]
+        assert remote["list"].read_text() == "10.0.0.1 nas.local\n10.0.0.2 printer.local\n"
+        assert not remote["upload"].exists()
+
+    def test_conflict_when_changed_since_read(self, remote):
+        expected = hashlib.sha256(b"10.0.0.1 nas.local\n").hexdigest()
+        remote["list"].write_text("10.0.0.1 nas.local\n10.0.0.3 tv.local\n")
+
+        status = remote["run"](expected)
+
+        assert status[:2] == ["DNSMAN_STATUS", "conflict"]
+        assert remote["list"].read_text() == "10.0.0.1 nas.local\n10.0.0.3 tv.local\n"
+        assert not remote["upload"].exists()
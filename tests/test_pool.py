@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestConnectionPool:
+    from pihole_manager.pool import ConnectionPool
+
+    @pytest.fixture
+    def factory(self):
+        """fake connection factory returning mocked, live PiHole instances.
+
+        Returns:
+            MagicMock: factory with the same signature as the cluster's.
+        """
+
+        def create(hostname, port, username, key_file):
+            pihole = MagicMock()
+            pihole.hostname = hostname
+            pihole.port = port
+            pihole.username = username
+            pihole.key_file = key_file
+            pihole.is_alive.return_value = True
+            return pihole, True
+
+        return MagicMock(side_effect=create)
+
+    def test_connection_is_reused(self, factory):
+        pool = self.ConnectionPool(MagicMock(), factory)
+
+        first, _ = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+        pool.release(first)
+        second, _ = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+
+        assert first is second
+        assert factory.call_count == 1
+        first.set_keepalive.assert_called_once_with(30)
+
+    def test_lease_is_exclusive(self, factory):
+        pool = self.ConnectionPool(MagicMock(), factory)
+        first, _ = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+        acquired = []
+
+        waiter = threading.Thread(
+            target=lambda: acquired.append(
+                pool.acquire("pihole.local", 22, "pi", "rsa.key")[0]
+            )
+        )
+        waiter.start()
+        waiter.join(timeout=0.1)
+
+        # the second caller waits while the connection is leased.
+        assert waiter.is_alive()
+        assert acquired == []
+
+        pool.release(first)
+        waiter.join(timeout=1)
+
+        assert acquired == [first]
+        assert factory.call_count == 1
+
+    def test_failed_connect_wakes_waiters(self, factory):
+        connecting = threading.Event()
+        proceed = threading.Event()
+        create = factory.side_effect
+
+        def slow_failure(*args):
+            connecting.set()
+            proceed.wait(timeout=1)
+            raise OSError("connection refused")
+
+        factory.side_effect = lambda *args: (
+            slow_failure(*args) if factory.call_count == 1 else create(*args)
+        )
+        pool = self.ConnectionPool(MagicMock(), factory)
+        errors, acquired = [], []
+
+        def first_caller():
+            try:
+                pool.acquire("pihole.local", 22, "pi", "rsa.key")
+
+            except OSError as err:
+                errors.append(err)
+
+        first = threading.Thread(target=first_caller)
+        first.start()
+        connecting.wait(timeout=1)
+        second = threading.Thread(
+            target=lambda: acquired.append(
+                pool.acquire("pihole.local", 22, "pi", "rsa.key")
+            )
+        )
+        second.start()
+        proceed.set()
+        first.join(timeout=1)
+        second.join(timeout=1)
+
+        assert len(errors) == 1
+        assert acquired[0][1] is True
+        assert factory.call_count == 2
+
+    def test_dead_connection_is_replaced(self, factory):
+        pool = self.ConnectionPool(MagicMock(), factory)
+
+        first, _ = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+        pool.release(first)
+        first.is_alive.return_value = False
+        second, _ = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+
+        assert first is not second
+        first.close.assert_called_once()
+
+    def test_idle_connection_is_evicted(self, factory):
+        pool = self.ConnectionPool(MagicMock(), factory, idle_timeout=0.01)
+
+        first, _ = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+        pool.release(first)
+        time.sleep(0.02)
+        pool.acquire("other.local", 22, "pi", "rsa.key")
+
+        first.close.assert_called_once()
+        assert len(pool) == 1
+
+    def test_max_size_skips_leased_connections(self, factory):
+        pool = self.ConnectionPool(MagicMock(), factory, max_size=1)
+
+        leased, _ = pool.acquire("a.local", 22, "pi", "rsa.key")
+        idle, _ = pool.acquire("b.local", 22, "pi", "rsa.key")
+        pool.release(idle)
+        pool.acquire("c.local", 22, "pi", "rsa.key")
+
+        leased.close.assert_not_called()
+        idle.close.assert_called_once()
+
+    def test_failed_connection_is_not_pooled(self):
+        factory = MagicMock(return_value=(MagicMock(), False))
+        pool = self.ConnectionPool(MagicMock(), factory)
+
+        _, is_connected = pool.acquire("pihole.local", 22, "pi", "rsa.key")
+
+        assert is_connected is False
+        assert len(pool) == 0
+
+    def test_close_closes_everything(self, factory):
+        with self.ConnectionPool(MagicMock(), factory) as pool:
+            a, _ = pool.acquire("a.local", 22, "pi", "rsa.key")
+            b, _ = pool.acquire("b.local", 22, "pi", "rsa.key")
+
+        a.close.assert_called_once()
+        b.close.assert_called_once()
+        assert len(pool) == 0
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import time
+import socket
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestReachabilityProbe:
+    from pihole_manager.probe import ReachabilityProbe
+
+    @pytest.fixture
+    def listener(self):
+        """opens a local tcp listener.
+
+        Returns:
+            tuple: (hostname, port) of the listener.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(8)
+        yield sock.getsockname()
+        sock.close()
+
+    @pytest.fixture
+    def closed_port(self):
+        """finds a local port with nothing listening on it.
+
+        Returns:
+            tuple: (hostname, port) of the closed port.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        endpoint = sock.getsockname()
+        sock.close()
+        return endpoint
+
+    def test_probe_reachable_and_unreachable(self, listener, closed_port):
+        probe = self.ReachabilityProbe(MagicMock(), timeout=1)
+
+        results = probe.probe([listener, closed_port, ("host.invalid", 22)])
+
+        assert results == {
+            listener: True,
+            closed_port: False,
+            ("host.invalid", 22): False,
+        }
+
+    def test_results_are_cached(self, listener, mocker):
+        probe = self.ReachabilityProbe(MagicMock(), timeout=1, ttl=60)
+        probe_endpoints = mocker.spy(probe, "_probe_endpoints")
+
+        assert probe.is_reachable(*listener) is True
+        assert probe.is_reachable(*listener) is True
+        assert probe_endpoints.call_count == 1
+
+        probe.ttl = -1
+        assert probe.is_reachable(*listener) is True
+        assert probe_endpoints.call_count == 2
+
+    def test_hostnames_resolve_in_parallel(self, listener, mocker):
+        probe = self.ReachabilityProbe(MagicMock(), timeout=1)
+        getaddrinfo = socket.getaddrinfo
+
+        def slow_getaddrinfo(hostname, port, **kwargs):
+            if hostname.startswith("slow"):
+                time.sleep(0.2)
+                raise socket.gaierror("no answer")
+            return getaddrinfo(hostname, port, **kwargs)
+
+        mocker.patch("socket.getaddrinfo", side_effect=slow_getaddrinfo)
+        slow = [(f"slow-{i}.local", 22) for i in range(4)]
+
+        started = time.monotonic()
+        results = probe.probe([listener] + slow)
+
+        assert time.monotonic() - started < 0.6
+        assert results == {listener: True, **{endpoint: False for endpoint in slow}}
+
+    def test_stuck_lookup_counts_as_unreachable(self, listener, mocker):
+        probe = self.ReachabilityProbe(MagicMock(), timeout=0.2)
+        getaddrinfo = socket.getaddrinfo
+
+        def stuck_getaddrinfo(hostname, port, **kwargs):
+            if hostname == "stuck.local":
+                time.sleep(0.5)
+            return getaddrinfo(hostname, port, **kwargs)
+
+        mocker.patch("socket.getaddrinfo", side_effect=stuck_getaddrinfo)
+
+        started = time.monotonic()
+        results = probe.probe([listener, ("stuck.local", 22)])
+
+        assert time.monotonic() - started < 0.4
+        assert results == {listener: True, ("stuck.local", 22): False}
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from pihole_manager.records import (
+    CustomListSnapshot,
+    diff_records,
+    edit_custom_list,
+    load_records,
+    parse_custom_list,
+    render_custom_list,
+)
+
+
+class TestRecords:
+    expected = [
+        ("192.168.1.10", "nas.local"),
+        ("192.168.1.11", "printer.local"),
+    ]
+
+    def test_load_csv_records(self, tmp_path):
+        path = tmp_path / "records.csv"
+        path.write_text("ip,hostname\n192.168.1.10,nas.local\n192.168.1.11, printer.local\n")
+
+        assert load_records(str(path)) == self.expected
+
+    def test_load_yaml_records(self, tmp_path):
+        path = tmp_path / "records.yaml"
+        path.write_text(
+            "records:\n"
+            "  - ip: 192.168.1.10\n    hostname: nas.local\n"
+            "  - ip: 192.168.1.11\n    hostname: printer.local\n"
+        )
+
+        assert load_records(str(path)) == self.expected
+
+    def test_load_hosts_records(self, tmp_path):
+        path = tmp_path / "hosts"
+        path.write_text(
+            "# lab hosts\n192.168.1.10 nas.local\n\n192.168.1.11 printer.local # hp\n"
+            "192.168.1.12 a.local b.local\n"
+        )
+
+        assert load_records(str(path)) == self.expected + [
+            ("192.168.1.12", "a.local"),
+            ("192.168.1.12", "b.local"),
+        ]
+
+    def test_invalid_record_line(self, tmp_path):
+        path = tmp_path / "hosts"
+        path.write_text("192.168.1.10\n")
+
+        with pytest.raises(ValueError):
+            load_records(str(path))
+
+    def test_custom_list_roundtrip(self):
+        content = render_custom_list(self.expected)
+
+        assert content == "192.168.1.10 nas.local\n192.168.1.11 printer.local\n"
+        assert parse_custom_list(content) == self.expected
+
+    def test_edit_custom_list_keeps_operator_content(self):
+        content = "# office\n10.0.0.5 printer.lan printer\n\nnot-a-record\n"
+
+        added = edit_custom_list(
+            content, parse_custom_list(content) + [("10.0.0.6", "scanner.lan")]
+        )
+        assert added == content + "10.0.0.6 scanner.lan\n"
+
+        removed = edit_custom_list(content, [("10.0.0.5", "printer.lan")])
+        assert removed == "# office\n10.0.0.5 printer.lan\n\nnot-a-record\n"
+
+        emptied = edit_custom_list("10.0.0.5 printer.lan # office printer\n", [])
+        assert emptied == "# office printer\n"
+
+    def test_edit_custom_list_without_trailing_newline(self):
+        records = [("10.0.0.5", "a.lan"), ("10.0.0.6", "b.lan")]
+
+        assert edit_custom_list("10.0.0.5 a.lan", records) == (
+            "10.0.0.5 a.lan\n10.0.0.6 b.lan\n"
+        )
+
+    def test_diff_records(self):
+        current = [
+            ("192.168.1.10", "nas.local"),
+            ("192.168.1.20", "old.local"),
+            ("192.168.1.30", "printer.local"),
+        ]
+        desired = [
+            ("192.168.1.10", "nas.local"),
+            ("192.168.1.11", "printer.local"),
+            ("192.168.1.40", "new.local"),
+        ]
+
+        diff = diff_records(current, desired)
+
+        assert diff["add"] == [("192.168.1.11", "printer.local"), ("192.168.1.40", "new.local")]
+        assert diff["delete"] == [("192.168.1.20", "old.local"), ("192.168.1.30", "printer.local")]
+        assert diff["changed"] == [("printer.local", ["192.168.1.30"], ["192.168.1.11"])]
+        assert diff["records"] == [("192.168.1.10", "nas.local")] + diff["add"]
+
+    def test_diff_records_converged(self):
+        diff = diff_records(self.expected, list(reversed(self.expected)))
+
+        assert diff["add"] == [] and diff["delete"] == [] and diff["changed"] == []
+
+    def test_snapshot_indexes(self):
+        snapshot = CustomListSnapshot(
+            self.expected + [("192.168.1.10", "files.local")]
+        )
+
+        assert snapshot.hostnames_for("192.168.1.10") == ["nas.local", "files.local"]
+        assert snapshot.ips_for("NAS.local") == ["192.168.1.10"]
+        assert snapshot.has_record("192.168.1.11", "printer.local")
+        assert not snapshot.has_record("192.168.1.1", "printer.local")
+        assert not snapshot.has_ip("192.168.1.1")
+
+    def test_apply_mutations(self):
+        from pihole_manager.records import apply_mutations
+
+        records, outcomes = apply_mutations(
+            self.expected,
+            [
+                ("add", "192.168.1.10", "other.local"),
+                ("delete", "192.168.1.10", "nas.local"),
+                ("add", "192.168.1.10", "other.local"),
+                ("delete", "192.168.1.99", "gone.local"),
+            ],
+        )
+
+        assert outcomes == ["exists", "deleted", "added", "missing"]
+        assert records == [
+            ("192.168.1.11", "printer.local"),
+            ("192.168.1.10", "other.local"),
+        ]
+
+    def test_apply_mutations_readd_and_duplicates(self):
+        from pihole_manager.records import apply_mutations
+
+        records, outcomes = apply_mutations(
+            [("10.0.0.1", "a.local"), ("10.0.0.2", "b.local"), ("10.0.0.1", "a.local")],
+            [
+                ("delete", "10.0.0.1", "a.local"),
+                ("add", "10.0.0.1", "a.local"),
+                ("delete", "10.0.0.2", "b.local"),
+                ("delete", "10.0.0.2", "b.local"),
+                ("add", "10.0.0.3", "c.local"),
+            ],
+        )
+
+        assert outcomes == ["deleted", "added", "deleted", "missing", "added"]
+        assert records == [("10.0.0.1", "a.local"), ("10.0.0.3", "c.local")]
+
+    def test_apply_mutations_delete_ignores_hostname_case(self):
+        from pihole_manager.records import apply_mutations
+
+        records, outcomes = apply_mutations(
+            self.expected, [("delete", "192.168.1.10", "NAS.local")]
+        )
+
+        assert outcomes == ["deleted"]
+        assert records == [("192.168.1.11", "printer.local")]
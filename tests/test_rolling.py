@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestRollingScheduler:
+    from pihole_manager.rolling import RollingScheduler
+
+    @pytest.fixture
+    def cluster(self, cluster):
+        """the shared four-host cluster, with every host always healthy.
+
+        Returns:
+            PiHoleCluster: cluster under test.
+        """
+        cluster.check_host_health = MagicMock(return_value=True)
+        return cluster
+
+    def test_waves_respect_max_unavailable(self, cluster):
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def task(ph_host):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            threading.Event().wait(0.02)
+            with lock:
+                state["active"] -= 1
+            return ph_host["hostname"]
+
+        scheduler = self.RollingScheduler(
+            MagicMock(), cluster, batch_size=4, max_unavailable=2
+        )
+        result = scheduler.run("update-gravity", task)
+
+        assert result["completed"] is True
+        assert [r["result"] for r in result["results"]] == cluster.config.pihole_hostnames
+        assert state["peak"] <= 2
+        assert cluster.check_host_health.call_count == 4
+
+    def test_unhealthy_host_stops_rollout(self, cluster, tmp_path, mocker):
+        mocker.patch("pihole_manager.rolling.time.sleep")
+        cluster.check_host_health.side_effect = (
+            lambda ph_host: ph_host["hostname"] != "pihole-02.local"
+        )
+        task = MagicMock(return_value={"output": ""})
+        state_file = tmp_path / "maintenance.json"
+
+        scheduler = self.RollingScheduler(
+            MagicMock(), cluster, health_retries=3, state_file=str(state_file)
+        )
+        result = scheduler.run("update-pihole", task)
+
+        assert result["completed"] is False
+        assert result["failed"] == "pihole-02.local"
+        assert task.call_count == 2
+        assert json.loads(state_file.read_text()) == {
+            "operation": "update-pihole",
+            "completed": ["pihole-01.local"],
+        }
+
+    def test_task_error_stops_rollout(self, cluster):
+        def task(ph_host):
+            if ph_host["hostname"] == "pihole-01.local":
+                raise RuntimeError("boom")
+
+        result = self.RollingScheduler(MagicMock(), cluster).run("update-gravity", task)
+
+        assert result["completed"] is False
+        assert result["failed"] == "pihole-01.local"
+        cluster.check_host_health.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "host_result",
+        [
+            {"error": "Server not connected."},
+            {"error": "Command timed out: pihole -g", "exit_status": None},
+            {"output": "  [✗] Unable to update gravity", "exit_status": 1},
+        ],
+    )
+    def test_failed_host_result_stops_rollout(self, cluster, host_result):
+        task = MagicMock(return_value=host_result)
+
+        result = self.RollingScheduler(MagicMock(), cluster, health_check=False).run(
+            "update-gravity", task
+        )
+
+        assert result["completed"] is False
+        assert result["failed"] == "pihole-01.local"
+        assert task.call_count == 1
+
+    def test_exit_zero_with_stderr_output_counts_as_success(self, cluster):
+        task = MagicMock(
+            return_value={
+                "error": "From https://github.com/pi-hole/pi-hole",
+                "output": "  [✓] Everything is up to date!",
+                "exit_status": 0,
+            }
+        )
+
+        result = self.RollingScheduler(MagicMock(), cluster, health_check=False).run(
+            "update-pihole", task
+        )
+
+        assert result["completed"] is True
+        assert task.call_count == len(cluster.config.pihole_hosts)
+
+    def test_resume_skips_completed_hosts(self, cluster, tmp_path):
+        state_file = tmp_path / "maintenance.json"
+        state_file.write_text(
+            json.dumps(
+                {
+                    "operation": "update-gravity",
+                    "completed": ["pihole-01.local", "pihole-02.local"],
+                }
+            )
+        )
+        task = MagicMock(return_value={"output": ""})
+
+        scheduler = self.RollingScheduler(
+            MagicMock(), cluster, state_file=str(state_file)
+        )
+        result = scheduler.run("update-gravity", task, resume=True)
+
+        assert result["completed"] is True
+        assert [r["hostname"] for r in result["results"]] == [
+            "pihole-03.local",
+            "pihole-04.local",
+        ]
+        assert not state_file.exists()
+
+    def test_state_ignored_without_resume(self, cluster, tmp_path):
+        state_file = tmp_path / "maintenance.json"
+        state_file.write_text(
+            json.dumps({"operation": "update-gravity", "completed": ["pihole-01.local"]})
+        )
+        task = MagicMock(return_value={"output": ""})
+
+        scheduler = self.RollingScheduler(
+            MagicMock(), cluster, state_file=str(state_file)
+        )
+        result = scheduler.run("update-gravity", task)
+
+        assert result["completed"] is True
+        assert task.call_count == 4
+
+    def test_start_from_and_other_operation_state(self, cluster, tmp_path):
+        state_file = tmp_path / "maintenance.json"
+        state_file.write_text(
+            json.dumps({"operation": "update-pihole", "completed": ["pihole-04.local"]})
+        )
+        task = MagicMock(return_value={"output": ""})
+
+        scheduler = self.RollingScheduler(
+            MagicMock(), cluster, health_check=False, state_file=str(state_file)
+        )
+        result = scheduler.run("update-gravity", task, start_from=2, resume=True)
+
+        assert [r["hostname"] for r in result["results"]] == [
+            "pihole-03.local",
+            "pihole-04.local",
+        ]
+        cluster.check_host_health.assert_not_called()
+
+    def test_cluster_invoke_uses_maintenance_config(self, cluster, tmp_path):
+        cluster.config.maintenance["state_file"] = str(tmp_path / "maintenance.json")
+        cluster._update_gravity_on_host = MagicMock(return_value={"output": ""})
+
+        assert cluster.invoke_gravity_update() is True
+        assert cluster._update_gravity_on_host.call_count == 4
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import subprocess
+
+# modules that must only load once a remote operation runs.
+HEAVY_MODULES = ("paramiko", "cryptography", "bcrypt", "nacl", "yaml")
+
+# cumulative import time of pihole_manager.main, in microseconds. Override on
+# slow machines with DNSMAN_IMPORT_BUDGET_US.
+IMPORT_BUDGET_US = int(os.environ.get("DNSMAN_IMPORT_BUDGET_US", 150000))
+
+
+class TestStartup:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def _importtime(self, code):
+        """imports code in a fresh interpreter with -X importtime.
+
+        Args:
+            code (str): python statements to run.
+
+        Returns:
+            dict: cumulative import time in microseconds keyed by module.
+        """
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=self.root,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        timings = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+
+            _, cumulative, module = line[len("import time:") :].split("|")
+            timings[module.strip()] = int(cumulative)
+
+        return timings
+
+    def test_cli_startup_skips_ssh_stack(self):
+        timings = self._importtime(
+            "import pihole_manager.main, pihole_manager.arguments, pihole_manager.config"
+        )
+
+        loaded = {module.split(".")[0] for module in timings}
+        assert loaded.isdisjoint(HEAVY_MODULES), loaded & set(HEAVY_MODULES)
+
+    def test_cli_import_budget(self):
+        timings = self._importtime("import pihole_manager.main")
+
+        assert timings["pihole_manager.main"] < IMPORT_BUDGET_US, (
+            f"pihole_manager.main took {timings['pihole_manager.main']}us to import, "
+            f"budget is {IMPORT_BUDGET_US}us."
+        )
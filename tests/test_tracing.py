@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from pihole_manager.tracing import Tracer, trace_span
+
+
+class TestTracer:
+    def test_spans_nest(self, tmp_path):
+        tracer = Tracer()
+
+        with tracer.span("add-dns-record", "operation"):
+            with tracer.span("session", "session", host="pihole-01.local"):
+                pass
+
+            with pytest.raises(RuntimeError):
+                with tracer.span("pihole -g", "command"):
+                    raise RuntimeError("boom")
+
+        path = tmp_path / "trace.json"
+        tracer.write(str(path))
+        events = json.loads(path.read_text())["traceEvents"]
+
+        spans = {e["name"]: e for e in events if e["ph"] == "X"}
+        assert set(spans) == {"add-dns-record", "session", "pihole -g"}
+        assert spans["session"]["args"] == {"host": "pihole-01.local"}
+
+        outer, inner = spans["add-dns-record"], spans["session"]
+        assert outer["ts"] <= inner["ts"]
+        assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+    def test_threads_are_named(self):
+        tracer = Tracer()
+
+        def work():
+            with tracer.span("connect", "phase"):
+                pass
+
+        worker = threading.Thread(target=work, name="pihole_0")
+        worker.start()
+        worker.join()
+
+        names = [e for e in tracer.events() if e["ph"] == "M"]
+        assert [e["args"]["name"] for e in names] == ["pihole_0"]
+        assert names[0]["tid"] == tracer.events()[1]["tid"]
+
+    def test_trace_span_without_tracer(self):
+        with trace_span(None, "noop", "phase"):
+            pass
+
+    def test_cluster_records_host_spans(self):
+        from pihole_manager.config import Config
+        from pihole_manager.cluster import PiHoleCluster
+
+        config = Config(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.config.yaml")
+        )
+        tracer = Tracer()
+        cluster = PiHoleCluster(logger=MagicMock(), config=config, tracer=tracer)
+
+        def _update_gravity_on_host(ph_host):
+            with cluster._host_session(ph_host) as pihole:
+                return pihole
+
+        cluster.pool.acquire = MagicMock(return_value=(None, False))
+        cluster._run_on_hosts(_update_gravity_on_host)
+
+        spans = [(e["name"], e["cat"]) for e in tracer.events() if e["ph"] == "X"]
+        assert spans == [("session", "session"), ("update_gravity", "host")]
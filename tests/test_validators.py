@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+from unittest.mock import MagicMock
+
+
+class TestPiHoleInstanceValidator:
+    from pihole_manager.validators import PiHoleInstanceValidator
+
+    validator = PiHoleInstanceValidator(MagicMock())
+
+    def test_ipv4_pattern(self):
+        for ip in ("0.0.0.0", "10.0.0.1", "192.168.1.255", "255.255.255.255"):
+            assert self.validator._validate_ip(ip) is True, ip
+
+        for ip in ("256.0.0.1", "10.0.0", "10.0.0.01", "010.0.0.1", "::1", "1.2.3.4 ", None):
+            assert self.validator._validate_ip(ip) is False, ip
+
+    def test_clean_batch(self):
+        records = [("10.0.0.1", "nas.local"), ("10.0.0.2", "printer.local")]
+
+        assert self.validator.validate_records(records) == []
+
+    def test_batch_reports_every_problem(self):
+        records = [
+            ("10.0.0.1", "nas.local"),
+            ("10.0.0.300", "bad_host"),
+            ("10.0.0.1", "NAS.local"),
+            ("10.0.0.1", "files.local"),
+            ("10.0.0.2", "nas.local"),
+        ]
+
+        problems = [
+            (p["row"], p["code"], p["reason"])
+            for p in self.validator.validate_records(records)
+        ]
+
+        assert problems == [
+            (2, "invalid_ip", "invalid ip address: 10.0.0.300"),
+            (2, "invalid_hostname", "invalid hostname: bad_host"),
+            (3, "duplicate_record", "duplicate of row 1"),
+            (4, "duplicate_ip", "10.0.0.1 already mapped to nas.local on row 1"),
+            (5, "duplicate_hostname", "nas.local already mapped to 10.0.0.1 on row 1"),
+        ]
+
+    def test_debug_logging_is_guarded(self):
+        logger = MagicMock()
+        logger.isEnabledFor.return_value = False
+
+        self.PiHoleInstanceValidator(logger).validate(ip="10.0.0.1", hostname="nas.local")
+
+        logger.debug.assert_not_called()